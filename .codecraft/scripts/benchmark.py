@@ -0,0 +1,928 @@
+#!/usr/bin/env python
+"""Synthetic-workload benchmarks for the CodeCraft CLI's hot commands.
+
+Usage:
+    python .codecraft/scripts/benchmark.py run [--tasks N ...] [-o results.json]
+    python .codecraft/scripts/benchmark.py compare OLD.json NEW.json
+    python .codecraft/scripts/benchmark.py generate DIR
+    python .codecraft/scripts/benchmark.py startup [--budget-ms MS]
+    python .codecraft/scripts/benchmark.py lifecycle
+
+`run` generates a project tree in a temporary directory: tasks spread over
+the statuses in workflow.yml's `status_map`, dependencies between them, en
+and zh specs, ADRs and knowledge-base documents, and a populated trash can.
+A copy of cli.py is installed into the tree and every case is run both
+in-process through click's test runner (a warm interpreter, like the
+daemon) and as a fresh `python cli.py` subprocess. It records wall time,
+file-system calls (stat, open, scandir, ...) and peak memory, and writes
+everything as JSON. `run --baseline` and `compare` flag cases that got
+slower than a threshold.
+
+`startup` checks the start-up budget of the light commands: it runs them
+under `python -X importtime`, compares the time spent importing with that
+of importing click alone, and fails if the difference is over budget or a
+module that only some commands need was imported.
+
+`lifecycle` checks that a task created and never committed can be started,
+completed and moved with `task move`, each move ending up committed.
+"""
+
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import random
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+import yaml
+from click import echo, style
+from click.testing import CliRunner
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+SOURCE_ROOT = SCRIPTS_DIR.parent.parent
+RESULTS_VERSION = 1
+# Relative weights used to spread --tasks over the configured statuses.
+STATUS_WEIGHTS = {"backlog": 4, "todo": 2, "in_progress": 1, "done": 6, "archive": 2}
+# Files copied from this repository into every generated tree.
+TREE_FILES = (
+    ".codecraft/workflow.yml",
+    ".codecraft/protected_paths.yml",
+    ".codecraft/templates",
+    "tasks/template.en.md",
+    "tasks/template.zh.md",
+    "docs/specs/template.en.md",
+    "docs/adr/template.en.md",
+    "docs/adr/template.zh.md",
+)
+# Present in a fixed share of documents, so searches always have hits.
+QUERY_TERM = "latency"
+DELETE_ANSWERS = "benchmark\nbenchmark\nnone\ny\n"
+# Differences below these are noise, whatever the relative change.
+MIN_WALL_DELTA = 0.005
+MIN_CALLS_DELTA = 10
+# Times one command (its argv follows) and prints [seconds, max RSS KiB, exit
+# code]. wait4 reports the peak RSS of that one child, unlike getrusage.
+SPAWN_HELPER = """
+import json, os, subprocess, sys, time
+started = time.perf_counter()
+child = subprocess.Popen(sys.argv[1:], stdout=subprocess.DEVNULL)
+_, status, usage = os.wait4(child.pid, 0)
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, usage.ru_maxrss, os.waitstatus_to_exitcode(status)]))
+"""
+# Audit events counted as file-system calls; stats have no audit event and
+# are counted by wrapping os.stat and os.lstat instead.
+COUNTED_EVENTS = {
+    "open": "open",
+    "os.scandir": "scandir",
+    "os.listdir": "listdir",
+    "os.rename": "rename",
+    "os.remove": "remove",
+    "os.mkdir": "mkdir",
+    "subprocess.Popen": "spawn",
+}
+
+
+# Commands that should start fast, and the arguments `startup` runs them with.
+STARTUP_PROBES = {
+    "help": ["--help"],
+    "config get": ["config", "get", "language"],
+}
+# Imported only by the commands that need them; a probe importing one fails.
+STARTUP_DEFERRED_MODULES = (
+    "yaml",
+    "sqlite3",
+    "subprocess",
+    "socket",
+    "csv",
+    "concurrent.futures",
+    "codecraft.process",
+    "codecraft.index",
+    "codecraft.task",
+    "codecraft.workflow",
+    "codecraft.context",
+    "codecraft.trash",
+    "codecraft.log",
+    "codecraft.openspec",
+    "codecraft.daemon",
+)
+STARTUP_BUDGET_MS = 40
+# Commits in generated trees must not depend on the user's git config.
+GIT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+}
+
+
+# ---
+# Tree Generation
+# ---
+class TreeGenerator:
+    """Writes a synthetic, reproducible project into `root`."""
+
+    def __init__(self, root: Path, seed: int):
+        self.root = root
+        self.random = random.Random(seed)
+        syllables = ["ka", "lo", "mi", "ren", "to", "sha", "vi", "dun", "pe", "qua"]
+        self.words = sorted(
+            {
+                "".join(self.random.choices(syllables, k=self.random.randint(2, 4)))
+                for _ in range(600)
+            }
+        )
+        self.cjk = [chr(c) for c in range(0x4E00, 0x4E00 + 400)]
+
+    def text(self, words: int, lang: str, term_share: float = 0.1) -> str:
+        if lang == "zh":
+            body = "".join(self.random.choices(self.cjk, k=words * 2))
+            lines = [body[i : i + 60] for i in range(0, len(body), 60)]
+        else:
+            tokens = self.random.choices(self.words, k=words)
+            lines = [" ".join(tokens[i : i + 12]) for i in range(0, len(tokens), 12)]
+        if self.random.random() < term_share:
+            lines.insert(self.random.randrange(len(lines) + 1), f"{QUERY_TERM} budget")
+        return "\n".join(lines) + "\n"
+
+    def write(self, rel_path: str, text: str) -> Path:
+        path = self.root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def copy_framework(self, cli_path: Path) -> None:
+        for rel_path in TREE_FILES:
+            source = SOURCE_ROOT / rel_path
+            target = self.root / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if source.is_dir():
+                shutil.copytree(source, target, dirs_exist_ok=True)
+            elif source.exists():
+                shutil.copy2(source, target)
+        scripts_dir = self.root / ".codecraft" / "scripts"
+        scripts_dir.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(cli_path, scripts_dir / "cli.py")
+        package_dir = cli_path.parent / "codecraft"
+        if package_dir.is_dir():
+            shutil.copytree(
+                package_dir,
+                scripts_dir / "codecraft",
+                ignore=shutil.ignore_patterns("__pycache__"),
+                dirs_exist_ok=True,
+            )
+
+    def status_counts(self, tasks: int, overrides: dict) -> dict:
+        with open(self.root / ".codecraft" / "workflow.yml", encoding="utf-8") as f:
+            statuses = list(yaml.safe_load(f)["tasks"]["status_map"])
+        weights = {s: STATUS_WEIGHTS.get(s, 1) for s in statuses}
+        total = sum(weights.values())
+        counts = {s: tasks * w // total for s, w in weights.items()}
+        counts[statuses[0]] += tasks - sum(counts.values())
+        counts.update((s, n) for s, n in overrides.items() if s in counts)
+        return counts
+
+    def tasks(self, counts: dict, fanout: int) -> list[str]:
+        with open(self.root / ".codecraft" / "workflow.yml", encoding="utf-8") as f:
+            status_map = yaml.safe_load(f)["tasks"]["status_map"]
+        titles = []
+        number = 0
+        for status, count in counts.items():
+            for _ in range(count):
+                title = f"task-{number:06d}"
+                lang = "zh" if number % 4 == 3 else "en"
+                deps = self.random.sample(titles, min(len(titles), fanout))
+                dep_list = ", ".join(f"#{d}" for d in deps)
+                summary = " ".join(self.random.choices(self.words, k=8))
+                priority = self.random.choice(["Low", "Medium", "High", "Critical"])
+                labels = (
+                    ("任务", "摘要", "状态", "优先级", "依赖项")
+                    if lang == "zh"
+                    else ("Task", "Summary", "Status", "Priority", "Dependencies")
+                )
+                header = (
+                    f"# {labels[0]}: {title}\n\n"
+                    f'- **{labels[1]}**: "{summary}"\n'
+                    f"- **{labels[2]}**: {status}\n"
+                    f"- **{labels[3]}**: {priority}\n"
+                    f"- **{labels[4]}**: `[{dep_list}]`\n\n---\n\n"
+                )
+                self.write(
+                    f"{status_map[status]}{title}.md",
+                    header + self.text(120, lang, term_share=0.02),
+                )
+                titles.append(title)
+                number += 1
+        return titles
+
+    def documents(self, titles: list[str], specs: int, adrs: int, docs: int) -> None:
+        for title in titles[:specs]:
+            lang = self.random.choice(["en", "zh"])
+            self.write(
+                f"docs/specs/{title}.{lang}.md",
+                f"# Specification: {title}\n\n---\n\n" + self.text(300, lang),
+            )
+        for number in range(adrs):
+            mentions = " ".join(self.random.sample(titles, min(len(titles), 2)))
+            self.write(
+                f"docs/adr/{number:04d}-decision.md",
+                f"# ADR: Decision {number}\n\nAffects {mentions}.\n\n"
+                + self.text(250, "en"),
+            )
+        for number in range(docs):
+            lang = "zh" if number % 3 == 2 else "en"
+            folder = "docs/project" if number % 2 else "project_logs"
+            self.write(f"{folder}/doc-{number:05d}.{lang}.md", self.text(400, lang))
+
+    def scratch_files(self, count: int, prefix: str = "scratch") -> list[Path]:
+        return [
+            self.write(f"{prefix}/item-{n:05d}.txt", self.text(60, "en"))
+            for n in range(count)
+        ]
+
+    def git_init(self) -> None:
+        env = {**os.environ, **GIT_IDENTITY}
+        for args in (
+            ["git", "init", "-q", "-b", "main"],
+            ["git", "add", "-A"],
+            ["git", "commit", "-q", "-m", "Synthetic benchmark tree"],
+        ):
+            subprocess.run(args, cwd=self.root, env=env, check=True)
+
+
+def generate_tree(root: Path, params: dict, cli_path: Path) -> dict:
+    """Generates a tree and returns what the cases need to know about it."""
+    generator = TreeGenerator(root, params["seed"])
+    generator.copy_framework(cli_path)
+    counts = generator.status_counts(params["tasks"], params["status_counts"])
+    titles = generator.tasks(counts, params["fanout"])
+    generator.documents(titles, params["specs"], params["adrs"], params["docs"])
+    trash_items = generator.scratch_files(params["trash"])
+    generator.git_init()
+    if trash_items:
+        try:
+            run_subprocess(
+                root, ["delete", "--batch", "scratch/*"], input_text=DELETE_ANSWERS
+            )
+        except click.ClickException as e:
+            echo(style(f"Trash left empty: {e.message.strip()}", fg="yellow"), err=True)
+    # A task in the middle has dependencies and dependants to follow.
+    task = titles[len(titles) // 2]
+    spec_path = root / "docs" / "specs" / f"{task}.en.md"
+    if not spec_path.exists():
+        generator.write(
+            spec_path.relative_to(root).as_posix(),
+            f"# Specification: {task}\n\n---\n\n" + generator.text(300, "en"),
+        )
+    return {"status_counts": counts, "task": task}
+
+
+# ---
+# Measurement
+# ---
+class CallCounter:
+    """Counts file-system calls made while it is active."""
+
+    installed = False
+    current = None
+
+    def __enter__(self):
+        self.counts = {}
+        if not CallCounter.installed:
+            sys.addaudithook(CallCounter.audit)
+            CallCounter.installed = True
+        self.saved = os.stat, os.lstat
+        os.stat = self.wrap(os.stat, "stat")
+        os.lstat = self.wrap(os.lstat, "stat")
+        CallCounter.current = self
+        return self
+
+    def __exit__(self, *exc_info):
+        CallCounter.current = None
+        os.stat, os.lstat = self.saved
+
+    def wrap(self, function, name: str):
+        def counted(*args, **kwargs):
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return function(*args, **kwargs)
+
+        return counted
+
+    @staticmethod
+    def audit(event: str, args) -> None:
+        counter = CallCounter.current
+        name = COUNTED_EVENTS.get(event)
+        if counter is not None and name is not None:
+            counter.counts[name] = counter.counts.get(name, 0) + 1
+
+
+@contextmanager
+def working_directory(path: Path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def load_cli(root: Path):
+    """Imports the tree's cli.py as a fresh module bound to that tree."""
+    load_cli.count = getattr(load_cli, "count", 0) + 1
+    # cli.py imports its commands from the `codecraft` package next to it.
+    for name in [m for m in sys.modules if m.partition(".")[0] == "codecraft"]:
+        del sys.modules[name]
+    spec = importlib.util.spec_from_file_location(
+        f"codecraft_bench_{load_cli.count}", root / ".codecraft" / "scripts" / "cli.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def run_subprocess(root: Path, args: list[str], input_text: str = "") -> tuple:
+    """Runs `python cli.py ARGS` in the tree; returns (seconds, max RSS KiB).
+
+    The command is started from a small helper process. On Linux a child's
+    peak RSS starts at its parent's RSS when it forks, so measuring from
+    this process, which holds in-process runs' modules, would inflate it.
+    """
+    command = [sys.executable, str(root / ".codecraft" / "scripts" / "cli.py"), *args]
+    result = subprocess.run(
+        [sys.executable, "-c", SPAWN_HELPER, *command],
+        cwd=root,
+        input=input_text.encode(),
+        capture_output=True,
+    )
+    try:
+        elapsed, max_rss, code = json.loads(result.stdout)
+    except ValueError:
+        code = result.returncode or 1
+    if code:
+        raise click.ClickException(
+            f"`cli.py {' '.join(args)}` failed:"
+            f" {result.stderr.decode(errors='replace')}"
+        )
+    return elapsed, max_rss
+
+
+def count_subprocess(root: Path, args: list[str], input_text: str = "") -> dict:
+    """Runs a command once in a child that reports its file-system calls."""
+    with tempfile.NamedTemporaryFile("r", suffix=".json") as report:
+        command = [sys.executable, __file__, "child", report.name, str(root)]
+        result = subprocess.run(
+            [*command, "--", *args],
+            cwd=root,
+            input=input_text.encode(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode:
+            raise click.ClickException(
+                f"Counting `cli.py {' '.join(args)}` failed:"
+                f" {result.stderr.decode(errors='replace')}"
+            )
+        return json.load(report)
+
+
+class Case:
+    """One benchmarked command: its arguments and any per-run setup."""
+
+    def __init__(self, name: str, args: list[str], input_text: str = "", setup=None):
+        self.name = name
+        self.args = args
+        self.input_text = input_text
+        self.setup = setup
+
+    def prepare(self, root: Path, run: int) -> list[str]:
+        """Returns the arguments for one run, after doing its setup."""
+        if self.setup is None:
+            return self.args
+        return self.setup(root, run)
+
+
+def delete_setup(root: Path, run: int) -> list[str]:
+    path = root / "scratch-delete" / f"run-{run:04d}-{time.time_ns()}.txt"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text("to be deleted\n", encoding="utf-8")
+    return ["delete", str(path)]
+
+
+def find_task_file_case(task: str) -> Case:
+    # A function rather than a command: `spec create` is the thinnest command
+    # over it, so run that against a spec that already exists.
+    return Case("find_task_file", ["spec", "create", task])
+
+
+def build_cases(task: str) -> list[Case]:
+    return [
+        Case("startup", ["--help"]),
+        Case("suggest", ["suggest"]),
+        Case("suggest --graph", ["suggest", "--graph"]),
+        find_task_file_case(task),
+        Case("context build", ["context", "build", task, "--stdout"]),
+        Case("context query", ["context", "query", QUERY_TERM]),
+        Case("context query --ranked", ["context", "query", "--ranked", QUERY_TERM]),
+        Case("delete", [], DELETE_ANSWERS, setup=delete_setup),
+        Case("trash list", ["trash", "list"]),
+        Case("check links", ["check", "links"]),
+    ]
+
+
+def summarize(times: list[float]) -> dict:
+    return {
+        "wall_median": statistics.median(times),
+        "wall_min": min(times),
+        "wall_max": max(times),
+        "runs": len(times),
+    }
+
+
+def bench_in_process(root: Path, case: Case, repeat: int) -> dict:
+    """Runs a case through CliRunner in one warm interpreter."""
+    cli = load_cli(root)
+    runner = CliRunner()
+
+    def invoke(run: int):
+        args = case.prepare(root, run)
+        started = time.perf_counter()
+        result = runner.invoke(cli.cli, args, input=case.input_text)
+        elapsed = time.perf_counter() - started
+        if result.exit_code:
+            raise click.ClickException(
+                f"In-process `{' '.join(args)}` failed: {result.output}"
+                f"{result.exception!r}"
+            )
+        return elapsed
+
+    with working_directory(root):
+        first = invoke(0)
+        times = [invoke(run) for run in range(1, repeat + 1)]
+        with CallCounter() as counter:
+            invoke(repeat + 1)
+        tracemalloc.start()
+        invoke(repeat + 2)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {
+        **summarize(times),
+        "first": first,
+        "calls": counter.counts,
+        "peak_alloc_kib": peak // 1024,
+    }
+
+
+def bench_subprocess(root: Path, case: Case, repeat: int) -> dict:
+    """Runs a case as a fresh `python cli.py` process each time."""
+    times, rss = [], []
+    for run in range(repeat):
+        elapsed, max_rss = run_subprocess(
+            root, case.prepare(root, run), case.input_text
+        )
+        times.append(elapsed)
+        rss.append(max_rss)
+    calls = count_subprocess(root, case.prepare(root, repeat), case.input_text)
+    return {**summarize(times), "calls": calls, "max_rss_kib": max(rss)}
+
+
+def import_times(args: list[str], cwd: Path) -> dict:
+    """Runs `python -X importtime ARGS`; returns {module: self time in ms}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": ""},
+    )
+    if result.returncode:
+        raise click.ClickException(
+            f"`{' '.join(args)}` failed: {result.stderr.strip()[-300:]}"
+        )
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        prefix, _, rest = line.partition("import time:")
+        self_us, sep, rest = rest.partition("|")
+        if prefix or not sep or not self_us.strip().isdigit():
+            continue
+        times[rest.partition("|")[2].strip()] = int(self_us) / 1000
+    return times
+
+
+# ---
+# Comparison
+# ---
+def compare_results(old: dict, new: dict, threshold: float) -> list[tuple]:
+    """Returns (case, mode, metric, old, new, regressed) for every shared metric.
+
+    Wall time regresses when the median grew by more than `threshold` and by
+    more than MIN_WALL_DELTA. Call counts are deterministic and use the same
+    relative threshold with MIN_CALLS_DELTA.
+    """
+    rows = []
+    for case, modes in new["results"].items():
+        for mode, metrics in modes.items():
+            before = old["results"].get(case, {}).get(mode)
+            if before is None or "error" in before or "error" in metrics:
+                continue
+            pairs = [("wall_median", before["wall_median"], metrics["wall_median"])]
+            for call, count in sorted(metrics.get("calls", {}).items()):
+                pairs.append((f"calls.{call}", before["calls"].get(call, 0), count))
+            for metric, a, b in pairs:
+                min_delta = (
+                    MIN_WALL_DELTA if metric == "wall_median" else MIN_CALLS_DELTA
+                )
+                regressed = b > a * (1 + threshold) and b - a > min_delta
+                rows.append((case, mode, metric, a, b, regressed))
+    return rows
+
+
+def echo_comparison(rows: list[tuple], verbose: bool) -> int:
+    regressions = 0
+    for case, mode, metric, a, b, regressed in rows:
+        regressions += regressed
+        if not (regressed or verbose or metric == "wall_median"):
+            continue
+        change = f"{(b - a) / a:+.0%}" if a else "new"
+        if metric == "wall_median":
+            line = f"{case:<24} {mode:<11} {metric:<16} {a * 1000:>9.1f}ms {b * 1000:>9.1f}ms {change:>6}"
+        else:
+            line = f"{case:<24} {mode:<11} {metric:<16} {a:>11} {b:>11} {change:>6}"
+        echo(style(line, fg="red") if regressed else line)
+    return regressions
+
+
+def echo_results(results: dict) -> None:
+    def ms(metrics: dict) -> str:
+        if "wall_median" not in metrics:
+            return f"{'-':>12}"
+        return f"{metrics['wall_median'] * 1000:>10.1f}ms"
+
+    echo(f"{'case':<24} {'in-process':>12} {'subprocess':>12} {'stat':>8} {'RSS':>8}")
+    for case, modes in results.items():
+        inproc, sub = modes.get("in_process", {}), modes.get("subprocess", {})
+        stats = sub.get("calls", inproc.get("calls", {})).get("stat", "-")
+        rss = f"{sub['max_rss_kib'] // 1024}MB" if "max_rss_kib" in sub else "-"
+        echo(f"{case:<24} {ms(inproc)} {ms(sub)} {stats:>8} {rss:>8}")
+
+
+# ---
+# Commands
+# ---
+def tree_options(function):
+    options = [
+        click.option("--tasks", default=1000, show_default=True, help="Tasks in all."),
+        click.option(
+            "--status-count",
+            "status_counts",
+            multiple=True,
+            metavar="STATUS=N",
+            help="Tasks in one status, overriding the default spread.",
+        ),
+        click.option(
+            "--fanout", default=3, show_default=True, help="Dependencies per task."
+        ),
+        click.option("--specs", default=200, show_default=True, help="Spec files."),
+        click.option("--adrs", default=50, show_default=True, help="ADR files."),
+        click.option(
+            "--docs", default=500, show_default=True, help="Knowledge-base documents."
+        ),
+        click.option("--trash", default=200, show_default=True, help="Trash items."),
+        click.option("--seed", default=1, show_default=True),
+        click.option(
+            "--cli",
+            "cli_path",
+            type=click.Path(exists=True, dir_okay=False, path_type=Path),
+            default=SCRIPTS_DIR / "cli.py",
+            help="The cli.py to benchmark (default: this repository's).",
+        ),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+def tree_params(kwargs: dict) -> dict:
+    status_counts = {}
+    for item in kwargs.pop("status_counts"):
+        status, sep, count = item.partition("=")
+        if not sep or not count.isdigit():
+            raise click.BadParameter(f"'{item}' is not STATUS=N.")
+        status_counts[status] = int(count)
+    return {**kwargs, "status_counts": status_counts}
+
+
+def source_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SOURCE_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@click.group()
+def main():
+    """Benchmarks the CLI's hot commands against a synthetic project."""
+    pass
+
+
+@main.command()
+@click.argument("directory", type=click.Path(file_okay=False, path_type=Path))
+@tree_options
+def generate(directory: Path, cli_path: Path, **kwargs):
+    """Generates a synthetic project tree in DIRECTORY and keeps it."""
+    if directory.exists() and any(directory.iterdir()):
+        raise click.UsageError(f"'{directory}' is not empty.")
+    directory.mkdir(parents=True, exist_ok=True)
+    info = generate_tree(directory.resolve(), tree_params(kwargs), cli_path)
+    echo(style(f"✅ Generated {directory}: {info['status_counts']}", fg="green"))
+
+
+@main.command()
+@tree_options
+@click.option("--repeat", default=5, show_default=True, help="Timed runs per case.")
+@click.option(
+    "--mode",
+    type=click.Choice(["both", "in-process", "subprocess"]),
+    default="both",
+    show_default=True,
+)
+@click.option("--case", "only", multiple=True, help="Only run these cases.")
+@click.option(
+    "--output", "-o", type=click.Path(dir_okay=False, path_type=Path), help="JSON file."
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Earlier results to check for regressions.",
+)
+@click.option(
+    "--threshold",
+    default=0.25,
+    show_default=True,
+    help="Relative slowdown that counts as a regression.",
+)
+@click.option("--keep", is_flag=True, help="Keep the generated tree.")
+def run(
+    cli_path: Path,
+    repeat: int,
+    mode: str,
+    only: tuple[str, ...],
+    output: Path | None,
+    baseline: Path | None,
+    threshold: float,
+    keep: bool,
+    **kwargs,
+):
+    """Generates a tree, benchmarks every case and reports the results."""
+    params = tree_params(kwargs)
+    root = Path(tempfile.mkdtemp(prefix="codecraft-bench-"))
+    try:
+        started = time.perf_counter()
+        info = generate_tree(root, params, cli_path)
+        echo(
+            style(
+                f"Generated {root} in {time.perf_counter() - started:.1f}s:"
+                f" {info['status_counts']}",
+                fg="cyan",
+            ),
+            err=True,
+        )
+        results = {}
+        for case in build_cases(info["task"]):
+            if only and case.name not in only:
+                continue
+            echo(f"  {case.name}...", err=True)
+            results[case.name] = {}
+            benches = {"in_process": bench_in_process, "subprocess": bench_subprocess}
+            for key, bench in benches.items():
+                if mode not in ("both", key.replace("_", "-")):
+                    continue
+                try:
+                    results[case.name][key] = bench(root, case, repeat)
+                except click.ClickException as e:
+                    # E.g. an older cli.py without this command or option.
+                    echo(
+                        style(f"    skipped: {e.message.strip()[-300:]}", fg="yellow"),
+                        err=True,
+                    )
+                    results[case.name][key] = {"error": e.message}
+    finally:
+        if keep:
+            echo(f"Kept the tree at {root}.", err=True)
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "commit": source_commit(),
+            "cli": str(cli_path),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "repeat": repeat,
+            "tree": {**params, **info},
+        },
+        "results": results,
+    }
+    echo_results(results)
+    if output is not None:
+        output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        echo(style(f"✅ Wrote {output}.", fg="green"), err=True)
+    if baseline is not None:
+        old = json.loads(baseline.read_text(encoding="utf-8"))
+        echo(style(f"\nAgainst {baseline} (threshold {threshold:.0%}):", fg="cyan"))
+        if echo_comparison(compare_results(old, report, threshold), verbose=False):
+            sys.exit(1)
+
+
+@main.command()
+@click.argument("old", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.argument("new", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option("--threshold", default=0.25, show_default=True)
+@click.option("--verbose", "-v", is_flag=True, help="Show every call count too.")
+def compare(old: Path, new: Path, threshold: float, verbose: bool):
+    """Compares two result files; exits 1 if NEW regressed against OLD."""
+    rows = compare_results(
+        json.loads(old.read_text(encoding="utf-8")),
+        json.loads(new.read_text(encoding="utf-8")),
+        threshold,
+    )
+    regressions = echo_comparison(rows, verbose)
+    if regressions:
+        echo(style(f"\n{regressions} regression(s).", fg="red"))
+        sys.exit(1)
+    echo(style("\nNo regressions.", fg="green"))
+
+
+@main.command()
+@click.option(
+    "--cli",
+    "cli_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=SCRIPTS_DIR / "cli.py",
+    help="The cli.py to check (default: this repository's).",
+)
+@click.option("--repeat", default=7, show_default=True, help="Runs per probe.")
+@click.option(
+    "--budget-ms",
+    default=STARTUP_BUDGET_MS,
+    show_default=True,
+    help="Import time allowed on top of importing click.",
+)
+@click.option("--verbose", "-v", is_flag=True, help="Show the slowest imports too.")
+def startup(cli_path: Path, repeat: int, budget_ms: float, verbose: bool):
+    """Checks the light commands' import time; exits 1 if over budget.
+
+    Timings are medians over --repeat runs, after one run that fills the
+    bytecode and config caches.
+    """
+    cwd = cli_path.resolve().parent
+    probes = {"click": ["-c", "import click"]}
+    probes.update(
+        (name, [str(cli_path), *args]) for name, args in STARTUP_PROBES.items()
+    )
+    medians, failures = {}, 0
+    for name, args in probes.items():
+        import_times(args, cwd)
+        runs = [import_times(args, cwd) for _ in range(repeat)]
+        medians[name] = statistics.median(sum(run.values()) for run in runs)
+        if name == "click":
+            echo(f"{'import click':<12} {medians[name]:7.1f} ms")
+            continue
+        overhead = medians[name] - medians["click"]
+        deferred = sorted(set(runs[-1]) & set(STARTUP_DEFERRED_MODULES))
+        failures += (overhead > budget_ms) + bool(deferred)
+        echo(
+            f"{name:<12} {medians[name]:7.1f} ms  "
+            + style(
+                f"{overhead:+.1f} ms (budget {budget_ms:g})",
+                fg="red" if overhead > budget_ms else "green",
+            )
+        )
+        if deferred:
+            echo(style(f"  imported {', '.join(deferred)}", fg="red"))
+        if verbose:
+            for module, ms in sorted(runs[-1].items(), key=lambda i: -i[1])[:10]:
+                echo(f"  {ms:6.1f} ms  {module}")
+    if failures:
+        echo(style(f"\n{failures} start-up check(s) failed.", fg="red"))
+        sys.exit(1)
+    echo(style("\nStart-up within budget.", fg="green"))
+
+
+@main.command()
+@click.option(
+    "--cli",
+    "cli_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=SCRIPTS_DIR / "cli.py",
+    help="The cli.py to check (default: this repository's).",
+)
+def lifecycle(cli_path: Path):
+    """Starts, completes and moves uncommitted tasks; exits 1 on failure.
+
+    The tree gets a bare repository as `origin`, as `start` pulls first.
+    """
+    root = Path(tempfile.mkdtemp(prefix="codecraft-lifecycle-"))
+    os.environ.update(GIT_IDENTITY)
+    params = {
+        "tasks": 20,
+        "status_counts": {},
+        "fanout": 1,
+        "specs": 0,
+        "adrs": 0,
+        "docs": 0,
+        "trash": 0,
+        "seed": 1,
+    }
+    steps = [
+        (["task", "create", "lifecycle-a", "--allow-duplicate"], None),
+        (["start", "lifecycle-a"], "tasks/in_progress/lifecycle-a.md"),
+        (["complete", "lifecycle-a"], "tasks/done/lifecycle-a.md"),
+        (["task", "create", "lifecycle-b", "--allow-duplicate"], None),
+        (["task", "move", "lifecycle-b", "--to", "todo"], "tasks/todo/lifecycle-b.md"),
+    ]
+    failures = 0
+    try:
+        generate_tree(root, params, cli_path)
+        remote = root / ".git" / "lifecycle-origin.git"
+        for args in (
+            ["git", "init", "-q", "--bare", str(remote)],
+            ["git", "remote", "add", "origin", str(remote)],
+            ["git", "push", "-q", "-u", "origin", "main"],
+        ):
+            subprocess.run(args, cwd=root, check=True)
+        for args, committed in steps:
+            try:
+                run_subprocess(root, args)
+            except click.ClickException as e:
+                failures += 1
+                echo(style(f"✗ {' '.join(args)}: {e.message.strip()}", fg="red"))
+                break
+            if committed is not None:
+                dirty = subprocess.run(
+                    ["git", "status", "--porcelain", "--", "tasks"],
+                    cwd=root,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                tracked = subprocess.run(
+                    ["git", "ls-files", "--", committed],
+                    cwd=root,
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                ).stdout
+                if dirty or not tracked:
+                    failures += 1
+                    echo(style(f"✗ {' '.join(args)}: not committed", fg="red"))
+                    echo(dirty, nl=False)
+                    break
+            echo(style(f"✓ {' '.join(args)}", fg="green"))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    if failures:
+        sys.exit(1)
+    echo(style("\nTask lifecycle works.", fg="green"))
+
+
+@main.command(hidden=True)
+@click.argument("report", type=click.Path(path_type=Path))
+@click.argument("root", type=click.Path(path_type=Path))
+@click.argument("args", nargs=-1)
+def child(report: Path, root: Path, args: tuple[str, ...]):
+    """Runs cli.py ARGS with call counting and writes the counts to REPORT."""
+    cli_path = root / ".codecraft" / "scripts" / "cli.py"
+    sys.argv = [str(cli_path), *args]
+    with CallCounter() as counter:
+        try:
+            runpy.run_path(str(cli_path), run_name="__main__")
+        except SystemExit as e:
+            if e.code:
+                raise
+    report.write_text(json.dumps(counter.counts), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
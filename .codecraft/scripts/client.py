@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""Thin client for the CodeCraft CLI daemon.
+
+Usage: python .codecraft/scripts/client.py COMMAND [ARGS]...
+
+Takes the same commands as cli.py. If a daemon started with
+`cli.py daemon start` is listening, the command is forwarded to it together
+with this process's stdin, stdout and stderr, and the client exits with the
+command's exit code. Otherwise the command runs in-process, exactly as
+cli.py would run it.
+
+Start-up time is the whole point of the forwarded path, so only builtin
+modules are imported before the daemon is reached. Messages are
+length-prefixed `marshal` frames (see `send_frame` in codecraft/daemon.py).
+"""
+
+import marshal
+import os
+import sys
+
+# The C core of `socket`; the Python wrapper imports enum, selectors and
+# friends, which would double the client's start-up time.
+import _socket
+
+CLI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+DAEMON_SOCKET_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(CLI_PATH)), ".daemon.sock"
+)
+
+
+def recv_exactly(sock, size: int) -> bytes | None:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+
+def recv_frame(sock) -> dict | None:
+    header = recv_exactly(sock, 4)
+    if header is None:
+        return None
+    body = recv_exactly(sock, int.from_bytes(header, "big"))
+    return None if body is None else marshal.loads(body)
+
+
+def forward(argv: list[str]) -> int | None:
+    """Runs a command in the daemon; returns its exit code, or None if absent."""
+    if not hasattr(_socket, "AF_UNIX"):
+        return None
+    sock = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        sock.connect(DAEMON_SOCKET_PATH)
+        request = marshal.dumps(
+            {"argv": argv, "cwd": os.getcwd(), "env": dict(os.environ)}
+        )
+        fds = b"".join(fd.to_bytes(4, sys.byteorder) for fd in (0, 1, 2))
+        sock.sendmsg(
+            [len(request).to_bytes(4, "big") + request],
+            [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)],
+        )
+    except OSError:
+        sock.close()
+        return None
+
+    pid = None
+    try:
+        while True:
+            try:
+                reply = recv_frame(sock)
+            except KeyboardInterrupt:
+                # Ctrl-C reaches only this process; pass it on to the command.
+                if pid is not None:
+                    import signal
+
+                    os.kill(pid, signal.SIGINT)
+                continue
+            if reply is None:
+                # The daemon went away: before the command started, run it here.
+                return None if pid is None else 1
+            if "pid" in reply:
+                pid = reply["pid"]
+            elif "exit" in reply:
+                return reply["exit"]
+    finally:
+        sock.close()
+
+
+def main() -> None:
+    argv = sys.argv[1:]
+    if argv[:1] != ["daemon"]:
+        code = forward(argv)
+        if code is not None:
+            sys.exit(code)
+    import runpy
+
+    sys.argv = [CLI_PATH, *argv]
+    runpy.run_path(CLI_PATH, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""The CodeCraftAI CLI; cli.py is the entry point."""
@@ -0,0 +1,40 @@
+"""The `config` commands for the local configuration."""
+
+
+import click
+
+from .core import get_config, get_local_config, save_local_config
+
+
+@click.group()
+def config():
+    """Manages local project configuration."""
+    pass
+
+
+@config.command(name="set")
+@click.argument("key")
+@click.argument("value")
+def config_set(key: str, value: str):
+    """Sets a configuration key. e.g., 'set language zh'"""
+    if key == "language":
+        supported = get_config()["languages"]["supported"]
+        if value not in supported:
+            click.echo(
+                click.style(
+                    f"Warning: '{value}' is not an officially supported language ({supported}).",
+                    fg="yellow",
+                )
+            )
+    local_config = get_local_config()
+    local_config[key] = value
+    save_local_config(local_config)
+    click.echo(click.style(f"✅ Config set: {key} = {value}", fg="green"))
+
+
+@config.command(name="get")
+@click.argument("key")
+def config_get(key: str):
+    """Gets a configuration key."""
+    value = get_local_config().get(key)
+    click.echo(f"{key} = {value}" if value else f"Key '{key}' not set.")
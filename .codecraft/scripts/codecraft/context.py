@@ -0,0 +1,1089 @@
+"""The knowledge-base search index, the context builder and `context` commands."""
+
+import array
+import functools
+import hashlib
+import math
+import os
+import pickle
+import re
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+import click
+from click import Abort, echo, style
+
+from .core import (
+    CONTEXT_CACHE_PATH,
+    CONTEXT_CACHE_VERSION,
+    CONTEXT_LINK_RE,
+    CONTEXT_MIN_LINES,
+    PROJECT_ROOT,
+    get_config,
+    get_user_lang,
+    span,
+)
+from .index import find_task_file, parse_dependencies, read_task_header
+from .process import StepRunner
+
+# The CJK character classes take milliseconds to compile, so the search
+# constants live here rather than in core, which every command imports.
+SEARCH_INDEX_PATH = PROJECT_ROOT / ".codecraft" / ".search_index.db"
+SEARCH_INDEX_VERSION = "1"
+KNOWLEDGE_BASE_DIRS = ("docs", "project_logs", "src")
+SEARCH_SUFFIXES = (".md", ".txt", ".rst", ".py", ".yml", ".yaml", ".json", ".toml")
+SEARCH_SKIP_DIRS = {"node_modules", "__pycache__"}
+MAX_SEARCH_FILE_BYTES = 1 << 20
+_CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+CJK_RUN_RE = re.compile(f"[{_CJK_CHARS}]")
+SEARCH_TOKEN_RE = re.compile(f"[{_CJK_CHARS}]+|[^\\W{_CJK_CHARS}]+")
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+# ---
+# Search Index
+# ---
+# An inverted index over the knowledge base for `context query --ranked`.
+# Documents are re-tokenized only when their mtime or size changes, and
+# queries are scored with BM25 inside SQLite. Each posting carries its
+# document's length so scoring is a single range scan over the posting list.
+def tokenize(text: str) -> list[str]:
+    """Splits text into lowercase word tokens and CJK character bigrams.
+
+    CJK text has no spaces between words, so each run of CJK characters is
+    indexed as overlapping bigrams, which match any query word of two or more
+    characters without a dictionary.
+    """
+    tokens = []
+    for match in SEARCH_TOKEN_RE.finditer(text.lower()):
+        token = match.group()
+        if not CJK_RUN_RE.match(token):
+            tokens.append(token)
+        elif len(token) == 1:
+            tokens.append(token)
+        else:
+            tokens.extend(token[i : i + 2] for i in range(len(token) - 1))
+    return tokens
+
+
+def open_search_index(db_path: Path = SEARCH_INDEX_PATH) -> sqlite3.Connection:
+    """Opens the search index, resetting it if it is corrupt or outdated."""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        db_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+        row = None
+    if row is None or row[0] != SEARCH_INDEX_VERSION:
+        with conn:
+            for table in ("dirs", "docs", "terms", "postings"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(
+                "CREATE TABLE dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL)"
+            )
+            conn.execute(
+                """CREATE TABLE docs (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    dir TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    terms BLOB NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX docs_dir ON docs (dir)")
+            conn.execute(
+                """CREATE TABLE terms (
+                    id INTEGER PRIMARY KEY,
+                    term TEXT UNIQUE NOT NULL,
+                    df INTEGER NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE postings (
+                    term_id INTEGER NOT NULL,
+                    doc_id INTEGER NOT NULL,
+                    tf INTEGER NOT NULL,
+                    dl INTEGER NOT NULL,
+                    PRIMARY KEY (term_id, doc_id)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute("DELETE FROM meta")
+            conn.execute(
+                "INSERT INTO meta VALUES ('version', ?)", (SEARCH_INDEX_VERSION,)
+            )
+    return conn
+
+
+def scan_knowledge_base(known_dirs: dict, full: bool):
+    """Walks the knowledge base, yielding what may have changed.
+
+    Yields ("dir", rel_dir, mtime_ns) for every directory and
+    ("file", rel_dir, rel_path, mtime_ns, size) for every searchable file in
+    directories that were listed. Unless `full` is set, a directory whose
+    mtime matches `known_dirs` is not listed again: files added, removed or
+    replaced by rename are still noticed, in-place edits wait for a full scan.
+    """
+    children = {}
+    for rel_dir in known_dirs:
+        children.setdefault(rel_dir.rpartition("/")[0], []).append(rel_dir)
+    stack = [d.strip("/") for d in KNOWLEDGE_BASE_DIRS]
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            mtime_ns = os.stat(PROJECT_ROOT / rel_dir).st_mtime_ns
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        yield "dir", rel_dir, mtime_ns
+        if not full and known_dirs.get(rel_dir) == mtime_ns:
+            stack.extend(children.get(rel_dir, ()))
+            continue
+        try:
+            entries = os.scandir(PROJECT_ROOT / rel_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(".") or entry.name in SEARCH_SKIP_DIRS:
+                    continue
+                rel_path = f"{rel_dir}/{entry.name}"
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(rel_path)
+                elif entry.is_file() and entry.name.endswith(SEARCH_SUFFIXES):
+                    stat = entry.stat()
+                    if stat.st_size <= MAX_SEARCH_FILE_BYTES:
+                        yield "file", rel_dir, rel_path, stat.st_mtime_ns, stat.st_size
+
+
+def _read_document(rel_path: str) -> str:
+    with open(PROJECT_ROOT / rel_path, encoding="utf-8", errors="replace") as f:
+        return f.read()
+
+
+def _tokenize_batch(rel_paths: list[str]) -> list[tuple]:
+    results = []
+    for rel_path in rel_paths:
+        try:
+            tokens = tokenize(_read_document(rel_path))
+        except OSError:
+            tokens = None
+        results.append((rel_path, tokens))
+    return results
+
+
+def _remove_search_docs(conn: sqlite3.Connection, doc_ids: list[int]) -> None:
+    for doc_id in doc_ids:
+        (blob,) = conn.execute(
+            "SELECT terms FROM docs WHERE id = ?", (doc_id,)
+        ).fetchone()
+        term_ids = array.array("q", blob)
+        conn.executemany(
+            "DELETE FROM postings WHERE term_id = ? AND doc_id = ?",
+            [(term_id, doc_id) for term_id in term_ids],
+        )
+        conn.executemany(
+            "UPDATE terms SET df = df - 1 WHERE id = ?", [(t,) for t in term_ids]
+        )
+        conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+
+def _index_search_docs(conn: sqlite3.Connection, changed: dict) -> None:
+    terms = dict(conn.execute("SELECT term, id FROM terms"))
+    df = {}
+    postings = []
+
+    def flush():
+        # Inserting in key order keeps the postings B-tree writes sequential.
+        postings.sort()
+        conn.executemany("INSERT INTO postings VALUES (?, ?, ?, ?)", postings)
+        postings.clear()
+
+    paths = sorted(changed)
+    batches = [paths[i : i + 64] for i in range(0, len(paths), 64)]
+    with ThreadPoolExecutor() as executor:
+        for results in executor.map(_tokenize_batch, batches):
+            for rel_path, tokens in results:
+                if tokens is None:
+                    continue
+                rel_dir, mtime_ns, size = changed[rel_path]
+                counts = {}
+                for token in tokens:
+                    counts[token] = counts.get(token, 0) + 1
+                for term in [t for t in counts if t not in terms]:
+                    terms[term] = conn.execute(
+                        "INSERT INTO terms (term, df) VALUES (?, 0)", (term,)
+                    ).lastrowid
+                term_ids = [terms[t] for t in counts]
+                doc_id = conn.execute(
+                    "INSERT INTO docs (path, dir, mtime_ns, size, length, terms)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        rel_path,
+                        rel_dir,
+                        mtime_ns,
+                        size,
+                        len(tokens),
+                        array.array("q", term_ids).tobytes(),
+                    ),
+                ).lastrowid
+                for term_id, tf in zip(term_ids, counts.values()):
+                    postings.append((term_id, doc_id, tf, len(tokens)))
+                    df[term_id] = df.get(term_id, 0) + 1
+                if len(postings) >= 200_000:
+                    flush()
+    flush()
+    conn.executemany(
+        "UPDATE terms SET df = df + ? WHERE id = ?", [(n, t) for t, n in df.items()]
+    )
+
+
+def refresh_search_index(
+    conn: sqlite3.Connection, full: bool = True
+) -> tuple[int, int, int]:
+    """Brings the index in line with the knowledge base.
+
+    Returns (files indexed, files re-indexed now, files removed). With
+    `full` unset, only directories whose mtime changed are re-listed (see
+    scan_knowledge_base), which keeps the check cheap enough to run before
+    every query.
+    """
+    known_dirs = dict(conn.execute("SELECT path, mtime_ns FROM dirs"))
+    seen_dirs, listed = {}, {}
+    with span("scan knowledge base", full=full) as scan:
+        for item in scan_knowledge_base(known_dirs, full):
+            if item[0] == "dir":
+                _, rel_dir, mtime_ns = item
+                seen_dirs[rel_dir] = mtime_ns
+                if full or known_dirs.get(rel_dir) != mtime_ns:
+                    listed.setdefault(rel_dir, {})
+                continue
+            _, rel_dir, rel_path, mtime_ns, size = item
+            listed[rel_dir][rel_path] = (mtime_ns, size)
+        scan.set(dirs=len(seen_dirs), listed=len(listed))
+
+    changed, stale, replaced = {}, [], 0
+    gone_dirs = [d for d in known_dirs if d not in seen_dirs]
+    for rel_dir in [*listed, *gone_dirs]:
+        files = listed.get(rel_dir, {})
+        for doc_id, rel_path, mtime_ns, size in conn.execute(
+            "SELECT id, path, mtime_ns, size FROM docs WHERE dir = ?", (rel_dir,)
+        ).fetchall():
+            current = files.pop(rel_path, None)
+            if current == (mtime_ns, size):
+                continue
+            stale.append(doc_id)
+            if current is not None:
+                replaced += 1
+                changed[rel_path] = (rel_dir, *current)
+        changed.update((path, (rel_dir, *stat)) for path, stat in files.items())
+
+    if stale or changed or seen_dirs != known_dirs:
+        with conn, span("index documents", files=len(changed), removed=len(stale)):
+            _remove_search_docs(conn, stale)
+            conn.executemany(
+                "DELETE FROM dirs WHERE path = ?", [(d,) for d in gone_dirs]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO dirs VALUES (?, ?)", seen_dirs.items()
+            )
+            _index_search_docs(conn, changed)
+            count, avg_length = conn.execute(
+                "SELECT COUNT(*), AVG(length) FROM docs"
+            ).fetchone()
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [("doc_count", count), ("avg_length", avg_length or 0)],
+            )
+    (total,) = conn.execute(
+        "SELECT value FROM meta WHERE key = 'doc_count'"
+    ).fetchone() or (0,)
+    return total, len(changed), len(stale) - replaced
+
+
+def search_index(
+    conn: sqlite3.Connection, query: str, limit: int = 10
+) -> list[tuple[str, float]]:
+    """Returns up to `limit` (path, BM25 score) pairs, best first."""
+    tokens = set(tokenize(query))
+    if not tokens:
+        return []
+    meta = dict(conn.execute("SELECT key, value FROM meta"))
+    doc_count = int(meta.get("doc_count") or 0)
+    avg_length = float(meta.get("avg_length") or 0) or 1.0
+    weights = []
+    for term_id, df in conn.execute(
+        f"SELECT id, df FROM terms WHERE term IN ({', '.join('?' * len(tokens))})"
+        " AND df > 0",
+        tuple(tokens),
+    ):
+        weights.append((term_id, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))))
+    if not weights:
+        return []
+    # Terms found in most documents barely move the ranking but dominate the
+    # cost of scoring; like stopwords, drop them when rarer terms remain.
+    rare = [(term_id, idf) for term_id, idf in weights if idf >= math.log(2)]
+    weights = rare or weights
+
+    k1, b = BM25_K1, BM25_B
+    term_score = f"q.idf * p.tf * {k1 + 1} / (p.tf + {k1} * (1 - {b} + {b} * p.dl / ?))"
+    # A single term needs no aggregation, which saves sorting every match.
+    score = term_score if len(weights) == 1 else f"SUM({term_score})"
+    group_by = "" if len(weights) == 1 else "GROUP BY p.doc_id"
+    values = ", ".join("(?, ?)" for _ in weights)
+    return conn.execute(
+        f"""WITH q (term_id, idf) AS (VALUES {values}),
+        top AS (
+            SELECT p.doc_id, {score} AS score
+            FROM q JOIN postings p ON p.term_id = q.term_id
+            {group_by}
+            ORDER BY score DESC
+            LIMIT ?
+        )
+        SELECT d.path, top.score FROM top JOIN docs d ON d.id = top.doc_id
+        ORDER BY top.score DESC""",
+        (*[v for weight in weights for v in weight], avg_length, limit),
+    ).fetchall()
+
+
+def find_snippets(rel_path: str, query: str, limit: int = 3) -> list[tuple]:
+    """Returns up to `limit` (line number, line) pairs matching the query."""
+    tokens = set(tokenize(query))
+    scored = []
+    try:
+        lines = _read_document(rel_path).splitlines()
+    except OSError:
+        return []
+    for number, line in enumerate(lines, 1):
+        hits = len(tokens.intersection(tokenize(line)))
+        if hits:
+            scored.append((-hits, number, line.strip()))
+    return [(number, line) for _, number, line in sorted(scored)[:limit]]
+
+
+# ---
+# Context Builder
+# ---
+# `context build` gathers fragments (the task, its specs, dependencies, ADRs,
+# OpenSpec changes and linked documents), fits them into a budget in
+# priority order and renders them by section. Each input file is parsed once
+# per content hash; the hash is looked up by (mtime, size), so an unchanged
+# rebuild only stats its inputs. Fragment bodies are never held in memory:
+# the cache keeps sizes, link targets and metadata, and output is copied
+# from the source files line by line.
+CONTEXT_SECTIONS = {
+    "task": "Core Task",
+    "spec": "Specifications",
+    "dependency": "Dependencies",
+    "openspec": "OpenSpec Changes",
+    "adr": "Architecture Decisions",
+    "summary": "Feature Summary",
+    "linked": "Related Documents",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly counts LLM tokens: ~4 ASCII characters or 1 CJK character each."""
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def iter_lines(path: Path):
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+class ContextCache:
+    """Parsed context fragments keyed by content hash, persisted with pickle.
+
+    Identical files share a fragment, so it keeps link targets as written;
+    `links` resolves them against each file's own directory.
+    """
+
+    def __init__(self, path: Path = CONTEXT_CACHE_PATH):
+        self.path = path
+        self.files, self.fragments, self.outputs = {}, {}, {}
+        self.resolved = {}  # rel_path -> links, for this run only
+        self.checked = set()  # rel_paths stat'ed by this run
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == CONTEXT_CACHE_VERSION:
+                self.files = data["files"]
+                self.fragments = data["fragments"]
+                self.outputs = data["outputs"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+            pass
+        self.dirty = False
+
+    def load(self, path: Path) -> dict | None:
+        """Returns {digest, tokens, bytes, targets, metadata} for a file, or None."""
+        rel_path = path.relative_to(PROJECT_ROOT).as_posix()
+        self.checked.add(rel_path)
+        try:
+            stat = path.stat()
+        except OSError:
+            if self.files.pop(rel_path, None) is not None:
+                self.dirty = True
+            return None
+        entry = self.files.get(rel_path)
+        if entry and entry[:2] == (stat.st_mtime_ns, stat.st_size):
+            fragment = self.fragments.get(entry[2])
+            if fragment is not None:
+                return fragment
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest = digest.hexdigest()
+        fragment = self.fragments.get(digest)
+        if fragment is None:
+            fragment = {"digest": digest, "tokens": 0, "bytes": 0, "targets": []}
+            for line in iter_lines(path):
+                fragment["tokens"] += estimate_tokens(line)
+                fragment["bytes"] += len(line.encode("utf-8"))
+                for target in extract_link_targets(line):
+                    if target not in fragment["targets"]:
+                        fragment["targets"].append(target)
+            try:
+                fragment["metadata"] = read_task_header(path)
+            except UnicodeDecodeError:
+                fragment["metadata"] = {}
+            fragment["mentions"] = {}
+            self.fragments[digest] = fragment
+        self.files[rel_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        self.dirty = True
+        return fragment
+
+    def links(self, rel_path: str, fragment: dict) -> list[str]:
+        """Returns the files that the file at `rel_path` links to."""
+        if rel_path not in self.resolved:
+            self.resolved[rel_path] = resolve_links(
+                PROJECT_ROOT / rel_path, fragment["targets"]
+            )
+        return self.resolved[rel_path]
+
+    def mentions(self, path: Path, needle: str) -> bool:
+        """Tells whether a file contains `needle`, caching the answer."""
+        fragment = self.load(path)
+        if fragment is None:
+            return False
+        if needle not in fragment["mentions"]:
+            fragment["mentions"][needle] = any(
+                needle in line for line in iter_lines(path)
+            )
+            self.dirty = True
+        return fragment["mentions"][needle]
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        # Drop files deleted since they were cached, and their fragments.
+        for rel_path in self.files.keys() - self.checked:
+            if not os.path.lexists(PROJECT_ROOT / rel_path):
+                del self.files[rel_path]
+        live = {entry[2] for entry in self.files.values()}
+        data = {
+            "version": CONTEXT_CACHE_VERSION,
+            "files": self.files,
+            "fragments": {d: f for d, f in self.fragments.items() if d in live},
+            "outputs": self.outputs,
+        }
+        # Unique per process, so concurrent builds never write one temp file.
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+
+
+def extract_link_targets(text: str) -> list[str]:
+    """Returns the Markdown files a text points to, as written."""
+    return [
+        (match.group(1) or match.group(2)).split("#")[0]
+        for match in CONTEXT_LINK_RE.finditer(text)
+    ]
+
+
+def resolve_links(path: Path, targets: list[str]) -> list[str]:
+    """Returns project-relative paths of the `targets` that exist.
+
+    A target is looked up next to the file at `path`, then from the project
+    root.
+    """
+    links = []
+    for target in targets:
+        for base in (path.parent, PROJECT_ROOT):
+            candidate = Path(os.path.normpath(base / target))
+            if candidate.is_relative_to(PROJECT_ROOT) and candidate.is_file():
+                rel_path = candidate.relative_to(PROJECT_ROOT).as_posix()
+                if rel_path not in links:
+                    links.append(rel_path)
+                break
+    return links
+
+
+def find_openspec_changes(
+    task_title: str, sources: list[Path], cache: ContextCache
+) -> list[Path]:
+    """Finds OpenSpec change directories named after or mentioned with a task."""
+    changes_dir = PROJECT_ROOT / "openspec" / "changes"
+    if not changes_dir.is_dir():
+        return []
+    found = []
+    for spec_path in sorted(changes_dir.glob("**/spec.md")):
+        name = spec_path.parent.relative_to(changes_dir).as_posix()
+        if spec_path.parent.name == task_title or any(
+            cache.mentions(source, name) for source in sources
+        ):
+            found.append(spec_path.parent)
+    return found
+
+
+class ContextBuilder:
+    """Collects prioritised fragments for a task.
+
+    Every fragment found is passed to `on_fragment` as a
+    (priority, kind, rel_path, note, fragment) tuple, in the order found.
+    """
+
+    def __init__(self, task_title: str, depth: int, cache: ContextCache, on_fragment):
+        self.task_title = task_title
+        self.depth = depth
+        self.cache = cache
+        self.on_fragment = on_fragment
+        self.found = []  # (rel_path, fragment), for following links
+        self.seen = set()
+        self.timings = {}
+
+    def add(self, kind: str, path: Path, priority: int, note: str = "") -> dict | None:
+        rel_path = path.relative_to(PROJECT_ROOT).as_posix()
+        if rel_path in self.seen:
+            return None
+        started = time.perf_counter()
+        fragment = self.cache.load(path)
+        timing = self.timings.setdefault(kind, [0.0, 0])
+        timing[0] += time.perf_counter() - started
+        timing[1] += 1
+        if fragment is None:
+            return None
+        self.seen.add(rel_path)
+        self.found.append((rel_path, fragment))
+        self.on_fragment((priority, kind, rel_path, note, fragment))
+        return fragment
+
+    def specs_for(self, title: str) -> list[Path]:
+        specs_dir = PROJECT_ROOT / get_config()["directories"]["specs"]
+        langs = [get_user_lang()] + [
+            lang
+            for lang in get_config()["languages"]["supported"]
+            if lang != get_user_lang()
+        ]
+        return [
+            specs_dir / f"{title}.{lang}.md"
+            for lang in langs
+            if (specs_dir / f"{title}.{lang}.md").exists()
+        ]
+
+    def collect(self, task_path: Path) -> None:
+        task = self.add("task", task_path, 0)
+        for spec_path in self.specs_for(self.task_title):
+            self.add("spec", spec_path, 1)
+
+        # Dependencies, breadth first; nearer ones rank higher.
+        frontier = [(self.task_title, task)]
+        visited = {self.task_title}
+        for level in range(1, self.depth + 1):
+            next_frontier = []
+            for title, fragment in frontier:
+                deps = parse_dependencies(
+                    fragment["metadata"].get("dependencies", "[]")
+                )
+                for dep in sorted(deps - visited):
+                    visited.add(dep)
+                    dep_path = find_task_file(dep)
+                    if dep_path is None:
+                        continue
+                    note = f"dependency of `{title}`"
+                    dep_fragment = self.add("dependency", dep_path, 1 + level, note)
+                    if dep_fragment is not None:
+                        next_frontier.append((dep, dep_fragment))
+                    for spec_path in self.specs_for(dep):
+                        self.add("dependency", spec_path, 2 + level, f"spec of `{dep}`")
+            frontier = next_frontier
+
+        started = time.perf_counter()
+        sources = [PROJECT_ROOT / rel_path for rel_path, _ in self.found]
+        changes = find_openspec_changes(self.task_title, sources, self.cache)
+        self.timings.setdefault("openspec", [0.0, 0])[0] += (
+            time.perf_counter() - started
+        )
+        for change_dir in changes:
+            for path in sorted(change_dir.glob("*.md")):
+                self.add("openspec", path, 3)
+
+        # ADRs linked from the gathered documents or mentioning the task.
+        started = time.perf_counter()
+        adr_dir = PROJECT_ROOT / get_config()["directories"]["adr"]
+        linked = {
+            link
+            for rel_path, fragment in self.found
+            for link in self.cache.links(rel_path, fragment)
+        }
+        adrs = [
+            path
+            for path in sorted(adr_dir.glob("*.md"))
+            if not path.stem.startswith("template")
+            and (
+                path.relative_to(PROJECT_ROOT).as_posix() in linked
+                or self.cache.mentions(path, self.task_title)
+            )
+        ]
+        self.timings.setdefault("adr", [0.0, 0])[0] += time.perf_counter() - started
+        for path in adrs:
+            self.add("adr", path, 4)
+
+        summary_path = PROJECT_ROOT / "docs/summaries" / f"{self.task_title}.en.md"
+        if summary_path.exists():
+            self.add("summary", summary_path, 4)
+
+        # Documents linked from anything gathered so far, transitively.
+        frontier = list(self.found)
+        for level in range(1, self.depth + 1):
+            next_frontier = []
+            for source, fragment in frontier:
+                for link in self.cache.links(source, fragment):
+                    note = f"linked from `{source}`"
+                    if self.add("linked", PROJECT_ROOT / link, 4 + level, note):
+                        next_frontier.append(self.found[-1])
+            frontier = next_frontier
+
+
+class ContextBudget:
+    """Hands out an approximate token and/or byte budget to fragments."""
+
+    def __init__(self, max_tokens: int | None, max_bytes: int | None):
+        self.tokens = max_tokens if max_tokens is not None else float("inf")
+        self.bytes = max_bytes if max_bytes is not None else float("inf")
+
+    def take(self, fragment: dict) -> str:
+        """Returns "whole", "cut" or "omit" for a fragment.
+
+        Whole fragments are charged here; a fragment that does not fit whole
+        is cut at a line boundary while it is written (see fits()).
+        """
+        if fragment["tokens"] <= self.tokens and fragment["bytes"] <= self.bytes:
+            self.tokens -= fragment["tokens"]
+            self.bytes -= fragment["bytes"]
+            return "whole"
+        if self.tokens <= 0 or self.bytes <= 0:
+            return "omit"
+        return "cut"
+
+    def fits(self, line: str) -> bool:
+        """Charges one line if it fits in what is left."""
+        tokens, size = estimate_tokens(line), len(line.encode("utf-8"))
+        if tokens > self.tokens or size > self.bytes:
+            return False
+        self.tokens -= tokens
+        self.bytes -= size
+        return True
+
+    def refund(self, lines: list[str]) -> None:
+        self.tokens += sum(estimate_tokens(line) for line in lines)
+        self.bytes += sum(len(line.encode("utf-8")) for line in lines)
+
+    def exhaust(self) -> None:
+        self.tokens = self.bytes = 0
+
+
+def plan_context(found: list, budget: ContextBudget) -> tuple[list, list]:
+    """Decides which fragments to include, highest priority first.
+
+    Returns (plan, omitted): `plan` holds (item, cut) pairs in section order,
+    where `cut` is None for whole fragments and otherwise the budget left for
+    the one fragment that is cut to fit. A fragment too big for what is left
+    is cut only if its first CONTEXT_MIN_LINES lines fit; the rest are
+    omitted and only listed by path.
+    """
+    chosen, omitted = [], []
+    for item in sorted(found, key=lambda item: item[0]):
+        _, kind, rel_path, _, fragment = item
+        decision = budget.take(fragment)
+        if decision == "whole":
+            chosen.append((item, None))
+            continue
+        if decision == "cut":
+            probe = ContextBudget(budget.tokens, budget.bytes)
+            lines, kept = iter_lines(PROJECT_ROOT / rel_path), 0
+            for line in lines:
+                if kept == CONTEXT_MIN_LINES or not probe.fits(line):
+                    break
+                kept += 1
+            lines.close()
+            if kept == CONTEXT_MIN_LINES:
+                chosen.append((item, ContextBudget(budget.tokens, budget.bytes)))
+                budget.exhaust()
+                continue
+        omitted.append((kind, rel_path, fragment["tokens"]))
+    order = {item[2]: n for n, item in enumerate(found)}
+    sections = list(CONTEXT_SECTIONS)
+    chosen.sort(key=lambda c: (sections.index(c[0][1]), order[c[0][2]]))
+    return chosen, omitted
+
+
+class ContextWriter:
+    """Renders fragments to text streams, optionally split into parts.
+
+    Parts hold at most `chunk_size` bytes and break at line boundaries
+    (overlong lines are split). `open_part(n)` returns the stream for part
+    `n`, starting at 1.
+    """
+
+    def __init__(self, open_part, chunk_size: int | None = None):
+        self.open_part = open_part
+        self.chunk_size = chunk_size
+        self.part = 0
+        self.stream = None
+        self.used = 0
+        self.section = None
+        self.sections = 0
+
+    def write(self, text: str) -> None:
+        for line in text.splitlines(keepends=True):
+            data = line.encode("utf-8")
+            while self.chunk_size and self.used + len(data) > self.chunk_size:
+                if self.used:
+                    self._next_part()
+                    continue
+                # A single line longer than a part: split it by characters.
+                head = data[: self.chunk_size].decode("utf-8", errors="ignore")
+                self._emit(head)
+                line = line[len(head) :]
+                data = line.encode("utf-8")
+                self._next_part()
+            if data:
+                self._emit(line)
+
+    def _emit(self, text: str) -> None:
+        if self.stream is None:
+            self._next_part()
+        self.stream.write(text)
+        self.used += len(text.encode("utf-8"))
+
+    def _next_part(self) -> None:
+        self.part += 1
+        self.stream = self.open_part(self.part)
+        self.used = 0
+
+    def write_fragment(
+        self, kind: str, rel_path: str, note: str, budget: ContextBudget | None
+    ) -> bool:
+        """Copies a fragment under its section heading, line by line.
+
+        With a budget, lines are copied only while they fit, and a fragment
+        that would keep fewer than CONTEXT_MIN_LINES lines is skipped.
+        Returns whether anything was written.
+        """
+        lines = iter_lines(PROJECT_ROOT / rel_path)
+        head, truncated = [], False
+        for line in lines:
+            if budget is not None and not budget.fits(line):
+                truncated = True
+                break
+            head.append(line)
+            if len(head) >= CONTEXT_MIN_LINES:
+                break
+        if truncated and len(head) < CONTEXT_MIN_LINES:
+            budget.refund(head)
+            return False
+
+        if kind != self.section:
+            self.section = kind
+            self.sections += 1
+            self.write(f"## {self.sections}. {CONTEXT_SECTIONS[kind]}\n\n")
+        suffix = f" ({note})" if note else ""
+        self.write(f"### `{rel_path}`{suffix}\n\n" + "".join(head))
+        last = head[-1] if head else ""
+        if not truncated:
+            for line in lines:
+                if budget is not None and not budget.fits(line):
+                    truncated = True
+                    break
+                self.write(line)
+                last = line
+        lines.close()
+        if last and not last.endswith("\n"):
+            self.write("\n")
+        if truncated:
+            self.write("\n> _[truncated to fit the context budget]_\n")
+        self.write("\n")
+        return True
+
+    def write_omitted(self, omitted: list) -> None:
+        if not omitted:
+            return
+        self.write("## Omitted (over budget)\n\n")
+        for kind, rel_path, tokens in omitted:
+            self.write(f"- `{rel_path}` ({kind}, ~{tokens} tokens)\n")
+
+
+@click.group()
+def context():
+    """Commands for the Context Engineering Engine."""
+    pass
+
+
+@context.command(name="build")
+@click.argument("task_title")
+@click.option(
+    "--max-tokens",
+    type=int,
+    help="Approximate token budget [default: context.max_tokens].",
+)
+@click.option("--max-bytes", type=int, help="Byte budget for the context.")
+@click.option(
+    "--depth",
+    type=int,
+    help="How far to follow dependencies and links [default: context.depth].",
+)
+@click.option(
+    "--output",
+    "-o",
+    type=click.Path(dir_okay=False, allow_dash=True),
+    default=".temp_context.md",
+    show_default=True,
+    help="File to write, relative to the project root, or '-' for stdout.",
+)
+@click.option("--stdout", "to_stdout", is_flag=True, help="Same as '--output -'.")
+@click.option(
+    "--stream",
+    is_flag=True,
+    help="Write fragments as they are found instead of grouped by section.",
+)
+@click.option(
+    "--chunk-size",
+    type=click.IntRange(min=256),
+    help="Split the output into parts of at most this many bytes.",
+)
+def context_build(
+    task_title: str,
+    max_tokens: int | None,
+    max_bytes: int | None,
+    depth: int | None,
+    output: str,
+    to_stdout: bool,
+    stream: bool,
+    chunk_size: int | None,
+):
+    """Builds a context document for an AI agent to start a task.
+
+    Fragments are copied from their source files line by line, so memory use
+    stays flat however large the knowledge base is. With --chunk-size, a
+    file is written as NAME.partNNN.md and parts on stdout are separated by
+    `<!-- context part N -->` lines.
+    """
+    to_stdout = to_stdout or output == "-"
+    # Status lines go to stderr when stdout carries the document.
+    log = functools.partial(echo, err=to_stdout)
+    log(style(f"🚀 Building context for task: '{task_title}'...", fg="cyan"))
+
+    task_file = find_task_file(task_title)
+    if not task_file:
+        echo(style(f"Error: Task '{task_title}' not found.", fg="red"), err=True)
+        raise Abort()
+
+    settings = get_config().get("context", {})
+    if max_tokens is None:
+        max_tokens = settings.get("max_tokens")
+    if max_bytes is None:
+        max_bytes = settings.get("max_bytes")
+    if depth is None:
+        depth = settings.get("depth", 2)
+
+    output_path = None if to_stdout else PROJECT_ROOT / output
+    streams = []
+
+    def open_part(number: int):
+        if to_stdout:
+            if number > 1:
+                sys.stdout.write(f"\n<!-- context part {number} -->\n")
+            return sys.stdout
+        path = output_path
+        if chunk_size:
+            path = path.with_name(f"{path.stem}.part{number:03d}{path.suffix}")
+        if streams:
+            streams[-1].close()
+        streams.append(open(path, "w", encoding="utf-8"))
+        return streams[-1]
+
+    with span("load context cache"):
+        cache = ContextCache()
+    budget = ContextBudget(max_tokens, max_bytes)
+    writer = ContextWriter(open_part, chunk_size)
+    included, omitted = [], []
+
+    def write_now(item: tuple) -> None:
+        _, kind, rel_path, note, fragment = item
+        decision = budget.take(fragment)
+        cut = budget if decision == "cut" else None
+        if decision != "omit" and writer.write_fragment(kind, rel_path, note, cut):
+            included.append(item)
+            if cut is not None:
+                budget.exhaust()
+        else:
+            omitted.append((kind, rel_path, fragment["tokens"]))
+
+    if output_path is not None:
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+    if chunk_size and output_path is not None:
+        for stale in output_path.parent.glob(
+            f"{output_path.stem}.part[0-9][0-9][0-9]{output_path.suffix}"
+        ):
+            stale.unlink()
+
+    status = "built"
+    try:
+        if stream:
+            writer.write(f"# AI CONTEXT FOR: {task_title}\n\n")
+            builder = ContextBuilder(task_title, depth, cache, write_now)
+            with span("collect fragments", stream=True):
+                builder.collect(task_file)
+            started = time.perf_counter()
+        else:
+            found = []
+            builder = ContextBuilder(task_title, depth, cache, found.append)
+            with span("collect fragments", stream=False) as collect:
+                builder.collect(task_file)
+                collect.set(fragments=len(found))
+            started = time.perf_counter()
+            plan, omitted = plan_context(found, budget)
+            included = [item for item, _ in plan]
+            key = hashlib.blake2b(
+                repr(
+                    [
+                        (item[2], item[3], item[4]["digest"], cut and cut.tokens)
+                        for item, cut in plan
+                    ]
+                    + [omitted, max_tokens, max_bytes, chunk_size, output]
+                ).encode("utf-8"),
+                digest_size=16,
+            ).hexdigest()
+            if (
+                output_path is not None
+                and not chunk_size
+                and cache.outputs.get(task_title) == key
+                and output_path.exists()
+            ):
+                status = "unchanged"
+            else:
+                writer.write(f"# AI CONTEXT FOR: {task_title}\n\n")
+                for (_, kind, rel_path, note, _), cut in plan:
+                    writer.write_fragment(kind, rel_path, note, cut)
+                cache.outputs[task_title] = key
+                cache.dirty = True
+        if status == "built":
+            writer.write_omitted(omitted)
+    finally:
+        for f in streams:
+            f.close()
+    builder.timings["write"] = [time.perf_counter() - started, 0]
+    with span("save context cache"):
+        cache.save()
+
+    log("Sources:")
+    for kind, (seconds, files) in builder.timings.items():
+        count = f"{files} file(s)" if files else ""
+        log(f"  {kind:<12} {count:<12} {seconds * 1000:7.1f} ms")
+    tokens = sum(item[4]["tokens"] for item in included)
+    log(
+        f"Included {len(included)} fragment(s), ~{tokens} tokens"
+        + (f"; omitted {len(omitted)} over budget" if omitted else "")
+        + "."
+    )
+    if to_stdout:
+        return
+    parts = f" in {writer.part} part(s)" if chunk_size else ""
+    log(style(f"✅ Context {status} at: {output}{parts}", fg="green"))
+    log("AI agent should now read this file to begin its work.")
+
+
+@context.command(name="index")
+@click.option("--rebuild", is_flag=True, help="Discard the index and start over.")
+def context_index(rebuild: bool):
+    """Updates the full-text index used by 'context query --ranked'."""
+    if rebuild:
+        SEARCH_INDEX_PATH.unlink(missing_ok=True)
+    with closing(open_search_index()) as conn:
+        total, updated, removed = refresh_search_index(conn)
+    echo(
+        style(
+            f"✅ Search index covers {total} file(s) "
+            f"({updated} indexed, {removed} removed).",
+            fg="green",
+        )
+    )
+
+
+@context.command(name="query")
+@click.argument("search_term")
+@click.option(
+    "--ranked", is_flag=True, help="Rank matches with the full-text index (BM25)."
+)
+@click.option(
+    "--limit", default=10, show_default=True, help="Maximum number of results."
+)
+def context_query(search_term: str, ranked: bool, limit: int):
+    """Performs a quick search across the knowledge base."""
+    click.echo(
+        style(f"🔍 Searching for '{search_term}' in the knowledge base...", fg="cyan")
+    )
+    if ranked:
+        with closing(open_search_index()) as conn:
+            refresh_search_index(conn, full=False)
+            results = search_index(conn, search_term, limit)
+        if not results:
+            echo(style(f"No results found for '{search_term}'.", fg="yellow"))
+            return
+        echo(style("\nBest matches:", fg="green"))
+        for rank, (rel_path, score) in enumerate(results, 1):
+            echo(f"{rank:>3}. {rel_path} " + style(f"({score:.2f})", dim=True))
+            for number, line in find_snippets(rel_path, search_term):
+                echo(f"       {number}: {line[:160]}")
+        return
+
+    search_dirs = [PROJECT_ROOT / d for d in KNOWLEDGE_BASE_DIRS]
+    runner = StepRunner()
+
+    def grep(directory: Path) -> list[str]:
+        try:
+            # Use git grep for speed and respecting .gitignore
+            output = runner.command(
+                ["git", "grep", "-l", search_term, "--", str(directory)], quiet=True
+            )
+        except click.Abort:
+            return []  # Ignore errors if no match is found
+        return output.splitlines()
+
+    found = runner.gather(
+        *(functools.partial(grep, d) for d in search_dirs if d.exists())
+    )
+    results = [path for paths in found for path in paths]
+
+    if not results:
+        echo(style(f"No results found for '{search_term}'.", fg="yellow"))
+        return
+
+    echo(style("\nFound potential matches in the following files:", fg="green"))
+    for file_path in results[:limit]:
+        echo(f"  - {file_path}")
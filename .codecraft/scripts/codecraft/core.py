@@ -0,0 +1,584 @@
+"""Constants, configuration, tracing and helpers shared by every command."""
+
+import functools
+import json
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+
+# ---
+# Configuration and Constants
+# ---
+# This package lives in .codecraft/scripts/, next to the cli.py entry point.
+CLI_PATH = Path(__file__).resolve().parent.parent / "cli.py"
+PROJECT_ROOT = CLI_PATH.parent.parent.parent
+WORKFLOW_CONFIG_PATH = PROJECT_ROOT / ".codecraft" / "workflow.yml"
+PROTECTED_PATHS_CONFIG_PATH = PROJECT_ROOT / ".codecraft" / "protected_paths.yml"
+LOCAL_CONFIG_PATH = PROJECT_ROOT / ".codecraft" / ".local_config.yml"
+TRASH_DIR = PROJECT_ROOT / ".trash"
+TRASH_MANIFEST_PATH = TRASH_DIR / ".manifest.db"
+TRASH_OBJECTS_DIR = TRASH_DIR / "objects"
+# Pre-manifest trash items are named `<YYYYMMDD_HHMMSS>_[<n>_]<name>`.
+LEGACY_TRASH_PREFIX_RE = re.compile(r"^\d{8}_\d{6}_(\d+_)?")
+TRASH_LOCK_PATH = TRASH_DIR / ".lock"
+TRASH_GC_LOG_PATH = TRASH_DIR / ".gc.log"
+# Trash objects found without a manifest entry are restorable from here.
+TRASH_ORPHAN_DIR = "lost+found"
+CONFIG_CACHE_PATH = PROJECT_ROOT / ".codecraft" / ".config_cache.pickle"
+CONFIG_CACHE_VERSION = 1
+TASK_INDEX_PATH = PROJECT_ROOT / ".codecraft" / ".task_index.db"
+TASK_INDEX_VERSION = 3
+CONTEXT_CACHE_PATH = PROJECT_ROOT / ".codecraft" / ".context_cache.pickle"
+CONTEXT_CACHE_VERSION = 3
+# Markdown links and backquoted paths to .md files.
+CONTEXT_LINK_RE = re.compile(r"\]\(([^)\s]+\.md)(?:#[^)]*)?\)|`([\w./-]+\.md)`")
+# A fragment cut to fewer lines than this is listed as omitted instead.
+CONTEXT_MIN_LINES = 5
+DAEMON_SOCKET_PATH = PROJECT_ROOT / ".codecraft" / ".daemon.sock"
+DAEMON_LOG_PATH = PROJECT_ROOT / ".codecraft" / ".daemon.log"
+INTERACTION_LOG_NAME = "interactions"
+LOG_INDEX_PATH = PROJECT_ROOT / ".codecraft" / ".log_index.db"
+LOG_INDEX_VERSION = "2"
+LOG_LOCK_PATH = PROJECT_ROOT / ".codecraft" / ".log.lock"
+# Uncompressed bytes per gzip member in rotated segments.
+LOG_MEMBER_BYTES = 64 * 1024
+OPENSPEC_CHANGES_DIR = PROJECT_ROOT / "openspec" / "changes"
+OPENSPEC_CACHE_PATH = PROJECT_ROOT / ".codecraft" / ".openspec_cache.pickle"
+OPENSPEC_CACHE_VERSION = 1
+OPENSPEC_FILES = ("spec.md", "tasks.md")
+# `## Phase 1: Setup` and any other level-two heading in tasks.md.
+OPENSPEC_PHASE_RE = re.compile(r"^##\s+(.+?)\s*#*$")
+OPENSPEC_CHECKBOX_RE = re.compile(r"^\s*[-*+]\s+\[([ xX])\]\s*(.*)$")
+# Functions listed by `--profile`, by cumulative time.
+PROFILE_TOP_ENTRIES = 30
+# Metadata lives above the first `---`; give up on files that never have one.
+MAX_HEADER_LINES = 200
+METADATA_BULLET_RE = re.compile(r"^[-*+]\s+\*\*(.+?)\*\*\s*[:：]?\s*(.*)$")
+# Unfilled template values such as `[e.g., #001, #002]`.
+TEMPLATE_PLACEHOLDER_RE = re.compile(r"^\[(e\.g\.|例如)")
+METADATA_KEY_ALIASES = {
+    "摘要": "summary",
+    "状态": "status",
+    "类型": "type",
+    "优先级": "priority",
+    "负责人": "author",
+    "日期": "date",
+    "依赖项": "dependencies",
+    "关联任务": "associated task",
+    "相关日志": "related logs",
+}
+
+
+# ---
+# Tracing
+# ---
+# `--timings` prints a tree of timed spans for a command, CODECRAFT_TRACE
+# appends the same spans as JSON lines (to a file, or `-` for stderr), and
+# `--profile` runs the command under cProfile. Code marks a phase with
+# `with span(name, **attrs):`; while no tracer is active that returns a shared
+# no-op object, so instrumented code pays one global lookup per phase.
+class Span:
+    """A timed phase of a command, nested under the span open when it began."""
+
+    __slots__ = ("id", "name", "attrs", "parent", "children", "started", "seconds")
+
+    def __init__(self, name: str, attrs: dict):
+        self.name = name
+        self.attrs = attrs
+        self.parent = None
+        self.children = []
+        self.started = time.perf_counter()
+        self.seconds = None
+
+    def set(self, **attrs) -> None:
+        """Records attributes only known once the phase has run."""
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        if _TRACER is not None:
+            _TRACER.push(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.seconds = time.perf_counter() - self.started
+        if _TRACER is not None:
+            _TRACER.pop(self)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **attrs) -> None:
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+_TRACER: "Tracer | None" = None
+
+
+def span(name: str, **attrs) -> Span | _NullSpan:
+    """Returns a context manager timing one phase of the current command."""
+    if _TRACER is None:
+        return NULL_SPAN
+    return Span(name, attrs)
+
+
+class Tracer:
+    """Collects the span tree of one command and streams finished spans.
+
+    Spans opened on worker threads hang under the span that was current on
+    the main thread, which is where the work was handed out.
+    """
+
+    def __init__(self, root: Span, trace_path: str | None):
+        self.root = root
+        self.local = threading.local()
+        self.main_stack = self.local.stack = [root]
+        self.lock = threading.Lock()
+        self.next_id = 1
+        root.id = 0
+        self.trace_id = f"{os.getpid():x}-{time.time_ns():x}"
+        # perf_counter() has no epoch; this maps it onto wall-clock time.
+        self.epoch = time.time() - time.perf_counter()
+        self.trace_fd = None
+        if trace_path == "-":
+            self.trace_fd = sys.stderr.fileno()
+        elif trace_path:
+            # O_APPEND keeps lines whole when several commands share a file.
+            self.trace_fd = os.open(
+                trace_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644
+            )
+
+    def push(self, span: Span) -> None:
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = [self.main_stack[-1]]
+        span.parent = stack[-1]
+        with self.lock:
+            span.id = self.next_id
+            self.next_id += 1
+        span.parent.children.append(span)
+        stack.append(span)
+
+    def pop(self, span: Span) -> None:
+        stack = self.local.stack
+        if stack[-1] is span:
+            stack.pop()
+        self.emit(span)
+
+    def emit(self, span: Span) -> None:
+        if self.trace_fd is None:
+            return
+        record = {
+            "trace": self.trace_id,
+            "pid": os.getpid(),
+            "id": span.id,
+            "parent": span.parent.id if span.parent is not None else None,
+            "name": span.name,
+            "start": round(self.epoch + span.started, 6),
+            "ms": round(span.seconds * 1000, 3),
+            "attrs": span.attrs,
+        }
+        line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+        with self.lock:
+            os.write(self.trace_fd, line.encode("utf-8"))
+
+    def finish(self) -> None:
+        self.root.__exit__(None, None, None)
+        if self.trace_fd not in (None, sys.stderr.fileno()):
+            os.close(self.trace_fd)
+
+    def echo_tree(self) -> None:
+        """Prints every span with its duration, children indented below it."""
+        click.echo("\nTimings:", err=True)
+        stack = [(self.root, 0)]
+        while stack:
+            node, depth = stack.pop()
+            seconds = node.seconds if node.seconds is not None else 0.0
+            attrs = " ".join(
+                f"{k}={' '.join(map(str, v)) if isinstance(v, list) else v}"
+                for k, v in node.attrs.items()
+            )
+            line = f"{seconds * 1000:9.1f} ms  {'  ' * depth}{node.name}"
+            click.echo(
+                line + (click.style(f"  {attrs}", dim=True) if attrs else ""),
+                err=True,
+            )
+            stack.extend((child, depth + 1) for child in reversed(node.children))
+
+
+def start_tracing(
+    ctx: click.Context,
+    show_timings: bool,
+    profile: bool,
+    profile_path: Path | None,
+) -> None:
+    """Starts the tracer and profiler a command asked for; both stop on exit."""
+    global _TRACER
+    # A forked daemon child may have inherited the daemon's own tracer.
+    _TRACER = None
+    trace_path = os.environ.get("CODECRAFT_TRACE")
+    if show_timings or trace_path:
+        root = Span("cli", {"argv": sys.argv[1:]})
+        try:
+            _TRACER = Tracer(root, trace_path)
+        except OSError as e:
+            click.echo(
+                click.style(
+                    f"Warning: Cannot write trace to {trace_path}: {e}", fg="yellow"
+                ),
+                err=True,
+            )
+            _TRACER = Tracer(root, None)
+        tracer = _TRACER
+
+        def finish_tracing():
+            global _TRACER
+            tracer.finish()
+            _TRACER = None
+            if show_timings:
+                tracer.echo_tree()
+
+        ctx.call_on_close(finish_tracing)
+
+    if profile or profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+
+        def finish_profile():
+            profiler.disable()
+            if profile_path is not None:
+                profiler.dump_stats(profile_path)
+                click.echo(f"Profile written to {profile_path}", err=True)
+            if profile:
+                import pstats
+
+                stats = pstats.Stats(profiler, stream=sys.stderr)
+                stats.sort_stats("cumulative").print_stats(PROFILE_TOP_ENTRIES)
+
+        ctx.call_on_close(finish_profile)
+        profiler.enable()
+
+
+# ---
+# Helper Functions
+# ---
+def load_yaml_config(config_path: Path, default: dict = None) -> dict:
+    """Loads a YAML configuration file."""
+    # PyYAML is only imported when a file actually has to be parsed; the
+    # config snapshot below serves most invocations without it.
+    import yaml
+
+    if not config_path.exists():
+        if default is not None:
+            return default
+        click.echo(
+            click.style(f"Error: Config file not found at {config_path}", fg="red")
+        )
+        raise click.Abort()
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            # Prefer the libyaml-backed loader, which is several times faster.
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            return yaml.load(f, Loader=loader)
+    except yaml.YAMLError as e:
+        click.echo(
+            click.style(
+                f"Error: Could not parse config file {config_path}: {e}", fg="red"
+            )
+        )
+        raise click.Abort()
+
+
+def save_local_config(config: dict):
+    """Saves the local configuration."""
+    import yaml
+
+    with open(LOCAL_CONFIG_PATH, "w", encoding="utf-8") as f:
+        yaml.dump(config, f, default_flow_style=False)
+
+
+@contextmanager
+def locked_file(lock_path: Path):
+    """Holds an exclusive advisory lock on `lock_path` for the block."""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        try:
+            import fcntl
+        except ImportError:  # No advisory locks on this platform.
+            yield
+            return
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _config_sources() -> dict:
+    """Returns the (mtime_ns, size) of each config file, or None if missing."""
+    sources = {}
+    for path in (WORKFLOW_CONFIG_PATH, LOCAL_CONFIG_PATH, PROTECTED_PATHS_CONFIG_PATH):
+        try:
+            stat = path.stat()
+            sources[path.name] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            sources[path.name] = None
+    return sources
+
+
+def load_config_snapshot() -> dict:
+    """Loads all configuration files, compiled into a single snapshot.
+
+    The parsed result is pickled to CONFIG_CACHE_PATH and reused for as long
+    as none of the source files changes, so most invocations only pay for
+    three stat calls and one small read.
+    """
+    sources = _config_sources()
+    try:
+        with open(CONFIG_CACHE_PATH, "rb") as f:
+            snapshot = pickle.load(f)
+        if (
+            snapshot.get("version") == CONFIG_CACHE_VERSION
+            and snapshot.get("sources") == sources
+        ):
+            return snapshot
+    except (OSError, EOFError, AttributeError, ValueError, pickle.PickleError):
+        pass
+
+    protected = load_yaml_config(PROTECTED_PATHS_CONFIG_PATH, default={}) or {}
+    snapshot = {
+        "version": CONFIG_CACHE_VERSION,
+        "sources": sources,
+        "workflow": load_yaml_config(WORKFLOW_CONFIG_PATH),
+        "local": load_yaml_config(LOCAL_CONFIG_PATH, default={}) or {},
+        "protected": protected.get("protected", []),
+    }
+    try:
+        tmp_path = CONFIG_CACHE_PATH.with_name(
+            f"{CONFIG_CACHE_PATH.name}.{os.getpid()}"
+        )
+        with open(tmp_path, "wb") as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except OSError:
+        # A read-only checkout still works; it just parses YAML every time.
+        pass
+    return snapshot
+
+
+@functools.cache
+def config_snapshot() -> dict:
+    """Returns the configuration snapshot, loading it on first use."""
+    with span("config load") as load:
+        snapshot = load_config_snapshot()
+        load.set(parsed_yaml="yaml" in sys.modules)
+    return snapshot
+
+
+def get_config() -> dict:
+    """Returns the workflow configuration (workflow.yml)."""
+    return config_snapshot()["workflow"]
+
+
+def get_local_config() -> dict:
+    """Returns the local configuration (.local_config.yml)."""
+    return config_snapshot()["local"]
+
+
+def get_protected_paths() -> list:
+    """Returns the protected paths from the configuration snapshot."""
+    return config_snapshot()["protected"]
+
+
+def template_paths(*sections: str) -> set[str]:
+    """Returns the project-relative templates of the given config sections."""
+    config = get_config()
+    return {
+        Path(path).as_posix()
+        for section in sections
+        for path in (config.get(section, {}).get("templates") or {}).values()
+    }
+
+
+def get_user_lang() -> str:
+    """Gets the user's preferred language, falling back to the default."""
+    return get_local_config().get("language", get_config()["languages"]["default"])
+
+
+class ProtectedPathMatcher:
+    """Matches project-relative paths against the protected path rules.
+
+    Rules follow .gitignore conventions: an entry protects the path itself and
+    everything beneath it, `*`, `?` and `[...]` match within one path
+    component, `**` matches across components, a glob without a `/` matches
+    at any depth, and a leading `!` re-allows paths matched by an earlier
+    rule. The last matching rule wins. Literal entries are always relative
+    to the project root.
+
+    Literal rules are stored in a path-component trie, so checking a path
+    costs one dictionary step per component plus a regex check per glob rule.
+    """
+
+    _RULE = object()
+
+    def __init__(self, rules: list[str]):
+        self._trie = {}
+        self._globs = []
+        self.has_globs = False
+        for index, rule in enumerate(rules):
+            rule = str(rule).strip()
+            negated = rule.startswith("!")
+            pattern = rule[1:] if negated else rule
+            pattern = pattern.strip("/").removeprefix("./")
+            if not pattern:
+                continue
+            if any(c in pattern for c in "*?["):
+                if "/" not in pattern:
+                    pattern = f"**/{pattern}"
+                self._globs.append((index, negated, self._compile_glob(pattern)))
+                self.has_globs = self.has_globs or not negated
+                continue
+            node = self._trie
+            for component in pattern.split("/"):
+                node = node.setdefault(component, {})
+            node[self._RULE] = (index, negated)
+
+    @staticmethod
+    def _compile_glob(pattern: str) -> re.Pattern:
+        parts = []
+        for token in re.split(r"(\*\*/?|\*|\?|\[[^\]]*\])", pattern):
+            if token.startswith("**"):
+                parts.append("(?:.*/)?" if token.endswith("/") else ".*")
+            elif token == "*":
+                parts.append("[^/]*")
+            elif token == "?":
+                parts.append("[^/]")
+            elif token.startswith("[") and len(token) > 1:
+                parts.append("[^" + token[2:] if token[1:2] == "!" else token)
+            else:
+                parts.append(re.escape(token))
+        return re.compile("".join(parts) + r"\Z")
+
+    def _last_rule(self, rel_path: str) -> tuple[int, bool] | None:
+        components = [c for c in rel_path.split("/") if c and c != "."]
+        best = None
+        node = self._trie
+        for component in components:
+            node = node.get(component)
+            if node is None:
+                break
+            rule = node.get(self._RULE)
+            if rule is not None and (best is None or rule[0] > best[0]):
+                best = rule
+        for index, negated, regex in self._globs:
+            if best is not None and index < best[0]:
+                continue
+            prefix = ""
+            for component in components:
+                prefix = f"{prefix}/{component}" if prefix else component
+                if regex.match(prefix):
+                    best = (index, negated)
+                    break
+        return best
+
+    def matches(self, rel_path: str) -> bool:
+        """Whether the path itself, or one of its parents, is protected."""
+        rule = self._last_rule(rel_path)
+        return rule is not None and not rule[1]
+
+    def protects_below(self, rel_path: str) -> bool:
+        """Whether a literal rule protects something beneath this directory."""
+        node = self._trie
+        for component in (c for c in rel_path.split("/") if c and c != "."):
+            node = node.get(component)
+            if node is None:
+                return False
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is self._RULE:
+                    if not child[1]:
+                        return True
+                else:
+                    stack.append(child)
+        return False
+
+    def classify(self, rel_paths) -> dict[str, bool]:
+        """Checks many paths at once, returning {path: is_protected}."""
+        return {rel_path: self.matches(rel_path) for rel_path in rel_paths}
+
+    def find_in_tree(self, root: Path, base: Path) -> list[str]:
+        """Lists protected paths inside a directory tree, relative to `base`.
+
+        Protected directories are reported once and not descended into.
+        """
+        rel_root = root.relative_to(base).as_posix()
+        if self.matches(rel_root):
+            return [rel_root]
+        found = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            rel_dir = Path(dirpath).relative_to(base).as_posix()
+            rel_dir = "" if rel_dir == "." else rel_dir + "/"
+            for name in list(dirnames):
+                if self.matches(rel_dir + name):
+                    found.append(rel_dir + name)
+                    dirnames.remove(name)
+            found.extend(
+                rel_dir + name for name in filenames if self.matches(rel_dir + name)
+            )
+        return found
+
+
+@functools.cache
+def get_protected_matcher() -> ProtectedPathMatcher:
+    """Returns the compiled matcher for the configured protected paths."""
+    return ProtectedPathMatcher(get_protected_paths())
+
+
+def find_protected_paths(paths: list[Path]) -> list[str]:
+    """Validates many absolute paths against the protected set in one pass.
+
+    Returns the offending project-relative paths: paths that are protected
+    themselves, and protected paths inside directories slated for deletion.
+    Paths outside the project are never protected.
+    """
+    matcher = get_protected_matcher()
+    relative = {}
+    for path in paths:
+        try:
+            relative[path.relative_to(PROJECT_ROOT).as_posix()] = path
+        except ValueError:
+            continue
+    found = [
+        rel_path
+        for rel_path, protected in matcher.classify(relative).items()
+        if protected or matcher.protects_below(rel_path)
+    ]
+    if matcher.has_globs:
+        flagged = set(found)
+        for rel_path, path in relative.items():
+            if rel_path not in flagged and path.is_dir():
+                found.extend(matcher.find_in_tree(path, PROJECT_ROOT))
+    return found
+
+
+def is_protected(path: Path) -> bool:
+    """Checks if a path is protected or is a directory containing protected paths."""
+    return bool(find_protected_paths([path]))
@@ -0,0 +1,281 @@
+"""The resident daemon behind scripts/client.py."""
+
+import datetime
+import marshal
+import os
+import signal
+import socket
+import sqlite3
+import sys
+import time
+import traceback
+from contextlib import closing
+from pathlib import Path
+
+import click
+from click import Abort, echo, style
+
+from .context import open_search_index, refresh_search_index
+from .core import (
+    CLI_PATH,
+    DAEMON_LOG_PATH,
+    DAEMON_SOCKET_PATH,
+    PROJECT_ROOT,
+    _config_sources,
+    get_config,
+)
+from .index import load_tasks
+from .main import cli
+from .openspec import OpenSpecIndex
+from .process import spawn_background
+
+
+# ---
+# Daemon
+# ---
+# `daemon start` keeps one warm interpreter resident: modules imported, the
+# config loaded, and the task and search indexes refreshed as the tree
+# changes. Each command is run by a fork of it, which is handed the client's
+# stdin, stdout and stderr over the socket (SCM_RIGHTS), so prompts, colours
+# and pipes behave exactly as in a normal run. scripts/client.py is the thin
+# client; it runs cli.py in-process when no daemon is listening.
+def send_frame(sock: socket.socket, message: dict) -> None:
+    """Sends a length-prefixed marshal frame, the daemon's wire format."""
+    data = marshal.dumps(message)
+    sock.sendall(len(data).to_bytes(4, "big") + data)
+
+
+def recv_frame(sock: socket.socket, data: bytes = b"") -> dict | None:
+    """Reads one frame, starting from any bytes already received."""
+    while len(data) < 4 or len(data) < 4 + int.from_bytes(data[:4], "big"):
+        chunk = sock.recv(1 << 16)
+        if not chunk:
+            return None
+        data += chunk
+    return marshal.loads(data[4:])
+
+
+def daemon_request(message: dict, timeout: float = 5.0) -> dict | None:
+    """Sends a control message to the daemon; returns its reply, or None."""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(DAEMON_SOCKET_PATH))
+            send_frame(sock, message)
+            return recv_frame(sock)
+    except (OSError, ValueError, EOFError, AttributeError):
+        return None
+
+
+def run_forked_request(conn: socket.socket, request: dict, fds: list[int]):
+    """Runs one forwarded command in a forked child; never returns."""
+    code = 1
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+            os.close(fd)
+        sys.stdin = open(0, encoding="utf-8", closefd=False)
+        sys.stdout = open(
+            1, "w", buffering=1 if os.isatty(1) else -1, encoding="utf-8", closefd=False
+        )
+        sys.stderr = open(2, "w", buffering=1, encoding="utf-8", closefd=False)
+        os.chdir(request["cwd"])
+        os.environ.clear()
+        os.environ.update(request["env"])
+        sys.argv = [str(CLI_PATH), *request["argv"]]
+        send_frame(conn, {"pid": os.getpid()})
+        try:
+            cli.main(args=request["argv"], prog_name="cli.py")
+            code = 0
+        except SystemExit as e:
+            if isinstance(e.code, str):
+                echo(e.code, err=True)
+            code = e.code if isinstance(e.code, int) else int(e.code is not None)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except OSError:
+                pass
+        try:
+            send_frame(conn, {"exit": code})
+        except OSError:
+            pass
+        os._exit(code)
+
+
+class DaemonServer:
+    """Serves forwarded commands on DAEMON_SOCKET_PATH until stopped.
+
+    Every `poll_seconds` it reaps finished children, refreshes the task and
+    search indexes, and re-executes itself if its code or the config
+    changed, so forks never run stale code or settings.
+    """
+
+    def __init__(self, poll_seconds: float):
+        self.poll_seconds = poll_seconds
+        self.started = time.time()
+        self.served = 0
+        self.stamps = self.watched_stamps()
+
+    def watched_stamps(self) -> dict:
+        stamps = _config_sources()
+        for path in [CLI_PATH, *sorted(Path(__file__).resolve().parent.glob("*.py"))]:
+            stat = path.stat()
+            stamps[path.relative_to(CLI_PATH.parent).as_posix()] = (
+                stat.st_mtime_ns,
+                stat.st_size,
+            )
+        return stamps
+
+    def warm(self) -> None:
+        try:
+            load_tasks()
+            with closing(open_search_index()) as conn:
+                refresh_search_index(conn, full=False)
+            openspec_index = OpenSpecIndex()
+            openspec_index.changes()
+            openspec_index.save()
+        except (sqlite3.Error, OSError) as e:
+            echo(f"Warning: could not refresh the indexes: {e}", err=True)
+
+    def tick(self) -> None:
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if not pid:
+                break
+        if self.watched_stamps() != self.stamps:
+            echo("Code or config changed; restarting.")
+            DAEMON_SOCKET_PATH.unlink(missing_ok=True)
+            sys.stdout.flush()
+            os.execv(
+                sys.executable,
+                [sys.executable, str(CLI_PATH), "daemon", "start", "-f"],
+            )
+        self.warm()
+
+    def handle(self, conn: socket.socket, server: socket.socket) -> bool:
+        """Serves one connection; returns False once asked to stop."""
+        data, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+        try:
+            request = recv_frame(conn, data) if data else None
+        except (ValueError, EOFError):
+            request = None
+        if not isinstance(request, dict):
+            request = {"control": "invalid"}
+        if "control" in request or len(fds) != 3:
+            for fd in fds:
+                os.close(fd)
+            send_frame(
+                conn,
+                {"pid": os.getpid(), "started": self.started, "served": self.served},
+            )
+            return request.get("control") != "stop"
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        if os.fork() == 0:
+            server.close()
+            run_forked_request(conn, request, fds)
+        for fd in fds:
+            os.close(fd)
+        self.served += 1
+        return True
+
+    def serve(self) -> None:
+        # Forks should find every command already imported.
+        cli.load_all()
+        self.warm()
+        DAEMON_SOCKET_PATH.unlink(missing_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # The daemon runs anything it is sent; only its owner may connect.
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(str(DAEMON_SOCKET_PATH))
+        finally:
+            os.umask(old_umask)
+        server.listen(64)
+        server.settimeout(self.poll_seconds)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        echo(f"Daemon {os.getpid()} listening on {DAEMON_SOCKET_PATH}.")
+        sys.stdout.flush()
+        last_tick = time.monotonic()
+        try:
+            while True:
+                try:
+                    conn, _ = server.accept()
+                except TimeoutError:
+                    conn = None
+                if conn is not None:
+                    with conn:
+                        if not self.handle(conn, server):
+                            break
+                if time.monotonic() - last_tick >= self.poll_seconds:
+                    self.tick()
+                    last_tick = time.monotonic()
+        finally:
+            server.close()
+            DAEMON_SOCKET_PATH.unlink(missing_ok=True)
+            echo(f"Daemon {os.getpid()} stopped after {self.served} command(s).")
+
+
+@click.group()
+def daemon():
+    """Commands for the resident CLI server (see scripts/client.py)."""
+    pass
+
+
+@daemon.command(name="start")
+@click.option("--foreground", "-f", is_flag=True, help="Serve in this process instead.")
+def daemon_start(foreground: bool):
+    """Starts a resident server that keeps the CLI warm between commands."""
+    if not hasattr(os, "fork") or not hasattr(socket, "AF_UNIX"):
+        echo(style("Error: The daemon needs a Unix platform.", fg="red"), err=True)
+        raise Abort()
+    status = daemon_request({"control": "status"})
+    if status is not None:
+        echo(style(f"Daemon already running (pid {status['pid']}).", fg="yellow"))
+        return
+    if foreground:
+        settings = get_config().get("daemon") or {}
+        DaemonServer(settings.get("poll_seconds", 2)).serve()
+        return
+
+    spawn_background(["daemon", "start", "--foreground"], DAEMON_LOG_PATH)
+    deadline = time.monotonic() + 10
+    while status is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        status = daemon_request({"control": "status"}, timeout=1)
+    if status is None:
+        echo(style("Error: The daemon did not come up; see its log.", fg="red"))
+        raise Abort()
+    echo(style(f"✅ Daemon listening (pid {status['pid']}).", fg="green"))
+
+
+@daemon.command(name="stop")
+def daemon_stop():
+    """Stops the resident server."""
+    status = daemon_request({"control": "stop"})
+    if status is None:
+        echo(style("The daemon is not running.", fg="yellow"))
+        return
+    echo(style(f"✅ Daemon stopped after {status['served']} command(s).", fg="green"))
+
+
+@daemon.command(name="status")
+def daemon_status():
+    """Shows whether the resident server is running."""
+    status = daemon_request({"control": "status"})
+    if status is None:
+        echo("The daemon is not running; commands run in-process.")
+        return
+    uptime = datetime.timedelta(seconds=int(time.time() - status["started"]))
+    echo(f"Daemon running (pid {status['pid']}), up {uptime}.")
+    echo(f"  Socket:  {DAEMON_SOCKET_PATH.relative_to(PROJECT_ROOT)}")
+    echo(f"  Served:  {status['served']} command(s)")
@@ -0,0 +1,406 @@
+"""Near-duplicate detection for tasks and specs, used by `task dedupe`."""
+
+import array
+import hashlib
+import os
+import sqlite3
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .context import CJK_RUN_RE, tokenize
+from .core import PROJECT_ROOT, get_config, span, template_paths
+from .index import scan_task_files
+
+DEDUPE_INDEX_PATH = PROJECT_ROOT / ".codecraft" / ".dedupe_index.db"
+DEDUPE_INDEX_VERSION = "1"
+# Signatures hold MINHASH_BINS values, which LSH compares in bands of four
+# (see lsh_keys): with 32 bands, two documents become candidates with a
+# probability of about 99% at a similarity of 0.6 and under 25% below 0.3.
+MINHASH_BINS = 128
+BODY_FIELD, TITLE_FIELD = 0, 1
+BUCKETS_INDEX_SQL = "CREATE INDEX buckets_key ON buckets (key, doc_id)"
+# Odd, so multiplying by it modulo 2**64 never maps two hashes to one value.
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+_EMPTY_BIN = 1 << 32
+# Empty bins copy a filled one found by stepping through the bins with an
+# odd stride, which visits all of them. Strides differ per bin but not per
+# document, as the estimate requires.
+_PROBE_STRIDES = [
+    ((i * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> 57 | 1 for i in range(MINHASH_BINS)
+]
+
+
+# ---
+# Near-Duplicate Index
+# ---
+# Every task and spec has a MinHash signature of its body's word shingles,
+# without those that also occur in a task or spec template, and one of its
+# title's shingles. The LSH buckets in SQLite map each band of a signature
+# to the documents sharing it, so finding near-duplicates reads a few
+# buckets instead of comparing every pair. Files are re-signed only
+# when their mtime or size changes, and a newly signed body is compared
+# with the bodies sharing its buckets right away, so `task dedupe` only
+# reads the pairs recorded so far.
+def shingle_hash(shingle: str) -> int:
+    return zlib.crc32(shingle.encode())
+
+
+def body_shingles(text: str, size: int) -> set[int]:
+    """Returns the hashes of the text's runs of `size` words."""
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return {shingle_hash(" ".join(tokens))} if tokens else set()
+    runs = map(" ".join, zip(*[tokens[i:] for i in range(size)]))
+    return set(map(shingle_hash, runs))
+
+
+def title_shingles(title: str) -> set[str]:
+    """Returns the trigrams of a title's words and the bigrams of its CJK text.
+
+    Case and separators do not matter, so `Fix login` and `fix_login` match.
+    """
+    shingles = set()
+    for token in tokenize(title.replace("_", " ")):
+        if CJK_RUN_RE.match(token):
+            # Already a bigram: one CJK character says as much as a word.
+            shingles.add(token)
+            continue
+        padded = f" {token} "
+        shingles.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return shingles
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 0.0
+
+
+def minhash(hashes) -> bytes | None:
+    """Returns the MinHash signature of a set of 32-bit hashes, or None if empty.
+
+    Uses one-permutation hashing: each hash is scrambled once and kept in one
+    of MINHASH_BINS bins if it is the smallest there, so a document costs one
+    multiplication per shingle rather than one per bin. Two signatures agree
+    in a bin with a probability equal to the sets' Jaccard similarity.
+    """
+    bins = [_EMPTY_BIN] * MINHASH_BINS
+    for x in hashes:
+        h = (x * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF
+        value = (h >> 25) & 0xFFFFFFFF
+        if value < bins[h >> 57]:
+            bins[h >> 57] = value
+    empty = [i for i, value in enumerate(bins) if value == _EMPTY_BIN]
+    if len(empty) == MINHASH_BINS:
+        return None
+    signature = bins.copy()
+    for i in empty:
+        j = i
+        while bins[j] == _EMPTY_BIN:
+            j = (j + _PROBE_STRIDES[i]) % MINHASH_BINS
+        signature[i] = bins[j]
+    return array.array("I", signature).tobytes()
+
+
+def similarity(a: bytes, b: bytes) -> float:
+    """Estimates the Jaccard similarity of the sets behind two signatures."""
+    agree = sum(map(int.__eq__, array.array("I", a), array.array("I", b)))
+    return agree / MINHASH_BINS
+
+
+def lsh_keys(signature: bytes, field: int) -> list[int]:
+    """Returns the LSH bucket of each band of four values in a signature.
+
+    A bucket key folds the field, the band's number and its two 64-bit words
+    into one signed integer, which SQLite stores and compares faster than
+    the bytes. A rare collision only adds a candidate, which the similarity
+    check drops.
+    """
+    words = iter(array.array("Q", signature))
+    keys = []
+    for band, (high, low) in enumerate(zip(words, words)):
+        key = ((field << 8 | band) * _HASH_MULTIPLIER + high) & 0xFFFFFFFFFFFFFFFF
+        key = (key * _HASH_MULTIPLIER + low) & 0xFFFFFFFFFFFFFFFF
+        keys.append(key - (key >> 63 << 64))
+    return keys
+
+
+def dedupe_templates() -> set[str]:
+    """Returns the task and spec templates, whose text is left out of bodies."""
+    return template_paths("tasks", "specs")
+
+
+def _shingle_size() -> int:
+    return int((get_config().get("dedupe") or {}).get("shingle_words", 3))
+
+
+def _dedupe_index_version() -> str:
+    """Returns the index version, which changes with the shingles and templates."""
+    digest = hashlib.blake2b(digest_size=8)
+    for rel_path in sorted(dedupe_templates()):
+        try:
+            digest.update((PROJECT_ROOT / rel_path).read_bytes())
+        except OSError:
+            pass
+    return f"{DEDUPE_INDEX_VERSION}:{_shingle_size()}:{digest.hexdigest()}"
+
+
+def open_dedupe_index(db_path: Path = DEDUPE_INDEX_PATH) -> sqlite3.Connection:
+    """Opens the index, resetting it if it is corrupt or outdated."""
+    version = _dedupe_index_version()
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        db_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+        row = None
+    if row is None or row[0] != version:
+        with conn:
+            for table in ("docs", "buckets", "pairs"):
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.execute(
+                """CREATE TABLE docs (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    title TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    body BLOB,
+                    name BLOB
+                )"""
+            )
+            conn.execute(
+                "CREATE TABLE buckets (key INTEGER NOT NULL, doc_id INTEGER NOT NULL)"
+            )
+            conn.execute(BUCKETS_INDEX_SQL)
+            # Every pair of documents whose bodies share an LSH bucket, with
+            # their estimated similarity; `a` is the smaller id.
+            conn.execute(
+                """CREATE TABLE pairs (
+                    a INTEGER NOT NULL,
+                    b INTEGER NOT NULL,
+                    score REAL NOT NULL,
+                    PRIMARY KEY (a, b)
+                ) WITHOUT ROWID"""
+            )
+            conn.execute("CREATE INDEX pairs_b ON pairs (b)")
+            conn.execute("DELETE FROM meta")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (version,))
+    return conn
+
+
+def scan_dedupe_files():
+    """Yields (relative path, title, mtime_ns, size) for every task and spec."""
+    for rel_path, _, mtime_ns, size in scan_task_files():
+        yield rel_path, rel_path.rpartition("/")[2][: -len(".md")], mtime_ns, size
+    config = get_config()
+    specs_dir = config["directories"]["specs"]
+    prefix = Path(specs_dir).as_posix() + "/"
+    languages = set(config["languages"]["supported"])
+    templates = dedupe_templates()
+    try:
+        entries = os.scandir(PROJECT_ROOT / specs_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with entries:
+        for entry in entries:
+            rel_path = prefix + entry.name
+            if not entry.name.endswith(".md") or rel_path in templates:
+                continue
+            if not entry.is_file():
+                continue
+            # Specs are named `<task>.<lang>.md`.
+            title, _, lang = entry.name[: -len(".md")].rpartition(".")
+            if lang not in languages:
+                title = entry.name[: -len(".md")]
+            stat = entry.stat()
+            yield rel_path, title, stat.st_mtime_ns, stat.st_size
+
+
+def _template_shingles(size: int) -> set[int]:
+    shingles = set()
+    for rel_path in dedupe_templates():
+        try:
+            text = (PROJECT_ROOT / rel_path).read_text(encoding="utf-8")
+        except OSError:
+            continue
+        shingles |= body_shingles(text, size)
+    return shingles
+
+
+def _sign_batch(rel_paths: list[str], size: int, boilerplate: set[int]) -> list:
+    results = []
+    for rel_path in rel_paths:
+        try:
+            with open(PROJECT_ROOT / rel_path, encoding="utf-8", errors="replace") as f:
+                text = f.read()
+        except OSError:
+            results.append((rel_path, None, False))
+            continue
+        results.append(
+            (rel_path, minhash(body_shingles(text, size) - boilerplate), True)
+        )
+    return results
+
+
+def _remove_dedupe_docs(conn: sqlite3.Connection, doc_ids: list[int]) -> None:
+    for doc_id in doc_ids:
+        body, name = conn.execute(
+            "SELECT body, name FROM docs WHERE id = ?", (doc_id,)
+        ).fetchone()
+        for field, signature in ((BODY_FIELD, body), (TITLE_FIELD, name)):
+            if signature is not None:
+                conn.executemany(
+                    "DELETE FROM buckets WHERE key = ? AND doc_id = ?",
+                    [(key, doc_id) for key in lsh_keys(signature, field)],
+                )
+        conn.execute("DELETE FROM pairs WHERE a = ? OR b = ?", (doc_id, doc_id))
+        conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+
+
+def _candidates(conn: sqlite3.Connection, field: int, signature: bytes) -> list:
+    """Returns (id, path, title, body) for documents sharing a bucket."""
+    keys = lsh_keys(signature, field)
+    return conn.execute(
+        f"""SELECT id, path, title, body FROM docs WHERE id IN (
+            SELECT doc_id FROM buckets WHERE key IN ({", ".join("?" * len(keys))})
+        )""",
+        keys,
+    ).fetchall()
+
+
+def _index_dedupe_docs(conn: sqlite3.Connection, changed: dict) -> None:
+    size = _shingle_size()
+    boilerplate = _template_shingles(size)
+    indexed_before = conn.execute("SELECT 1 FROM buckets LIMIT 1").fetchone()
+    buckets, signed, shared = [], {}, {}
+    paths = sorted(changed)
+    batches = [paths[i : i + 64] for i in range(0, len(paths), 64)]
+    with ThreadPoolExecutor() as executor:
+        for results in executor.map(
+            _sign_batch, batches, [size] * len(batches), [boilerplate] * len(batches)
+        ):
+            for rel_path, body, readable in results:
+                if not readable:
+                    # Left out of the index, so the file is retried next time.
+                    continue
+                title, mtime_ns, size_bytes = changed[rel_path]
+                name = minhash(map(shingle_hash, title_shingles(title)))
+                doc_id = conn.execute(
+                    "INSERT INTO docs (path, title, mtime_ns, size, body, name)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (rel_path, title, mtime_ns, size_bytes, body, name),
+                ).lastrowid
+                if name is not None:
+                    buckets.extend((key, doc_id) for key in lsh_keys(name, TITLE_FIELD))
+                if body is not None:
+                    signed[doc_id] = (title, body)
+                    for key in lsh_keys(body, BODY_FIELD):
+                        buckets.append((key, doc_id))
+                        shared.setdefault(key, []).append(doc_id)
+
+    # Pair the new bodies with the indexed ones sharing a bucket (the new
+    # buckets are not stored yet), then with each other. New ids are larger.
+    # A task and the specs named after it are expected to overlap.
+    pairs = {}
+    if indexed_before:
+        for doc_id, (title, body) in signed.items():
+            for other_id, _, other_title, other_body in _candidates(
+                conn, BODY_FIELD, body
+            ):
+                if other_title != title:
+                    pairs[other_id, doc_id] = similarity(body, other_body)
+    for doc_ids in shared.values():
+        for i, a in enumerate(doc_ids):
+            for b in doc_ids[i + 1 :]:
+                if (a, b) not in pairs and signed[a][0] != signed[b][0]:
+                    pairs[a, b] = similarity(signed[a][1], signed[b][1])
+
+    if indexed_before:
+        conn.executemany("INSERT INTO buckets VALUES (?, ?)", buckets)
+    else:
+        # Indexing all buckets at once is twice as fast as one at a time.
+        conn.execute("DROP INDEX buckets_key")
+        conn.executemany("INSERT INTO buckets VALUES (?, ?)", buckets)
+        conn.execute(BUCKETS_INDEX_SQL)
+    conn.executemany(
+        "INSERT INTO pairs VALUES (?, ?, ?)",
+        [(a, b, score) for (a, b), score in sorted(pairs.items())],
+    )
+
+
+def refresh_dedupe_index(conn: sqlite3.Connection) -> tuple[int, int, int]:
+    """Brings the index in line with the tasks and specs on disk.
+
+    Returns (files indexed, files re-signed now, files removed).
+    """
+    indexed = {
+        path: (doc_id, mtime_ns, size)
+        for doc_id, path, mtime_ns, size in conn.execute(
+            "SELECT id, path, mtime_ns, size FROM docs"
+        )
+    }
+    changed, stale, total = {}, [], 0
+    with span("scan dedupe files") as scan:
+        for rel_path, title, mtime_ns, size in scan_dedupe_files():
+            total += 1
+            entry = indexed.pop(rel_path, None)
+            if entry is not None and entry[1:] == (mtime_ns, size):
+                continue
+            if entry is not None:
+                stale.append(entry[0])
+            changed[rel_path] = (title, mtime_ns, size)
+        scan.set(files=total, changed=len(changed))
+    # Whatever is left in `indexed` no longer exists on disk.
+    removed = len(indexed)
+    stale.extend(doc_id for doc_id, _, _ in indexed.values())
+    if stale or changed:
+        with conn, span("sign documents", files=len(changed), removed=removed):
+            _remove_dedupe_docs(conn, stale)
+            _index_dedupe_docs(conn, changed)
+    return total, len(changed), removed
+
+
+def add_dedupe_file(conn: sqlite3.Connection, path: Path, title: str) -> None:
+    """Indexes a file just written, so later checks in this run can see it."""
+    rel_path = path.relative_to(PROJECT_ROOT).as_posix()
+    stat = path.stat()
+    row = conn.execute("SELECT id FROM docs WHERE path = ?", (rel_path,)).fetchone()
+    if row is not None:
+        _remove_dedupe_docs(conn, [row[0]])
+    _index_dedupe_docs(conn, {rel_path: (title, stat.st_mtime_ns, stat.st_size)})
+
+
+def similar_titles(
+    conn: sqlite3.Connection, title: str, threshold: float
+) -> list[tuple[float, str, str]]:
+    """Returns (similarity, path, title) for documents titled like `title`.
+
+    Best matches come first. LSH only proposes the candidates; their titles
+    are then compared exactly.
+    """
+    shingles = title_shingles(title)
+    signature = minhash(map(shingle_hash, shingles))
+    if signature is None:
+        return []
+    matches = []
+    for _, path, other, _ in _candidates(conn, TITLE_FIELD, signature):
+        score = jaccard(shingles, title_shingles(other))
+        if score >= threshold:
+            matches.append((score, path, other))
+    return sorted(matches, key=lambda match: (-match[0], match[1]))
+
+
+def duplicate_pairs(
+    conn: sqlite3.Connection, threshold: float
+) -> list[tuple[float, str, str]]:
+    """Returns (similarity, path, path) for every pair of similar bodies."""
+    return conn.execute(
+        """SELECT p.score, MIN(x.path, y.path), MAX(x.path, y.path)
+        FROM pairs p JOIN docs x ON x.id = p.a JOIN docs y ON y.id = p.b
+        WHERE p.score >= ?
+        ORDER BY p.score DESC, 2""",
+        (threshold,),
+    ).fetchall()
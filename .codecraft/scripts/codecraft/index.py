@@ -0,0 +1,667 @@
+"""Task files: metadata parsing, the task index and the dependency graph."""
+
+import collections
+import heapq
+import itertools
+import json
+import os
+import pickle
+import sqlite3
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from contextlib import closing
+from pathlib import Path
+
+import click
+
+from .core import (
+    MAX_HEADER_LINES,
+    METADATA_BULLET_RE,
+    METADATA_KEY_ALIASES,
+    PROJECT_ROOT,
+    TASK_INDEX_PATH,
+    TASK_INDEX_VERSION,
+    TEMPLATE_PLACEHOLDER_RE,
+    get_config,
+    span,
+)
+
+
+# ---
+# Task Metadata
+# ---
+def read_task_header(task_path: Path) -> dict:
+    """Reads the metadata block at the top of a task or spec file.
+
+    Only the lines before the first `---` separator are read and decoded.
+    Both `key: value` lines and the templates' `- **Key**: value` bullets are
+    understood. Raises OSError or UnicodeDecodeError on unreadable files.
+    """
+    with open(task_path, "rb") as f:
+        lines = itertools.islice(f, MAX_HEADER_LINES)
+        return parse_task_header(raw_line.decode("utf-8") for raw_line in lines)
+
+
+def parse_task_header(lines) -> dict:
+    """Parses the metadata block from the lines of a file (see read_task_header)."""
+    metadata = {}
+    for line_number, line in enumerate(lines):
+        if line_number >= MAX_HEADER_LINES:
+            break
+        line = line.strip()
+        if line == "---":
+            break
+        match = METADATA_BULLET_RE.match(line)
+        if match:
+            key, value = match.groups()
+            key = key.rstrip(":：")
+        elif ":" in line and not line.startswith("#"):
+            key, value = line.split(":", 1)
+            key = key.lstrip("-*+ ")
+        else:
+            continue
+        key = key.strip().lower()
+        metadata[METADATA_KEY_ALIASES.get(key, key)] = value.strip().strip('"`')
+    return metadata
+
+
+def parse_task_metadata(task_path: Path) -> dict:
+    """Parses metadata from the top of a task file."""
+    metadata = {"path": task_path, "title": task_path.stem}
+    try:
+        metadata.update(read_task_header(task_path))
+    except (OSError, UnicodeDecodeError) as e:
+        click.echo(
+            click.style(f"Warning: Could not parse '{task_path}': {e}", fg="yellow"),
+            err=True,
+        )
+    return metadata
+
+
+def _parse_task_batch(paths: list[Path]) -> list[tuple]:
+    results = []
+    for path in paths:
+        try:
+            metadata = {"path": path, "title": path.stem, **read_task_header(path)}
+            results.append((path, metadata, None))
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((path, None, e))
+    return results
+
+
+def iter_task_metadata(paths, max_workers: int | None = None, batch_size: int = 64):
+    """Parses many task files on a thread pool, streaming results as they finish.
+
+    Yields (path, metadata, error) tuples in completion order; exactly one of
+    metadata and error is None. Only a bounded number of batches is in flight,
+    so arbitrarily long path iterables are handled in constant memory.
+    """
+    max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        batch = []
+        for path in paths:
+            batch.append(path)
+            if len(batch) < batch_size:
+                continue
+            pending.add(executor.submit(_parse_task_batch, batch))
+            batch = []
+            if len(pending) >= max_workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        if batch:
+            pending.add(executor.submit(_parse_task_batch, batch))
+        for future in as_completed(pending):
+            yield from future.result()
+
+
+# ---
+# Task Index
+# ---
+# The index caches parsed task metadata in SQLite, keyed by path and validated
+# against each file's mtime and size, so only changed files are re-parsed.
+def open_task_index(db_path: Path = TASK_INDEX_PATH) -> sqlite3.Connection:
+    """Opens the task index, resetting it if it is corrupt or outdated."""
+    try:
+        conn = sqlite3.connect(db_path)
+        version = _task_index_version()
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        # Unreadable index file: discard it and start over with a full scan.
+        db_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+        row = None
+    if row is None or row[0] != version:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS tasks")
+            conn.execute(
+                """CREATE TABLE tasks (
+                    path TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    metadata BLOB NOT NULL
+                )"""
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,)
+            )
+    return conn
+
+
+def _task_index_version() -> str:
+    """Returns the index version, which changes with the status directories."""
+    status_map = json.dumps(get_config()["tasks"]["status_map"], sort_keys=True)
+    return f"{TASK_INDEX_VERSION}:{status_map}"
+
+
+def scan_task_files():
+    """Yields (relative path, status, mtime_ns, size) for every task file."""
+    for status, status_dir in get_config()["tasks"]["status_map"].items():
+        prefix = Path(status_dir).as_posix() + "/"
+        try:
+            entries = os.scandir(PROJECT_ROOT / status_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                if not entry.name.endswith(".md") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                yield prefix + entry.name, status, stat.st_mtime_ns, stat.st_size
+
+
+def _index_row_to_task(rel_path: str, status: str, metadata: bytes) -> dict:
+    task = pickle.loads(metadata)
+    task["path"] = PROJECT_ROOT / rel_path
+    task["status"] = status
+    return task
+
+
+def _store_task(
+    conn: sqlite3.Connection,
+    rel_path: str,
+    status: str,
+    mtime_ns: int,
+    size: int,
+    task: dict,
+) -> bytes:
+    """Writes parsed task metadata to the index and returns it serialized."""
+    metadata = pickle.dumps({k: v for k, v in task.items() if k != "path"})
+    conn.execute(
+        "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?)",
+        (rel_path, task["title"], status, mtime_ns, size, metadata),
+    )
+    return metadata
+
+
+def _upsert_task(
+    conn: sqlite3.Connection, rel_path: str, status: str, mtime_ns: int, size: int
+) -> bytes:
+    """Parses a task file into the index and returns its serialized metadata."""
+    task = parse_task_metadata(PROJECT_ROOT / rel_path)
+    return _store_task(conn, rel_path, status, mtime_ns, size, task)
+
+
+def refresh_task_index(conn: sqlite3.Connection) -> dict:
+    """Brings the index in line with the task directories.
+
+    Returns a mapping of relative path to (status, serialized metadata) for
+    every task file currently on disk.
+    """
+    global _FRESH_TASK_INDEX
+    indexed = {
+        path: (status, mtime_ns, size, metadata)
+        for path, status, mtime_ns, size, metadata in conn.execute(
+            "SELECT path, status, mtime_ns, size, metadata FROM tasks"
+        )
+    }
+    current = {}
+    changed = {}
+    with span("scan task files") as scan:
+        for rel_path, status, mtime_ns, size in scan_task_files():
+            entry = indexed.pop(rel_path, None)
+            if entry is not None and entry[:3] == (status, mtime_ns, size):
+                current[rel_path] = (status, entry[3])
+            else:
+                changed[PROJECT_ROOT / rel_path] = (rel_path, status, mtime_ns, size)
+        scan.set(files=len(current) + len(changed), changed=len(changed))
+
+    with conn, span("parse task files", files=len(changed), removed=len(indexed)):
+        # Whatever is left in `indexed` no longer exists on disk.
+        conn.executemany("DELETE FROM tasks WHERE path = ?", [(p,) for p in indexed])
+        for path, task, error in iter_task_metadata(changed):
+            rel_path, status, mtime_ns, size = changed[path]
+            if error is not None:
+                # Keep the task visible, but leave it out of the index so the
+                # file is retried on the next refresh.
+                click.echo(
+                    click.style(
+                        f"Warning: Could not parse '{rel_path}': {error}", fg="yellow"
+                    ),
+                    err=True,
+                )
+                task = {"title": path.stem}
+                current[rel_path] = (status, pickle.dumps(task))
+                continue
+            current[rel_path] = (
+                status,
+                _store_task(conn, rel_path, status, mtime_ns, size, task),
+            )
+    _FRESH_TASK_INDEX = current
+    return current
+
+
+def load_tasks(statuses: list[str] | None = None) -> list[dict]:
+    """Returns metadata for all tasks, optionally limited to some statuses.
+
+    Reads from the task index after an incremental refresh, and falls back to a
+    full scan of the task directories if the index cannot be used.
+    """
+    try:
+        with span("task index"), closing(open_task_index()) as conn:
+            current = refresh_task_index(conn)
+        return [
+            _index_row_to_task(rel_path, status, metadata)
+            for rel_path, (status, metadata) in sorted(current.items())
+            if statuses is None or status in statuses
+        ]
+    except sqlite3.Error as e:
+        click.echo(
+            click.style(
+                f"Warning: Task index unavailable ({e}), scanning task files.",
+                fg="yellow",
+            ),
+            err=True,
+        )
+        tasks = []
+        with span("parse task files", index=False):
+            for rel_path, status, _, _ in scan_task_files():
+                if statuses is None or status in statuses:
+                    task = parse_task_metadata(PROJECT_ROOT / rel_path)
+                    task["status"] = status
+                    tasks.append(task)
+        return tasks
+
+
+def get_task_metadata(task_path: Path) -> dict:
+    """Returns metadata for a single task file, served from the index if fresh."""
+    rel_path = task_path.relative_to(PROJECT_ROOT).as_posix()
+    stat = task_path.stat()
+    status = next(
+        (
+            s
+            for s, d in get_config()["tasks"]["status_map"].items()
+            if PROJECT_ROOT / d == task_path.parent
+        ),
+        None,
+    )
+    if status is None:
+        return parse_task_metadata(task_path)
+    try:
+        with closing(open_task_index()) as conn:
+            row = conn.execute(
+                "SELECT status, mtime_ns, size, metadata FROM tasks WHERE path = ?",
+                (rel_path,),
+            ).fetchone()
+            if row and row[:3] == (status, stat.st_mtime_ns, stat.st_size):
+                return _index_row_to_task(rel_path, status, row[3])
+            with conn:
+                metadata = _upsert_task(
+                    conn, rel_path, status, stat.st_mtime_ns, stat.st_size
+                )
+            return _index_row_to_task(rel_path, status, metadata)
+    except sqlite3.Error:
+        return parse_task_metadata(task_path)
+
+
+# Title -> task file path, filled lazily by find_task_file and kept current by
+# the commands that create or move tasks.
+_TASK_LOCATIONS: dict[str, Path] = {}
+# Relative path -> (status, metadata) of every task, as of this process's
+# last refresh of the task index; None until it refreshes it.
+_FRESH_TASK_INDEX: dict | None = None
+
+
+def find_task_file(task_title: str) -> Path | None:
+    """Finds a task file across all status directories.
+
+    Tries, in order: the title->location map of this process, the task index
+    as this process last refreshed it, and the status directories one stat
+    at a time. Every candidate is confirmed with a stat. Opening the index
+    file costs more than the stats it would save, so a command that has not
+    refreshed it, such as `start` or `complete`, never opens it here.
+    """
+    task_path = _TASK_LOCATIONS.get(task_title)
+    if task_path is None and _FRESH_TASK_INDEX is not None:
+        task_path = _indexed_task_location(task_title)
+    if task_path is not None and task_path.exists():
+        _TASK_LOCATIONS[task_title] = task_path
+        return task_path
+
+    task_filename = f"{task_title}.md"
+    for status_dir in get_config()["tasks"]["status_map"].values():
+        task_path = PROJECT_ROOT / status_dir / task_filename
+        if task_path.exists():
+            _TASK_LOCATIONS[task_title] = task_path
+            return task_path
+    _TASK_LOCATIONS.pop(task_title, None)
+    return None
+
+
+def _indexed_task_location(task_title: str) -> Path | None:
+    """Looks up a task in the refreshed index, preferring earlier statuses."""
+    task_filename = f"{task_title}.md"
+    for status_dir in get_config()["tasks"]["status_map"].values():
+        rel_path = Path(status_dir).as_posix() + "/" + task_filename
+        if rel_path in _FRESH_TASK_INDEX:
+            return PROJECT_ROOT / rel_path
+    return None
+
+
+def record_task_location(
+    task_path: Path, status: str, old_path: Path | None = None
+) -> None:
+    """Records where a task lives after it was created, found or moved."""
+    record_task_locations([(task_path, status, old_path)])
+
+
+def record_task_locations(moves: list[tuple[Path, str, Path | None]]) -> None:
+    """Records several (task path, status, old path) locations at once."""
+    for task_path, _, _ in moves:
+        _TASK_LOCATIONS[task_path.stem] = task_path
+    try:
+        with closing(open_task_index()) as conn, conn:
+            for task_path, status, old_path in moves:
+                if old_path is not None:
+                    conn.execute(
+                        "DELETE FROM tasks WHERE path = ?",
+                        (old_path.relative_to(PROJECT_ROOT).as_posix(),),
+                    )
+                stat = task_path.stat()
+                rel_path = task_path.relative_to(PROJECT_ROOT).as_posix()
+                _upsert_task(conn, rel_path, status, stat.st_mtime_ns, stat.st_size)
+    except sqlite3.Error:
+        # The index is only an accelerator; the next refresh will catch up.
+        pass
+
+
+# ---
+# Dependency Graph
+# ---
+def parse_dependencies(deps_raw: str) -> set[str]:
+    """Parses a dependencies field like `[#001, #002]` into task titles."""
+    if TEMPLATE_PLACEHOLDER_RE.match(deps_raw.strip().strip("`")):
+        return set()
+    return {
+        d.strip().replace("#", "")
+        for d in deps_raw.strip().strip("`").strip("[]").split(",")
+        if d.strip()
+    }
+
+
+class TaskGraph:
+    """A dependency DAG over all tasks, built once and updated incrementally.
+
+    Edges point from a task to the tasks that depend on it. Dependencies on
+    titles that are not on the board count as permanently unfinished.
+    """
+
+    def __init__(self, tasks: list[dict], done_statuses: tuple = ("done",)):
+        self.tasks = {t["title"]: t for t in tasks}
+        self.done = {t["title"] for t in tasks if t["status"] in done_statuses}
+        self.deps = {
+            title: parse_dependencies(t.get("dependencies", "[]"))
+            for title, t in self.tasks.items()
+        }
+        self.dependents = {title: [] for title in self.tasks}
+        self.missing = {}
+        self.remaining = {}
+        for title, deps in self.deps.items():
+            for dep in deps:
+                if dep in self.dependents:
+                    self.dependents[dep].append(title)
+                else:
+                    self.missing.setdefault(title, set()).add(dep)
+            self.remaining[title] = sum(1 for d in deps if d not in self.done)
+
+    def is_ready(self, title: str) -> bool:
+        """Whether an unfinished task has no unfinished dependencies."""
+        return title not in self.done and self.remaining[title] == 0
+
+    def complete(self, title: str) -> list[str]:
+        """Marks a task done and returns the tasks it unblocked."""
+        if title in self.done:
+            return []
+        self.done.add(title)
+        unblocked = []
+        for dependent in self.dependents[title]:
+            self.remaining[dependent] -= 1
+            if self.is_ready(dependent):
+                unblocked.append(dependent)
+        return unblocked
+
+    def schedule(self, key) -> list[str]:
+        """Plans an order for the unfinished tasks by simulating completions.
+
+        Repeatedly takes the best ready task according to `key` and completes
+        it, which releases its dependents. Tasks blocked by cycles or missing
+        dependencies never become ready and are left out.
+        """
+        done, remaining = set(self.done), dict(self.remaining)
+        heap = [(key(t), t) for t in self.tasks if self.is_ready(t)]
+        heapq.heapify(heap)
+        order = []
+        while heap:
+            _, title = heapq.heappop(heap)
+            order.append(title)
+            for unblocked in self.complete(title):
+                heapq.heappush(heap, (key(unblocked), unblocked))
+        self.done, self.remaining = done, remaining
+        return order
+
+    def topological_order(self) -> tuple[list[str], set[str]]:
+        """Orders unfinished tasks so dependencies come first (Kahn's algorithm).
+
+        Returns the order and the set of tasks that could not be placed
+        because they sit on, or downstream of, a cycle.
+        """
+        open_tasks = [t for t in self.tasks if t not in self.done]
+        indegree = {
+            t: sum(1 for d in self.deps[t] if d in self.tasks and d not in self.done)
+            for t in open_tasks
+        }
+        queue = [t for t in open_tasks if indegree[t] == 0]
+        order = []
+        while queue:
+            title = queue.pop()
+            order.append(title)
+            for dependent in self.dependents[title]:
+                if dependent in indegree:
+                    indegree[dependent] -= 1
+                    if indegree[dependent] == 0:
+                        queue.append(dependent)
+        return order, set(open_tasks) - set(order)
+
+    def cycles(self) -> list[list[str]]:
+        """Returns one dependency cycle per group of mutually blocked tasks.
+
+        The groups are the strongly connected components found by an
+        iterative Tarjan's algorithm. For each, a shortest cycle through its
+        first task is traced along real edges and returned as a closed path
+        such as [a, b, c, a], where every task is a dependency of the next.
+        """
+        index_of, lowlink, on_stack = {}, {}, set()
+        stack, cycles = [], []
+        counter = 0
+        for root in self.tasks:
+            if root in index_of:
+                continue
+            work = [(root, iter(self.dependents[root]))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                for child in children:
+                    if child not in index_of:
+                        index_of[child] = lowlink[child] = counter
+                        counter += 1
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.dependents[child])))
+                        break
+                    if child in on_stack:
+                        lowlink[node] = min(lowlink[node], index_of[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index_of[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        if len(component) > 1 or node in self.deps[node]:
+                            cycles.append(self._cycle_path(set(component)))
+        return cycles
+
+    def _cycle_path(self, component: set[str]) -> list[str]:
+        """Traces a shortest closed path from the first task of a component."""
+        start = min(component)
+        previous = {}
+        queue = collections.deque([start])
+        while queue:
+            node = queue.popleft()
+            for dependent in sorted(self.dependents[node]):
+                if dependent == start:
+                    path = [node]
+                    while path[-1] != start:
+                        path.append(previous[path[-1]])
+                    return [*reversed(path), start]
+                if dependent in component and dependent not in previous:
+                    previous[dependent] = node
+                    queue.append(dependent)
+        return [start, start]
+
+    def rank(self) -> dict[str, tuple[int, int]]:
+        """Scores unfinished tasks by (critical path length, downstream tasks).
+
+        The critical path is the longest chain of unfinished tasks that starts
+        with the task; downstream counts the distinct unfinished tasks that
+        transitively wait on it. Both are computed in reverse topological order,
+        with downstream sets kept as integer bitsets.
+        """
+        order, _ = self.topological_order()
+        position = {title: i for i, title in enumerate(order)}
+        critical, downstream = {}, {}
+        for title in reversed(order):
+            longest, bits = 0, 0
+            for dependent in self.dependents[title]:
+                if dependent in position:
+                    longest = max(longest, critical[dependent])
+                    bits |= downstream[dependent] | (1 << position[dependent])
+            critical[title] = longest + 1
+            downstream[title] = bits
+        return {t: (critical[t], downstream[t].bit_count()) for t in order}
+
+    def blockers(self, title: str) -> list[tuple[int, str, str]]:
+        """Walks the unfinished dependencies of a task, depth first.
+
+        Returns (depth, title, note) rows, where note marks missing tasks,
+        dependencies that were already listed higher up and cycles that lead
+        back to the task itself.
+        """
+        rows, seen = [], {title}
+        work = [(1, d) for d in sorted(self.deps[title], reverse=True)]
+        while work:
+            depth, dep = work.pop()
+            if dep in self.done:
+                continue
+            if dep not in self.tasks:
+                rows.append((depth, dep, "not found"))
+                continue
+            if dep == title:
+                rows.append((depth, dep, "cycle back to this task"))
+                continue
+            if dep in seen:
+                rows.append((depth, dep, "see above"))
+                continue
+            seen.add(dep)
+            rows.append((depth, dep, self.tasks[dep]["status"]))
+            work.extend((depth + 1, d) for d in sorted(self.deps[dep], reverse=True))
+        return rows
+
+
+# ---
+# Index Commands
+# ---
+@click.group()
+def index():
+    """Commands for managing the task index."""
+    pass
+
+
+@index.command(name="rebuild")
+def index_rebuild():
+    """Discards the task index and re-parses every task file."""
+    TASK_INDEX_PATH.unlink(missing_ok=True)
+    with closing(open_task_index()) as conn:
+        current = refresh_task_index(conn)
+    click.echo(
+        click.style(f"✅ Task index rebuilt: {len(current)} tasks indexed.", fg="green")
+    )
+
+
+@index.command(name="verify")
+def index_verify():
+    """Checks the task index against the task directories without updating it."""
+    with closing(open_task_index()) as conn:
+        indexed = {
+            path: (status, mtime_ns, size)
+            for path, status, mtime_ns, size in conn.execute(
+                "SELECT path, status, mtime_ns, size FROM tasks"
+            )
+        }
+    on_disk = {
+        rel_path: (status, mtime_ns, size)
+        for rel_path, status, mtime_ns, size in scan_task_files()
+    }
+    missing = sorted(on_disk.keys() - indexed.keys())
+    orphaned = sorted(indexed.keys() - on_disk.keys())
+    stale = sorted(
+        p for p in on_disk.keys() & indexed.keys() if on_disk[p] != indexed[p]
+    )
+    for label, paths in (
+        ("Not indexed", missing),
+        ("Stale", stale),
+        ("No longer on disk", orphaned),
+    ):
+        for rel_path in paths:
+            click.echo(click.style(f"  - {label}: {rel_path}", fg="yellow"))
+
+    if missing or stale or orphaned:
+        click.echo(
+            click.style(
+                "Task index is out of date. It will be refreshed on next use, "
+                "or run 'index rebuild'.",
+                fg="red",
+            )
+        )
+        raise click.exceptions.Exit(1)
+    click.echo(
+        click.style(f"✅ Task index is up to date ({len(on_disk)} tasks).", fg="green")
+    )
@@ -0,0 +1,342 @@
+"""`check links`: broken links and references between tasks, specs and docs."""
+
+import fnmatch
+import hashlib
+import os
+import pickle
+import posixpath
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import click
+from click import echo, style
+
+from .core import PROJECT_ROOT, get_config, span, template_paths
+from .index import parse_dependencies, read_task_header, scan_task_files
+
+LINK_CACHE_PATH = PROJECT_ROOT / ".codecraft" / ".link_cache.pickle"
+LINK_CACHE_VERSION = 1
+# `[text](target "title")`, `![alt](<target>)` and `[label]: target`.
+INLINE_LINK_RE = re.compile(r"\]\(\s*(<[^>]*>|[^\s)]+)(?:\s+[\"'(][^)]*)?\s*\)")
+REFERENCE_LINK_RE = re.compile(r"^ {0,3}\[[^\]^][^\]]*\]:\s+(<[^>]*>|\S+)")
+HEADING_RE = re.compile(r"^#{1,6}\s+(.*?)(?:\s+#+)?\s*$")
+CODE_SPAN_RE = re.compile(r"`+[^`]*`+")
+URL_SCHEME_RE = re.compile(r"^[a-zA-Z][\w+.-]*:|^//")
+
+
+# ---
+# Reference Graph
+# ---
+# Every task, spec, ADR and document under `links.paths` is parsed into the
+# links it contains, the anchors of its headings and, for tasks, its
+# dependencies. Parse results are cached by content hash, so a file is only
+# parsed again when its bytes change; an mtime and size that still match
+# skip even the hashing. The references themselves are resolved against the
+# current files on every run, as a file that did not change can still point
+# at one that was moved or deleted.
+def heading_anchor(heading: str, seen: dict) -> str:
+    """Returns the anchor GitHub gives a heading, numbering repeated ones."""
+    anchor = re.sub(r"[^\w\- ]", "", heading.lower()).replace(" ", "-")
+    count = seen.get(anchor, 0)
+    seen[anchor] = count + 1
+    return f"{anchor}-{count}" if count else anchor
+
+
+def parse_references(path: Path, text: str, is_task: bool) -> dict:
+    """Returns the links, heading anchors and dependencies of a document.
+
+    Links are (line number, target) pairs with the target as written. Fenced
+    code blocks and code spans are skipped, as they hold examples.
+    """
+    links, anchors, seen = [], set(), {}
+    in_fence = False
+    for number, line in enumerate(text.splitlines(), 1):
+        if line.lstrip().startswith(("```", "~~~")):
+            in_fence = not in_fence
+            continue
+        if in_fence:
+            continue
+        match = HEADING_RE.match(line)
+        if match:
+            anchors.add(heading_anchor(match.group(1), seen))
+        line = CODE_SPAN_RE.sub("", line)
+        targets = INLINE_LINK_RE.findall(line)
+        match = REFERENCE_LINK_RE.match(line)
+        if match:
+            targets.append(match.group(1))
+        links.extend((number, target.strip("<>")) for target in targets)
+    dependencies = []
+    if is_task:
+        raw = read_task_header(path).get("dependencies", "[]")
+        dependencies = sorted(parse_dependencies(raw))
+    return {"links": links, "anchors": anchors, "dependencies": dependencies}
+
+
+def link_settings() -> dict:
+    return get_config().get("links") or {}
+
+
+def scan_link_files():
+    """Yields (relative path, is task, mtime_ns, size) for every file checked."""
+    config = get_config()
+    templates = template_paths("tasks", "specs", "adr")
+    for rel_path, _, mtime_ns, size in scan_task_files():
+        yield rel_path, True, mtime_ns, size
+    directories = [
+        config["directories"]["specs"],
+        config["directories"]["adr"],
+        *(link_settings().get("paths") or ()),
+    ]
+    seen = set()
+    stack = [Path(d).as_posix().strip("/") for d in directories]
+    while stack:
+        rel_dir = stack.pop()
+        if rel_dir in seen:
+            continue
+        seen.add(rel_dir)
+        try:
+            entries = os.scandir(PROJECT_ROOT / rel_dir)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}"
+                if entry.name.startswith("."):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(rel_path)
+                elif (
+                    entry.name.endswith(".md")
+                    and rel_path not in templates
+                    and entry.is_file()
+                ):
+                    stat = entry.stat()
+                    yield rel_path, False, stat.st_mtime_ns, stat.st_size
+
+
+def _parse_batch(batch: list[tuple[str, bool]], known: set) -> list[tuple]:
+    """Hashes files and parses those with new contents.
+
+    Returns (rel_path, key, parsed, error) tuples; parsed is None when the
+    key is in `known`, and key and parsed are None on errors.
+    """
+    results = []
+    for rel_path, is_task in batch:
+        path = PROJECT_ROOT / rel_path
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            key = (hashlib.blake2b(data, digest_size=16).hexdigest(), is_task)
+            parsed = None
+            if key not in known:
+                text = data.decode("utf-8", errors="replace")
+                parsed = parse_references(path, text, is_task)
+        except (OSError, UnicodeDecodeError) as e:
+            results.append((rel_path, None, None, e))
+            continue
+        results.append((rel_path, key, parsed, None))
+    return results
+
+
+class LinkCache:
+    """References per file content, persisted with pickle."""
+
+    def __init__(self, path: Path = LINK_CACHE_PATH):
+        self.path = path
+        self.files = {}  # rel_path -> (mtime_ns, size, key)
+        self.parsed = {}  # (digest, is task) -> parse_references()
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == LINK_CACHE_VERSION:
+                self.files = data["files"]
+                self.parsed = data["parsed"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+            pass
+        self.dirty = False
+
+    def refresh(self) -> tuple[dict, set[str], int]:
+        """Brings the cache in line with the files on disk.
+
+        Returns {rel_path: parsed references, or None if unreadable}, the
+        task titles and how many files were read again.
+        """
+        current, titles, changed = {}, set(), []
+        with span("scan link files") as scan:
+            for rel_path, is_task, mtime_ns, size in scan_link_files():
+                if is_task:
+                    titles.add(rel_path.rpartition("/")[2][: -len(".md")])
+                entry = self.files.get(rel_path)
+                if entry and entry[:2] == (mtime_ns, size) and entry[2][1] == is_task:
+                    parsed = self.parsed.get(entry[2])
+                    if parsed is not None:
+                        current[rel_path] = parsed
+                        continue
+                changed.append((rel_path, is_task, mtime_ns, size))
+            scan.set(files=len(current) + len(changed), changed=len(changed))
+
+        stats = {rel_path: (mtime_ns, size) for rel_path, _, mtime_ns, size in changed}
+        batches = [
+            [(rel_path, is_task) for rel_path, is_task, _, _ in changed[i : i + 64]]
+            for i in range(0, len(changed), 64)
+        ]
+        known = set(self.parsed)
+        with (
+            span("parse link files", files=len(changed)),
+            ThreadPoolExecutor() as executor,
+        ):
+            for results in executor.map(_parse_batch, batches, [known] * len(batches)):
+                for rel_path, key, parsed, error in results:
+                    if error is not None:
+                        # Left out of the cache, so the file is retried next time.
+                        echo(
+                            style(
+                                f"Warning: Could not parse '{rel_path}': {error}",
+                                fg="yellow",
+                            ),
+                            err=True,
+                        )
+                        self.files.pop(rel_path, None)
+                        current[rel_path] = None
+                        continue
+                    if parsed is not None:
+                        self.parsed[key] = parsed
+                    self.files[rel_path] = (*stats[rel_path], key)
+                    current[rel_path] = self.parsed[key]
+                    self.dirty = True
+        # Whatever is left over no longer exists on disk.
+        for rel_path in self.files.keys() - current.keys():
+            del self.files[rel_path]
+            self.dirty = True
+        return current, titles, len(changed)
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        live = {entry[2] for entry in self.files.values()}
+        data = {
+            "version": LINK_CACHE_VERSION,
+            "files": self.files,
+            "parsed": {k: p for k, p in self.parsed.items() if k in live},
+        }
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def find_broken_references(
+    current: dict, titles: set[str]
+) -> list[tuple[str, int | None, str]]:
+    """Returns (rel_path, line, problem) for every reference to nothing.
+
+    `current` and `titles` are what LinkCache.refresh returns. Problems are
+    ordered by file, and line numbers are None for metadata and file names.
+    """
+    config = get_config()
+    ignored = link_settings().get("ignore") or []
+    specs_prefix = Path(config["directories"]["specs"]).as_posix().strip("/") + "/"
+    languages = set(config["languages"]["supported"])
+    exists = {}
+
+    def target_exists(rel_target: str) -> bool:
+        if rel_target in current:
+            return True
+        if rel_target not in exists:
+            exists[rel_target] = not rel_target.startswith("../") and os.path.exists(
+                PROJECT_ROOT / rel_target
+            )
+        return exists[rel_target]
+
+    problems = []
+    for rel_path, parsed in sorted(current.items()):
+        if parsed is None:
+            continue
+        base = posixpath.dirname(rel_path)
+        for number, target in parsed["links"]:
+            if URL_SCHEME_RE.match(target) or any(
+                fnmatch.fnmatchcase(target, pattern) for pattern in ignored
+            ):
+                continue
+            link_path, _, anchor = target.partition("#")
+            if "%" in link_path:
+                # Percent-encoded paths are rare, and urllib.parse is slow to import.
+                from urllib.parse import unquote
+
+                link_path = unquote(link_path)
+            if not link_path:
+                rel_target = rel_path
+            elif link_path.startswith("/"):
+                rel_target = posixpath.normpath(link_path.lstrip("/"))
+            else:
+                rel_target = posixpath.normpath(posixpath.join(base, link_path))
+            if not target_exists(rel_target):
+                problems.append((rel_path, number, f"broken link '{target}'"))
+            elif anchor and current.get(rel_target) is not None:
+                if anchor.lower() not in current[rel_target]["anchors"]:
+                    problems.append((rel_path, number, f"unknown anchor '{target}'"))
+        for dependency in parsed["dependencies"]:
+            if dependency not in titles:
+                problems.append((rel_path, None, f"unknown dependency '#{dependency}'"))
+        if (
+            rel_path.startswith(specs_prefix)
+            and "/" not in rel_path[len(specs_prefix) :]
+        ):
+            # Specs are named `<task>.<lang>.md` after the task they specify.
+            title, _, lang = rel_path[len(specs_prefix) : -len(".md")].rpartition(".")
+            if lang in languages and title not in titles:
+                problems.append((rel_path, None, f"spec for unknown task '{title}'"))
+    return problems
+
+
+# ---
+# Check Commands
+# ---
+@click.group()
+def check():
+    """Commands for checking the project's documents."""
+    pass
+
+
+@check.command(name="links")
+@click.option(
+    "--rebuild", is_flag=True, help="Discard the cache and re-parse all files."
+)
+def check_links(rebuild: bool):
+    """Finds broken links, dependencies and spec names in tasks and docs.
+
+    Checks Markdown links (and their #anchors) in tasks, specs, ADRs and the
+    directories under `links.paths`, task dependencies such as `#001`, and
+    that every `<task>.<lang>.md` spec names an existing task. Exits with 1
+    if anything is broken, so it can run as a pre-commit hook.
+    """
+    if rebuild:
+        LINK_CACHE_PATH.unlink(missing_ok=True)
+    cache = LinkCache()
+    current, titles, changed = cache.refresh()
+    cache.save()
+    with span("resolve references"):
+        problems = find_broken_references(current, titles)
+    for rel_path, number, problem in problems:
+        location = rel_path if number is None else f"{rel_path}:{number}"
+        echo(style(f"  - {location}: {problem}", fg="yellow"))
+    if problems:
+        files = len({rel_path for rel_path, _, _ in problems})
+        echo(
+            style(
+                f"Found {len(problems)} broken reference(s) in {files} file(s).",
+                fg="red",
+            )
+        )
+        raise click.exceptions.Exit(1)
+    echo(
+        style(
+            f"✅ No broken references in {len(current)} file(s)"
+            f" ({changed} changed since the last check).",
+            fg="green",
+        )
+    )
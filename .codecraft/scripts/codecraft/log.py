@@ -0,0 +1,458 @@
+"""The interaction log and the `log` commands."""
+
+import datetime
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+import zlib
+from contextlib import closing
+from pathlib import Path
+
+import click
+
+from .core import (
+    INTERACTION_LOG_NAME,
+    LOG_INDEX_PATH,
+    LOG_INDEX_VERSION,
+    LOG_LOCK_PATH,
+    LOG_MEMBER_BYTES,
+    PROJECT_ROOT,
+    get_config,
+    locked_file,
+    span,
+)
+
+# ---
+# Interaction Log
+# ---
+# Agent actions are appended as JSON lines to project_logs/interactions.jsonl
+# under an exclusive lock, so concurrent writers never interleave. The active
+# segment is rotated to interactions-<time>.jsonl[.gz] by size or age. A
+# compressed segment is a series of independent gzip members (still readable
+# with zcat), so one entry can be read without inflating the whole file. A
+# SQLite sidecar maps each entry's time and action to its segment, member and
+# offset; it only ever reads the bytes appended since it was last synced.
+LOG_ACTION_TITLES = {"delete": "File Deletion Log"}
+LOG_ANSWER_LABELS = {
+    "purpose": "Q1 (Purpose)",
+    "reason": "Q2 (Reason)",
+    "consequences": "Q3 (Consequences)",
+}
+
+
+def interaction_log_path() -> Path:
+    """Returns the active segment of the interaction log."""
+    logs_dir = PROJECT_ROOT / get_config()["directories"]["project_logs"]
+    return logs_dir / f"{INTERACTION_LOG_NAME}.jsonl"
+
+
+def interaction_log_segments() -> list[Path]:
+    """Returns the log's segments oldest first; the active one comes last."""
+    active = interaction_log_path()
+    rotated = sorted(
+        active.parent.glob(f"{INTERACTION_LOG_NAME}-*.jsonl*"), key=segment_order
+    )
+    return rotated + ([active] if active.exists() else [])
+
+
+def segment_order(path: Path) -> tuple[str, int]:
+    """Sorts `interactions-<time>[-<n>].jsonl[.gz]` by time, then by n.
+
+    Segments rotated within the same second get `-1`, `-2`, ... after the
+    first, which sorts before the bare name as text.
+    """
+    stem = path.name[len(INTERACTION_LOG_NAME) + 1 :].partition(".")[0]
+    stamp, _, n = stem.partition("-")
+    return stamp, int(n) if n.isdigit() else 0
+
+
+def render_log_markdown(entry: dict) -> str:
+    """Renders a log entry in the human-readable ai_interactions.md format."""
+    title = LOG_ACTION_TITLES.get(entry["action"], f"{entry['action']} log")
+    lines = ["\n---\n", f"### {title}: {entry['ts']}\n"]
+    paths = entry.get("paths", [])
+    if len(paths) == 1:
+        lines.append(f"- **File:** `{paths[0]}`\n")
+    elif paths:
+        lines.append(f"- **Files:** {len(paths)} items\n")
+        lines.extend(f"  - `{path}`\n" for path in paths)
+    if entry.get("summary"):
+        lines.append(f"- **Action:** {entry['summary']}\n")
+    for key, answer in entry.get("answers", {}).items():
+        lines.append(f"- **{LOG_ANSWER_LABELS.get(key, key)}:** {answer}\n")
+    return "".join(lines)
+
+
+def log_timestamp(entry: dict) -> float:
+    return datetime.datetime.fromisoformat(entry["ts"]).timestamp()
+
+
+def rotation_due(active: Path, settings: dict) -> bool:
+    """Tells whether the active segment has outgrown the rotation policy."""
+    try:
+        size = active.stat().st_size
+    except FileNotFoundError:
+        return False
+    if not size:
+        return False
+    if settings.get("max_bytes") is not None and size >= settings["max_bytes"]:
+        return True
+    if settings.get("max_age_days") is None:
+        return False
+    with open(active, "rb") as f:
+        first_line = f.readline()
+    try:
+        first_ts = log_timestamp(json.loads(first_line))
+    except (ValueError, KeyError, TypeError):
+        return False
+    return time.time() - first_ts > settings["max_age_days"] * 86400
+
+
+def rotate_interaction_log(compress: bool, sync: bool) -> Path | None:
+    """Seals the active segment; call with the log lock held."""
+    active = interaction_log_path()
+    if not active.exists() or not active.stat().st_size:
+        return None
+    with open(active, "rb") as f:
+        first_line = f.readline()
+    try:
+        first_ts = log_timestamp(json.loads(first_line))
+    except (ValueError, KeyError, TypeError):
+        first_ts = active.stat().st_mtime
+    stamp = datetime.datetime.fromtimestamp(first_ts).strftime("%Y%m%dT%H%M%S")
+    # Number the name past every segment from the same second, compressed
+    # or not, so segment_order puts this one last.
+    name, n = f"{INTERACTION_LOG_NAME}-{stamp}", 0
+    while any(
+        active.with_name(name + suffix).exists() for suffix in (".jsonl", ".jsonl.gz")
+    ):
+        n += 1
+        name = f"{INTERACTION_LOG_NAME}-{stamp}-{n}"
+    target = active.with_name(name + (".jsonl.gz" if compress else ".jsonl"))
+
+    if not compress:
+        os.rename(active, target)
+        return target
+    tmp_path = target.with_name(f".{target.name}.tmp")
+    with open(active, "rb") as src, open(tmp_path, "wb") as dst:
+        # One gzip member per block of whole lines keeps entries seekable.
+        for lines in iter(lambda: src.readlines(LOG_MEMBER_BYTES), []):
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+            dst.write(compressor.compress(b"".join(lines)) + compressor.flush())
+        if sync:
+            dst.flush()
+            os.fsync(dst.fileno())
+    os.replace(tmp_path, target)
+    active.unlink()
+    return target
+
+
+def append_log_entry(action: str, **fields) -> None:
+    """Appends one entry to the interaction log, rotating it when due.
+
+    `log.fsync` decides durability: "always" syncs every entry, "rotate"
+    only sealed segments, "never" leaves it to the OS.
+    """
+    settings = get_config().get("log") or {}
+    fsync = settings.get("fsync", "always")
+    entry = {
+        "ts": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "action": action,
+        **fields,
+    }
+    data = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+    active = interaction_log_path()
+    active.parent.mkdir(parents=True, exist_ok=True)
+
+    with locked_file(LOG_LOCK_PATH):
+        if rotation_due(active, settings.get("rotate") or {}):
+            rotate_interaction_log(settings.get("compress", True), fsync != "never")
+        with open(active, "a+b") as f:
+            # A writer killed mid-line leaves a torn tail; start on a new line.
+            if (
+                f.seek(0, os.SEEK_END)
+                and os.pread(f.fileno(), 1, f.tell() - 1) != b"\n"
+            ):
+                data = b"\n" + data
+            f.write(data)
+            if fsync == "always":
+                f.flush()
+                os.fsync(f.fileno())
+        if settings.get("markdown", True):
+            with open(
+                active.with_name("ai_interactions.md"), "a", encoding="utf-8"
+            ) as f:
+                f.write(render_log_markdown(entry))
+
+
+def open_log_index(db_path: Path = LOG_INDEX_PATH) -> sqlite3.Connection:
+    """Opens the log's offset index, resetting it if it is corrupt or outdated."""
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        db_path.unlink(missing_ok=True)
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value)")
+        row = None
+    if row is None or row[0] != LOG_INDEX_VERSION:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS segments")
+            conn.execute("DROP TABLE IF EXISTS entries")
+            conn.execute(
+                """CREATE TABLE segments (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    head TEXT NOT NULL
+                )"""
+            )
+            conn.execute(
+                """CREATE TABLE entries (
+                    id INTEGER PRIMARY KEY,
+                    segment TEXT NOT NULL,
+                    ts REAL NOT NULL,
+                    action TEXT NOT NULL,
+                    member INTEGER,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX entries_ts ON entries (ts)")
+            conn.execute("CREATE INDEX entries_action ON entries (action, ts)")
+            conn.execute("CREATE INDEX entries_segment ON entries (segment)")
+            conn.execute("DELETE FROM meta")
+            conn.execute("INSERT INTO meta VALUES ('version', ?)", (LOG_INDEX_VERSION,))
+    return conn
+
+
+def _scan_log_lines(data: bytes, base: int) -> tuple[list[tuple], int]:
+    """Returns (ts, action, offset, length) per complete line, and bytes used."""
+    rows, pos = [], 0
+    while (end := data.find(b"\n", pos)) >= 0:
+        try:
+            entry = json.loads(data[pos:end])
+            rows.append(
+                (log_timestamp(entry), str(entry["action"]), base + pos, end - pos)
+            )
+        except (ValueError, KeyError, TypeError):
+            pass  # A torn or hand-edited line.
+        pos = end + 1
+    return rows, pos
+
+
+def iter_log_members(path: Path):
+    """Yields (offset, data) for each gzip member of a compressed segment."""
+    raw = memoryview(path.read_bytes())
+    pos = 0
+    while pos < len(raw):
+        decompressor = zlib.decompressobj(31)
+        yield pos, decompressor.decompress(raw[pos:])
+        if not decompressor.eof:
+            break
+        pos = len(raw) - len(decompressor.unused_data)
+
+
+def read_log_member(path: Path, offset: int) -> bytes:
+    decompressor = zlib.decompressobj(31)
+    chunks = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while not decompressor.eof and (block := f.read(LOG_MEMBER_BYTES)):
+            chunks.append(decompressor.decompress(block))
+    return b"".join(chunks)
+
+
+def segment_head(path: Path) -> str:
+    """Fingerprints a segment's first bytes, to notice it being replaced."""
+    with open(path, "rb") as f:
+        return hashlib.blake2b(f.read(256), digest_size=8).hexdigest()
+
+
+def sync_log_index(conn: sqlite3.Connection) -> int:
+    """Indexes whatever the log gained since the last sync.
+
+    The active segment only grows, so it is read from where the last sync
+    stopped; it is re-read in full only if it shrank or its first bytes
+    changed (it was rotated, or replaced by a checkout). Returns the number
+    of entries added.
+    """
+    known = {
+        name: (size, mtime_ns, head)
+        for name, size, mtime_ns, head in conn.execute("SELECT * FROM segments")
+    }
+    segments = interaction_log_segments()
+    added = 0
+    with conn, span("sync log index", segments=len(segments)) as sync:
+        for name in known.keys() - {path.name for path in segments}:
+            conn.execute("DELETE FROM entries WHERE segment = ?", (name,))
+            conn.execute("DELETE FROM segments WHERE name = ?", (name,))
+        for path in segments:
+            stat = path.stat()
+            previous = known.get(path.name)
+            if previous and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+                continue
+            head = segment_head(path)
+            start = 0
+            if (
+                path.suffix == ".jsonl"
+                and previous
+                and previous[2] == head
+                and previous[0] <= stat.st_size
+            ):
+                start = previous[0]
+            else:
+                conn.execute("DELETE FROM entries WHERE segment = ?", (path.name,))
+
+            rows = []
+            if path.suffix == ".gz":
+                for member, data in iter_log_members(path):
+                    lines, _ = _scan_log_lines(data, 0)
+                    rows.extend(
+                        (path.name, *line[:2], member, *line[2:]) for line in lines
+                    )
+                size = stat.st_size
+            else:
+                with open(path, "rb") as f:
+                    f.seek(start)
+                    lines, used = _scan_log_lines(f.read(), start)
+                rows.extend((path.name, *line[:2], None, *line[2:]) for line in lines)
+                # A torn last line is left for the next sync.
+                size = start + used
+            conn.executemany(
+                "INSERT INTO entries (segment, ts, action, member, offset, length)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO segments VALUES (?, ?, ?, ?)",
+                (path.name, size, stat.st_mtime_ns, head),
+            )
+            added += len(rows)
+        sync.set(added=added)
+    return added
+
+
+def query_log_index(
+    conn: sqlite3.Connection,
+    since: float | None,
+    until: float | None,
+    actions: tuple[str, ...],
+    limit: int | None,
+) -> list[dict]:
+    """Returns matching entries, oldest first; `limit` keeps the newest."""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("ts < ?")
+        params.append(until)
+    if actions:
+        clauses.append(f"action IN ({', '.join('?' * len(actions))})")
+        params.extend(actions)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = conn.execute(
+        f"SELECT segment, member, offset, length FROM entries {where}"
+        " ORDER BY ts DESC, id DESC LIMIT ?",
+        (*params, -1 if limit is None else limit),
+    ).fetchall()
+
+    logs_dir = interaction_log_path().parent
+    entries, member_key, member_data = [], None, b""
+    for segment, member, offset, length in reversed(rows):
+        path = logs_dir / segment
+        if member is None:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                raw = f.read(length)
+        else:
+            if member_key != (segment, member):
+                member_key, member_data = (
+                    (segment, member),
+                    read_log_member(path, member),
+                )
+            raw = member_data[offset : offset + length]
+        entries.append(json.loads(raw))
+    return entries
+
+
+def parse_log_time(value: str | None) -> float | None:
+    """Parses an ISO date/time or a relative age such as 30m, 12h or 7d."""
+    if value is None:
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([smhdw])", value.strip())
+    if match:
+        units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+        return time.time() - float(match.group(1)) * units[match.group(2)]
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise click.BadParameter(
+            f"'{value}' is neither an ISO date/time nor an age like 7d."
+        ) from None
+
+
+@click.group(name="log")
+def interaction_log():
+    """Commands for the structured interaction log."""
+    pass
+
+
+@interaction_log.command(name="query")
+@click.option("--since", help="Only entries at or after this time (ISO, or e.g. 7d).")
+@click.option("--until", help="Only entries before this time (ISO, or e.g. 1h).")
+@click.option("--action", "actions", multiple=True, help="Only these actions.")
+@click.option("--limit", type=int, help="Show at most this many (the newest).")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json", "markdown"]),
+    default="text",
+    show_default=True,
+)
+def log_query(
+    since: str | None,
+    until: str | None,
+    actions: tuple[str, ...],
+    limit: int | None,
+    output_format: str,
+):
+    """Lists interaction log entries through the offset index."""
+    since_ts, until_ts = parse_log_time(since), parse_log_time(until)
+    with locked_file(LOG_LOCK_PATH), closing(open_log_index()) as conn:
+        sync_log_index(conn)
+        entries = query_log_index(conn, since_ts, until_ts, actions, limit)
+
+    if not entries:
+        click.echo(click.style("No matching log entries.", fg="yellow"))
+        return
+    for entry in entries:
+        if output_format == "json":
+            click.echo(json.dumps(entry, ensure_ascii=False))
+        elif output_format == "markdown":
+            click.echo(render_log_markdown(entry), nl=False)
+        else:
+            paths = entry.get("paths", [])
+            target = paths[0] if len(paths) == 1 else f"{len(paths)} paths"
+            click.echo(f"{entry['ts']}  {entry['action']:<8}  {target}")
+
+
+@interaction_log.command(name="rotate")
+def log_rotate():
+    """Seals the active log segment now, regardless of the rotation policy."""
+    settings = get_config().get("log") or {}
+    with locked_file(LOG_LOCK_PATH):
+        target = rotate_interaction_log(
+            settings.get("compress", True), settings.get("fsync", "always") != "never"
+        )
+    if target is None:
+        click.echo(click.style("The interaction log is empty.", fg="yellow"))
+        return
+    click.echo(
+        click.style(f"✅ Rotated to {target.relative_to(PROJECT_ROOT)}.", fg="green")
+    )
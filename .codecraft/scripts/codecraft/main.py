@@ -0,0 +1,141 @@
+"""The root `cli` group, which imports each subcommand's module on first use."""
+
+import importlib
+from pathlib import Path
+
+import click
+from click.utils import make_default_short_help
+
+from .core import span, start_tracing
+
+# ---
+# Click Command Groups
+# ---
+# Command name -> ("module:attribute" in this package, help shown by `--help`).
+# The help is repeated here so listing the commands imports none of them.
+LAZY_COMMANDS = {
+    "check": ("links:check", "Commands for checking the project's documents."),
+    "complete": ("workflow:complete", "Completes a task on the current branch."),
+    "config": ("config:config", "Manages local project configuration."),
+    "context": ("context:context", "Commands for the Context Engineering Engine."),
+    "daemon": (
+        "daemon:daemon",
+        "Commands for the resident CLI server (see scripts/client.py).",
+    ),
+    "delete": (
+        "trash:delete",
+        "Safely deletes a file or directory by moving it to the .trash.",
+    ),
+    "deps": ("workflow:deps", "Commands for inspecting task dependencies."),
+    "index": ("index:index", "Commands for managing the task index."),
+    "init": (
+        "workflow:init",
+        "Initializes the CodeCraft framework in a project safely.",
+    ),
+    "log": ("log:interaction_log", "Commands for the structured interaction log."),
+    "openspec": ("openspec:openspec", "Commands for OpenSpec change proposals."),
+    "spec": ("task:spec", "Commands for managing specification documents."),
+    "start": (
+        "workflow:start",
+        "Starts a task: creates a branch and moves the task file.",
+    ),
+    "suggest": (
+        "workflow:suggest",
+        "Suggests the next task to work on based on priority and dependencies.",
+    ),
+    "task": ("task:task", "Commands for managing tasks."),
+    "trash": ("trash:trash", "Commands for managing the trash can."),
+}
+
+
+class LazyGroup(click.Group):
+    """A group whose subcommands are imported when they are first looked up."""
+
+    def __init__(self, *args, lazy_commands: dict | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_commands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            self.add_command(self.load_command(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def load_command(self, cmd_name: str) -> click.Command:
+        module_name, attribute = self.lazy_commands[cmd_name][0].split(":")
+        with span("import", module=module_name):
+            module = importlib.import_module(f".{module_name}", __package__)
+        return getattr(module, attribute)
+
+    def load_all(self) -> None:
+        """Imports every subcommand, as a resident process wants up front."""
+        for cmd_name in self.lazy_commands:
+            self.get_command(None, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter) -> None:
+        """Lists the subcommands without importing those not loaded yet."""
+        rows = []
+        names = self.list_commands(ctx)
+        limit = formatter.width - 6 - max(map(len, names), default=0)
+        for cmd_name in names:
+            cmd = self.commands.get(cmd_name)
+            if cmd is None:
+                rows.append(
+                    (
+                        cmd_name,
+                        make_default_short_help(self.lazy_commands[cmd_name][1], limit),
+                    )
+                )
+            elif not cmd.hidden:
+                rows.append((cmd_name, cmd.get_short_help_str(limit)))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+class RootGroup(LazyGroup):
+    """The `cli` group; tracing starts before a subcommand is imported."""
+
+    def invoke(self, ctx: click.Context):
+        start_tracing(
+            ctx,
+            ctx.params["show_timings"],
+            ctx.params["profile"],
+            ctx.params["profile_path"],
+        )
+        return super().invoke(ctx)
+
+
+@click.group(cls=RootGroup, lazy_commands=LAZY_COMMANDS)
+@click.option(
+    "--timings",
+    "show_timings",
+    is_flag=True,
+    help="Print a tree of timed phases to stderr when the command ends.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Run under cProfile and print the slowest functions to stderr.",
+)
+@click.option(
+    "--profile-out",
+    "profile_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    help="Run under cProfile and save the stats for pstats or snakeviz.",
+)
+def cli(show_timings: bool, profile: bool, profile_path: Path | None):
+    """CodeCraftAI CLI: Manages workflows, tools, and configuration.
+
+    Set CODECRAFT_TRACE to a file (or `-` for stderr) to append the timed
+    phases of every command to it as JSON lines.
+    """
+    pass
+
+
+@cli.group()
+def ai():
+    """Smart commands for AI-assisted code optimization."""
+    pass
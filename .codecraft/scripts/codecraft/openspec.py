@@ -0,0 +1,331 @@
+"""The `openspec` dashboard over openspec/changes."""
+
+import itertools
+import json
+import os
+import pickle
+import re
+from pathlib import Path
+
+import click
+from click import Abort, echo, style
+
+from .core import (
+    MAX_HEADER_LINES,
+    OPENSPEC_CACHE_PATH,
+    OPENSPEC_CACHE_VERSION,
+    OPENSPEC_CHANGES_DIR,
+    OPENSPEC_CHECKBOX_RE,
+    OPENSPEC_FILES,
+    OPENSPEC_PHASE_RE,
+    PROJECT_ROOT,
+    span,
+)
+from .index import parse_task_header
+
+
+# ---
+# OpenSpec
+# ---
+# `openspec status` summarises every change under openspec/changes: the
+# status from its spec.md header, and its phases and checklist progress from
+# tasks.md. Parse results are cached per file by (mtime, size), so a warm run
+# only lists the change directories and stats their files.
+def parse_openspec_spec(path: Path) -> dict:
+    """Returns the title, status, summary and author of a change's spec.md.
+
+    Raises OSError or UnicodeDecodeError on unreadable files.
+    """
+    title = path.parent.name
+    header = []
+    with open(path, "rb") as f:
+        for raw_line in itertools.islice(f, MAX_HEADER_LINES):
+            line = raw_line.decode("utf-8")
+            if line.strip() == "---":
+                break
+            header.append(line)
+    for line in header:
+        if line.startswith("# "):
+            # `# SpecKit 规约：Title` and `# Spec: Title` alike.
+            title = re.split(r"[:：]", line[2:], maxsplit=1)[-1].strip()
+            break
+    metadata = parse_task_header(header)
+    return {
+        "title": title,
+        "status": metadata.get("status", ""),
+        "summary": metadata.get("summary", ""),
+        "author": metadata.get("author", ""),
+    }
+
+
+def parse_openspec_tasks(path: Path) -> list[dict]:
+    """Returns the phases of a tasks.md with their checklist items.
+
+    Items above the first level-two heading belong to an untitled phase,
+    which is dropped if it has none.
+    """
+    phases = [{"title": "", "done": 0, "total": 0, "open": []}]
+    in_fence = False
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line.lstrip().startswith("```"):
+                in_fence = not in_fence
+                continue
+            if in_fence:
+                continue
+            match = OPENSPEC_PHASE_RE.match(line)
+            if match:
+                phases.append(
+                    {"title": match.group(1), "done": 0, "total": 0, "open": []}
+                )
+                continue
+            match = OPENSPEC_CHECKBOX_RE.match(line)
+            if match:
+                phase = phases[-1]
+                phase["total"] += 1
+                if match.group(1) == " ":
+                    phase["open"].append(match.group(2).strip())
+                else:
+                    phase["done"] += 1
+    if not phases[0]["total"]:
+        phases.pop(0)
+    return phases
+
+
+class OpenSpecIndex:
+    """Parsed spec.md and tasks.md files, keyed by path and persisted with pickle."""
+
+    def __init__(self, path: Path = OPENSPEC_CACHE_PATH):
+        self.path = path
+        self.files = {}  # rel_path -> (mtime_ns, size, parsed)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+            if data.get("version") == OPENSPEC_CACHE_VERSION:
+                self.files = data["files"]
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, TypeError):
+            pass
+        self.dirty = False
+
+    def parse(self, entry: os.DirEntry):
+        rel_path = Path(entry.path).relative_to(PROJECT_ROOT).as_posix()
+        stat = entry.stat()
+        cached = self.files.get(rel_path)
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        path = Path(entry.path)
+        try:
+            if entry.name == "spec.md":
+                parsed = parse_openspec_spec(path)
+            else:
+                parsed = parse_openspec_tasks(path)
+        except (OSError, UnicodeDecodeError) as e:
+            click.echo(
+                click.style(f"Warning: Could not parse '{rel_path}': {e}", fg="yellow"),
+                err=True,
+            )
+            return None
+        self.files[rel_path] = (stat.st_mtime_ns, stat.st_size, parsed)
+        self.dirty = True
+        return parsed
+
+    def changes(self) -> list[dict]:
+        """Returns every change directory, parsed, sorted by name.
+
+        A change is a directory holding a spec.md or tasks.md; other
+        directories (such as `feat/`) are walked for changes beneath them.
+        """
+        changes, seen = [], set()
+        stack = [OPENSPEC_CHANGES_DIR]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            files = {e.name: e for e in entries if e.name in OPENSPEC_FILES}
+            if not files:
+                stack.extend(
+                    e.path
+                    for e in entries
+                    if not e.name.startswith(".") and e.is_dir(follow_symlinks=False)
+                )
+                continue
+            name = Path(directory).relative_to(OPENSPEC_CHANGES_DIR).as_posix()
+            change = {
+                "name": name,
+                "title": Path(directory).name,
+                "status": "",
+                "summary": "",
+                "author": "",
+                "phases": [],
+            }
+            if "spec.md" in files:
+                change.update(self.parse(files["spec.md"]) or {})
+            if "tasks.md" in files:
+                change["phases"] = self.parse(files["tasks.md"]) or []
+            seen.update(
+                Path(e.path).relative_to(PROJECT_ROOT).as_posix()
+                for e in files.values()
+            )
+            change["done"] = sum(p["done"] for p in change["phases"])
+            change["total"] = sum(p["total"] for p in change["phases"])
+            change["phase"] = next(
+                (i for i, p in enumerate(change["phases"]) if p["done"] < p["total"]),
+                None,
+            )
+            changes.append(change)
+
+        if self.files.keys() - seen:
+            self.files = {k: v for k, v in self.files.items() if k in seen}
+            self.dirty = True
+        return sorted(changes, key=lambda c: c["name"])
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {"version": OPENSPEC_CACHE_VERSION, "files": self.files},
+                    f,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+
+def progress_bar(done: int, total: int, width: int = 12) -> str:
+    filled = round(width * done / total) if total else 0
+    return "█" * filled + "░" * (width - filled)
+
+
+def describe_openspec_phase(change: dict) -> str:
+    """Names the first unfinished phase, e.g. `2/4 Phase 2: Core`."""
+    if not change["total"]:
+        return "no checklist"
+    if change["phase"] is None:
+        return "complete"
+    title = change["phases"][change["phase"]]["title"] or "(untitled)"
+    return f"{change['phase'] + 1}/{len(change['phases'])} {title}"
+
+
+@click.group()
+def openspec():
+    """Commands for OpenSpec change proposals."""
+    pass
+
+
+@openspec.command(name="status")
+@click.option(
+    "--status", "statuses", multiple=True, help="Only changes with this status."
+)
+@click.option(
+    "--pending", is_flag=True, help="Hide changes whose checklist is complete."
+)
+@click.option("--rebuild", is_flag=True, help="Discard the parse cache first.")
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+)
+def openspec_status(
+    statuses: tuple[str, ...], pending: bool, rebuild: bool, output_format: str
+):
+    """Shows the status, current phase and checklist progress of every change."""
+    if rebuild:
+        OPENSPEC_CACHE_PATH.unlink(missing_ok=True)
+    index = OpenSpecIndex()
+    with span("scan openspec changes") as scan:
+        changes = index.changes()
+        scan.set(changes=len(changes))
+    index.save()
+
+    wanted = {s.casefold() for s in statuses}
+    changes = [
+        c
+        for c in changes
+        if (not wanted or c["status"].casefold() in wanted)
+        and not (pending and c["total"] and c["phase"] is None)
+    ]
+    if output_format == "json":
+        for change in changes:
+            change = {k: v for k, v in change.items() if k != "phases"} | {
+                "phases": [
+                    {k: v for k, v in p.items() if k != "open"}
+                    for p in change["phases"]
+                ]
+            }
+            echo(json.dumps(change, ensure_ascii=False))
+        return
+    if not changes:
+        echo(style("No OpenSpec changes found.", fg="yellow"))
+        return
+
+    width = min(max(len(c["name"]) for c in changes), 40)
+    status_width = max(len(c["status"]) for c in changes) + 2
+    lines = []
+    for change in changes:
+        done, total = change["done"], change["total"]
+        percent = f"{100 * done // total:>3}%" if total else "   -"
+        lines.append(
+            f"{change['name'][:width]:<{width}}  "
+            f"{change['status'] or '-':<{status_width}}"
+            f"{progress_bar(done, total)} {percent} {done:>3}/{total:<3}  "
+            f"{describe_openspec_phase(change)}"
+        )
+    echo("\n".join(lines))
+
+    counts = {}
+    for change in changes:
+        counts[change["status"] or "-"] = counts.get(change["status"] or "-", 0) + 1
+    done = sum(c["done"] for c in changes)
+    total = sum(c["total"] for c in changes)
+    summary = ", ".join(f"{n} {s}" for s, n in sorted(counts.items()))
+    echo(
+        style(
+            f"\n{len(changes)} change(s) ({summary}); {done}/{total} checklist items done.",
+            fg="cyan",
+        )
+    )
+
+
+@openspec.command(name="show")
+@click.argument("name")
+def openspec_show(name: str):
+    """Shows one change's phases and its open checklist items."""
+    index = OpenSpecIndex()
+    with span("scan openspec changes") as scan:
+        changes = index.changes()
+        scan.set(changes=len(changes))
+    index.save()
+    matches = [c for c in changes if name in (c["name"], c["name"].rpartition("/")[2])]
+    if not matches:
+        echo(style(f"Error: OpenSpec change '{name}' not found.", fg="red"), err=True)
+        raise Abort()
+
+    change = matches[0]
+    echo(style(f"{change['name']}: {change['title']}", fg="cyan", bold=True))
+    for label, key in (
+        ("Status", "status"),
+        ("Owner", "author"),
+        ("Summary", "summary"),
+    ):
+        if change[key]:
+            echo(f"  {label + ':':<9}{change[key]}")
+    if not change["phases"]:
+        echo(style("\nNo checklist in tasks.md.", fg="yellow"))
+        return
+    for number, phase in enumerate(change["phases"]):
+        done, total = phase["done"], phase["total"]
+        marker = "▶" if number == change["phase"] else " "
+        echo(
+            f"\n{marker} {phase['title'] or '(untitled)'}  "
+            f"{progress_bar(done, total)} {done}/{total}"
+        )
+        for item in phase["open"]:
+            echo(f"    - [ ] {item}")
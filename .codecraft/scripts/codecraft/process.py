@@ -0,0 +1,298 @@
+"""Child processes: commands, git, concurrent steps and background runs."""
+
+import functools
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from pathlib import Path
+
+import click
+
+from .core import CLI_PATH, PROJECT_ROOT, get_config, span
+
+
+# ---
+# Process Helpers
+# ---
+def run_command(
+    command: list[str], cwd: Path | None = PROJECT_ROOT, quiet: bool = False
+) -> str:
+    """Runs a command and handles errors."""
+    try:
+        with span("subprocess", argv=command):
+            result = subprocess.run(
+                command,
+                check=True,
+                capture_output=True,
+                text=True,
+                cwd=cwd,
+                encoding="utf-8",
+            )
+        return result.stdout.strip()
+    except subprocess.CalledProcessError as e:
+        if not quiet:
+            error_msg = e.stderr.strip() or e.stdout.strip()
+            click.echo(click.style(f"Command failed: {error_msg}", fg="red"))
+        raise click.Abort()
+
+
+def run_git_command(command: list[str], quiet: bool = False):
+    return get_git_backend().run(command, quiet=quiet)
+
+
+def spawn_background(args: list[str], log_path: Path) -> None:
+    """Re-runs this CLI with `args` as a detached process logging to a file."""
+    log_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as log:
+        process = subprocess.Popen(
+            [sys.executable, str(CLI_PATH), *args],
+            cwd=PROJECT_ROOT,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    click.echo(
+        f"Running in the background (pid {process.pid}); "
+        f"progress is logged to {log_path.relative_to(PROJECT_ROOT)}."
+    )
+
+
+# ---
+# Git Backend
+# ---
+class GitBackend:
+    """Runs git operations with one `git` subprocess per command.
+
+    Every operation runs in a span named after it, so the global `--timings`
+    shows where the latency of `start` and `complete` goes. Faster backends
+    override individual operations and inherit the rest.
+    """
+
+    name = "subprocess"
+
+    def __init__(self, root: Path = PROJECT_ROOT):
+        self.root = root
+
+    @contextmanager
+    def timed(self, label: str):
+        with span(label, backend=self.name):
+            yield
+
+    def run(
+        self, args: list[str], quiet: bool = False, runner: "StepRunner | None" = None
+    ) -> str:
+        """Runs `git args`, through `runner` when it is one of several steps."""
+        run = runner.command if runner is not None else run_command
+        with self.timed(f"git {args[0]}"):
+            return run(["git", *args], cwd=self.root, quiet=quiet)
+
+    def checkout(self, branch: str, create: bool = False) -> None:
+        self.run(["checkout", "-b", branch] if create else ["checkout", branch])
+
+    def pull(self, runner: "StepRunner | None" = None) -> None:
+        self.run(["pull"], runner=runner)
+
+    def branch_exists(self, branch: str, runner: "StepRunner | None" = None) -> bool:
+        try:
+            self.run(
+                ["rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"],
+                quiet=True,
+                runner=runner,
+            )
+        except click.Abort:
+            return False
+        return True
+
+    def commit_paths(self, paths: list[Path], message: str) -> None:
+        """Stages every added, modified or removed path and commits them.
+
+        Paths gone from disk are only removed from the index: `git add` fails
+        on a pathspec that matches nothing, such as the old location of a
+        task that was never committed.
+        """
+        present = [p.relative_to(self.root).as_posix() for p in paths if p.exists()]
+        missing = [p.relative_to(self.root).as_posix() for p in paths if not p.exists()]
+        if present:
+            self.run(["add", "-A", "--", *present])
+        if missing:
+            self.run(["rm", "--cached", "-q", "--ignore-unmatch", "--", *missing])
+        self.run(["commit", "-m", message])
+
+    def unstage(self, paths: list[Path]) -> None:
+        """Resets the index entries for `paths` back to HEAD."""
+        rel_paths = [path.relative_to(self.root).as_posix() for path in paths]
+        self.run(["reset", "-q", "--", *rel_paths], quiet=True)
+
+
+class Pygit2GitBackend(GitBackend):
+    """Stages, commits and creates branches in-process with pygit2.
+
+    These operations never start a `git` process, which also means git hooks
+    such as pre-commit do not run for them. Checking out existing branches
+    and pulling still go through `git`.
+    """
+
+    name = "pygit2"
+
+    def __init__(self, root: Path = PROJECT_ROOT):
+        import pygit2
+
+        super().__init__(root)
+        self.pygit2 = pygit2
+        self.repo = pygit2.Repository(str(root))
+
+    @contextmanager
+    def timed(self, label: str):
+        try:
+            with super().timed(label):
+                yield
+        except self.pygit2.GitError as e:
+            click.echo(click.style(f"Command failed: {e}", fg="red"))
+            raise click.Abort()
+
+    def checkout(self, branch: str, create: bool = False) -> None:
+        if not create:
+            return super().checkout(branch)
+        # The new branch starts at HEAD, so the working tree stays as it is.
+        with self.timed("pygit2 branch"):
+            head = self.repo.head.peel(self.pygit2.Commit)
+            self.repo.branches.local.create(branch, head)
+            self.repo.set_head(f"refs/heads/{branch}")
+
+    def commit_paths(self, paths: list[Path], message: str) -> None:
+        with self.timed("pygit2 commit"):
+            index = self.repo.index
+            index.read()
+            present = [p.relative_to(self.root).as_posix() for p in paths if p.exists()]
+            missing = [
+                p.relative_to(self.root).as_posix() for p in paths if not p.exists()
+            ]
+            if present:
+                index.add_all(present)
+            if missing:
+                index.remove_all(missing)
+            index.write()
+            tree = index.write_tree()
+            signature = self.repo.default_signature
+            self.repo.create_commit(
+                "HEAD", signature, signature, message, tree, [self.repo.head.target]
+            )
+
+
+GIT_BACKENDS = {"subprocess": GitBackend, "pygit2": Pygit2GitBackend}
+
+
+@functools.cache
+def get_git_backend() -> GitBackend:
+    """Returns the backend selected by `git.backend` in workflow.yml."""
+    name = get_config().get("git", {}).get("backend", "subprocess")
+    if name not in GIT_BACKENDS:
+        click.echo(
+            click.style(
+                f"Warning: Unknown git backend '{name}', using subprocess.",
+                fg="yellow",
+            ),
+            err=True,
+        )
+        name = "subprocess"
+    try:
+        return GIT_BACKENDS[name]()
+    except Exception as e:  # Missing pygit2, or the project is not a repository.
+        click.echo(
+            click.style(
+                f"Warning: Git backend '{name}' unavailable ({e}), using subprocess.",
+                fg="yellow",
+            ),
+            err=True,
+        )
+        return GitBackend()
+
+
+# ---
+# Concurrent Steps
+# ---
+# Commands that spend most of their time waiting on subprocesses run their
+# independent steps concurrently. A group of steps started with
+# StepRunner.gather is cancelled as a whole: when one step fails, or Ctrl-C
+# is pressed, steps not yet started are dropped and the child processes of
+# running ones are terminated before the command exits.
+class StepRunner:
+    """Runs steps on a thread pool, with a limit on concurrent processes.
+
+    At most `max_processes` child processes run at once, from
+    `concurrency.max_processes` in workflow.yml (default: the CPU count).
+    """
+
+    def __init__(self, max_processes: int | None = None):
+        settings = get_config().get("concurrency") or {}
+        self.max_processes = max(
+            1, max_processes or settings.get("max_processes") or os.cpu_count() or 1
+        )
+        self.slots = threading.BoundedSemaphore(self.max_processes)
+        self.processes = set()
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+
+    def command(
+        self, command: list[str], cwd: Path | None = PROJECT_ROOT, quiet: bool = False
+    ) -> str:
+        """Like run_command, but stoppable by cancel()."""
+        with self.slots:
+            if self.cancelled.is_set():
+                raise click.Abort()
+            with span("subprocess", argv=command):
+                process = subprocess.Popen(
+                    command,
+                    cwd=cwd,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    encoding="utf-8",
+                )
+                with self.lock:
+                    self.processes.add(process)
+                try:
+                    stdout, stderr = process.communicate()
+                finally:
+                    with self.lock:
+                        self.processes.discard(process)
+        if self.cancelled.is_set():
+            raise click.Abort()
+        if process.returncode:
+            if not quiet:
+                error_msg = stderr.strip() or stdout.strip()
+                click.echo(click.style(f"Command failed: {error_msg}", fg="red"))
+            raise click.Abort()
+        return stdout.strip()
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+        with self.lock:
+            for process in self.processes:
+                # SIGTERM lets git remove its lock files on the way out.
+                process.terminate()
+
+    def gather(self, *steps) -> list:
+        """Runs callables concurrently and returns their results in order.
+
+        The first failure cancels the rest and is re-raised once every step
+        has stopped; Ctrl-C does the same and aborts the command.
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, len(steps)))
+        futures = [executor.submit(step) for step in steps]
+        try:
+            wait(futures, return_when=FIRST_EXCEPTION)
+            failed = [f for f in futures if f.done() and f.exception() is not None]
+            if failed:
+                self.cancel()
+                raise failed[0].exception()
+        except KeyboardInterrupt:
+            self.cancel()
+            click.echo(click.style("\nInterrupted; running steps cancelled.", fg="red"))
+            raise click.Abort()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return [future.result() for future in futures]
@@ -0,0 +1,953 @@
+"""The `task` and `spec` commands: scaffolding, moves, export and import."""
+
+import csv
+import datetime
+import functools
+import json
+import os
+import pickle
+import re
+import sqlite3
+import sys
+from contextlib import closing
+from pathlib import Path
+
+import click
+from click import Abort, echo, style
+
+from .core import (
+    MAX_HEADER_LINES,
+    METADATA_BULLET_RE,
+    METADATA_KEY_ALIASES,
+    PROJECT_ROOT,
+    get_config,
+    get_user_lang,
+)
+from .index import (
+    find_task_file,
+    load_tasks,
+    open_task_index,
+    record_task_location,
+    record_task_locations,
+    refresh_task_index,
+)
+from .process import get_git_backend
+
+
+# ---
+# Task Commands
+# ---
+@click.group()
+def task():
+    """Commands for managing tasks."""
+    pass
+
+
+@click.group()
+def spec():
+    """Commands for managing specification documents."""
+    pass
+
+
+# ---
+# Templates
+# ---
+# Scaffolding commands render the Markdown templates in tasks/, docs/specs/,
+# docs/adr/ and .codecraft/templates/. Each template is split once at the
+# placeholders listed under `templates.placeholders` in workflow.yml, and the
+# compiled form is reused until the file changes, so creating many documents
+# costs one `join` and one write each.
+TEMPLATE_SECTIONS = {"task": "tasks", "spec": "specs"}
+
+
+class Template:
+    """A template split at its placeholders, ready to render in one pass."""
+
+    def __init__(self, text: str, placeholders: dict):
+        pattern = placeholder_pattern(tuple(placeholders))
+        self.parts = pattern.split(text) if pattern else [text]
+        # Odd parts are placeholders: (index, replacement format, original).
+        self.fields = [
+            (i, placeholders[part], part) for i, part in enumerate(self.parts) if i % 2
+        ]
+
+    def render(self, values: dict) -> str:
+        """Fills the placeholders; those naming a missing value are kept."""
+        parts = self.parts.copy()
+        for i, replacement, original in self.fields:
+            try:
+                parts[i] = replacement.format_map(values)
+            except (KeyError, IndexError, ValueError):
+                parts[i] = original
+        return "".join(parts)
+
+
+@functools.cache
+def placeholder_pattern(placeholders: tuple[str, ...]) -> re.Pattern | None:
+    if not placeholders:
+        return None
+    # Longest first, so a placeholder containing another one wins.
+    alternatives = sorted(placeholders, key=len, reverse=True)
+    return re.compile(f"({'|'.join(map(re.escape, alternatives))})")
+
+
+@functools.cache
+def _compile_template(
+    path: Path, mtime_ns: int, size: int, placeholders: tuple
+) -> Template:
+    return Template(path.read_text(encoding="utf-8"), dict(placeholders))
+
+
+def find_template(kind: str, lang: str) -> Path:
+    """Returns the template path configured for "task" or "spec" in a language."""
+    section = TEMPLATE_SECTIONS[kind]
+    return PROJECT_ROOT / get_config()[section]["templates"].get(lang, "")
+
+
+def load_template(kind: str, lang: str) -> Template | None:
+    """Returns the compiled template for a kind, or None if it does not exist."""
+    path = find_template(kind, lang)
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    if not path.is_file():
+        return None
+    placeholders = (get_config().get("templates") or {}).get("placeholders") or {}
+    return _compile_template(
+        path, stat.st_mtime_ns, stat.st_size, tuple(sorted(placeholders.items()))
+    )
+
+
+def template_values(name: str, lang: str, **extra) -> dict:
+    """Returns the values a new document's placeholders may refer to."""
+    return {
+        "name": name,
+        "title": name.replace("-", " ").capitalize(),
+        "lang": lang,
+        "date": datetime.date.today().isoformat(),
+        **extra,
+    }
+
+
+def write_new_file(path: Path, text: str) -> bool:
+    """Writes a file that must not exist yet; returns False if it does."""
+    try:
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(text)
+    except FileExistsError:
+        return False
+    return True
+
+
+def is_valid_task_title(title: str) -> bool:
+    """Tells whether a title can name a task file in a status directory."""
+    return bool(title) and not title.startswith(".") and not set("/\\") & set(title)
+
+
+def create_tasks_from_csv(csv_path: Path, allow_duplicates: bool) -> None:
+    """Creates a backlog task, and optionally its spec, for every CSV row.
+
+    The `title` column names the task file. A truthy `spec` column also
+    creates its spec, `lang` overrides the configured language, and every
+    other column is a value the templates' placeholders may refer to. Rows
+    titled like an existing task or spec are skipped unless
+    `allow_duplicates` is set.
+    """
+    backlog_dir = PROJECT_ROOT / get_config()["tasks"]["status_map"]["backlog"]
+    specs_dir = PROJECT_ROOT / get_config()["directories"]["specs"]
+    backlog_dir.mkdir(parents=True, exist_ok=True)
+    default_lang = get_user_lang()
+    templates = {}
+    created, specs, skipped = [], 0, 0
+
+    def render(kind: str, values: dict, fallback: str) -> str:
+        key = (kind, values["lang"])
+        if key not in templates:
+            templates[key] = load_template(*key)
+        template = templates[key]
+        return template.render(values) if template else fallback
+
+    with (
+        closing(DuplicateCheck(enabled=not allow_duplicates)) as duplicates,
+        open(csv_path, newline="", encoding="utf-8-sig") as f,
+    ):
+        reader = csv.DictReader(f)
+        if "title" not in (reader.fieldnames or ()):
+            click.echo(
+                click.style(f"Error: '{csv_path}' has no 'title' column.", fg="red")
+            )
+            raise click.Abort()
+        for line_number, row in enumerate(reader, 2):
+            name = (row.pop("title") or "").strip()
+            lang = (row.pop("lang", None) or "").strip() or default_lang
+            wants_spec = (row.pop("spec", None) or "").strip().lower() in (
+                "1",
+                "x",
+                "y",
+                "yes",
+                "true",
+            )
+            if not is_valid_task_title(name):
+                problem = f"invalid title '{name}'"
+            elif lang not in get_config()["languages"]["supported"]:
+                problem = f"unsupported language '{lang}'"
+            elif matches := duplicates.find(name):
+                score, path = matches[0]
+                problem = f"'{name}' looks like a duplicate of {path} ({score:.2f})"
+            else:
+                problem = None
+            if problem:
+                click.echo(
+                    click.style(f"⚠️  Line {line_number}: {problem}.", fg="yellow")
+                )
+                skipped += 1
+                continue
+
+            values = template_values(
+                name, lang, **{k: v.strip() for k, v in row.items() if k and v}
+            )
+            task_path = backlog_dir / f"{name}.md"
+            task_text = render("task", values, f"# Task: {values['title']}")
+            if not write_new_file(task_path, task_text):
+                click.echo(
+                    click.style(
+                        f"⚠️  Line {line_number}: task '{name}' already exists.",
+                        fg="yellow",
+                    )
+                )
+                skipped += 1
+                continue
+            created.append((task_path, "backlog", None))
+            # Later rows are checked against this one too.
+            duplicates.add(task_path, name)
+            if wants_spec:
+                specs_dir.mkdir(parents=True, exist_ok=True)
+                spec_text = render(
+                    "spec", values, f"# Specification: {values['title']}"
+                )
+                specs += write_new_file(specs_dir / f"{name}.{lang}.md", spec_text)
+
+    record_task_locations(created)
+    click.echo(
+        click.style(
+            f"✅ Created {len(created)} task(s) and {specs} spec(s);"
+            f" skipped {skipped} row(s).",
+            fg="green",
+        )
+    )
+
+
+@task.command(name="create")
+@click.argument("title", required=False)
+@click.option(
+    "--from-csv",
+    "csv_path",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    help="Create a task for every row (see create_tasks_from_csv).",
+)
+@click.option(
+    "--allow-duplicate",
+    is_flag=True,
+    help="Skip the check for tasks and specs with similar titles.",
+)
+def task_create(title: str | None, csv_path: Path | None, allow_duplicate: bool):
+    """Creates a new task in the backlog using the configured language."""
+    if (title is None) == (csv_path is None):
+        raise click.UsageError("Give either a TITLE or --from-csv, not both.")
+    if csv_path is not None:
+        create_tasks_from_csv(csv_path, allow_duplicate)
+        return
+
+    lang = get_user_lang()
+    click.echo(
+        click.style(f"🚀 Creating new task: '{title}' (Language: {lang})...", fg="cyan")
+    )
+
+    backlog_dir = PROJECT_ROOT / get_config()["tasks"]["status_map"]["backlog"]
+    backlog_dir.mkdir(parents=True, exist_ok=True)
+
+    new_task_path = backlog_dir / f"{title}.md"
+
+    if not allow_duplicate and not new_task_path.exists():
+        with closing(DuplicateCheck()) as duplicates:
+            matches = duplicates.find(title)
+        if matches:
+            click.echo(
+                click.style(f"⚠️  '{title}' looks like a duplicate of:", fg="yellow")
+            )
+            for score, path in matches[:DUPLICATES_SHOWN]:
+                click.echo(f"  {score:.2f}  {path}")
+            if not click.confirm("Create it anyway?"):
+                raise click.Abort()
+
+    values = template_values(title, lang)
+    template = load_template("task", lang)
+    if template is None:
+        if not new_task_path.exists():
+            click.echo(
+                click.style(
+                    f"Error: Task template not found at '{find_template('task', lang)}'. Creating a blank file.",
+                    fg="red",
+                )
+            )
+        content = f"# Task: {values['title']}"
+    else:
+        content = template.render(values)
+    if not write_new_file(new_task_path, content):
+        click.echo(
+            click.style(f"⚠️  Warning: Task '{title}' already exists.", fg="yellow")
+        )
+        return
+
+    record_task_location(new_task_path, "backlog")
+
+    click.echo(
+        click.style(
+            f"✅ Success! New task created at: {new_task_path.relative_to(PROJECT_ROOT)}",
+            fg="green",
+        )
+    )
+
+
+@spec.command(name="create")
+@click.argument("task_title")
+def spec_create(task_title: str):
+    """Creates a new specification for a given task."""
+    task_file = find_task_file(task_title)
+    if not task_file:
+        click.echo(click.style(f"Error: Task '{task_title}' not found.", fg="red"))
+        raise click.Abort()
+
+    lang = get_user_lang()
+    click.echo(f"🚀 Creating new spec for task: '{task_title}' (Language: {lang})...")
+
+    specs_dir = PROJECT_ROOT / get_config()["directories"]["specs"]
+    specs_dir.mkdir(parents=True, exist_ok=True)
+
+    new_spec_path = specs_dir / f"{task_title}.{lang}.md"
+
+    values = template_values(task_title, lang)
+    template = load_template("spec", lang)
+    if template is None:
+        if not new_spec_path.exists():
+            click.echo(
+                click.style(
+                    f"Error: Spec template not found at '{find_template('spec', lang)}'. Creating a blank file.",
+                    fg="red",
+                )
+            )
+        content = f"# Specification: {values['title']}"
+    else:
+        content = template.render(values)
+    if not write_new_file(new_spec_path, content):
+        click.echo(
+            click.style(
+                f"⚠️  Warning: Spec for task '{task_title}' already exists.",
+                fg="yellow",
+            )
+        )
+        return
+
+    click.echo(
+        click.style(
+            f"✅ Success! New spec created at: {new_spec_path.relative_to(PROJECT_ROOT)}",
+            fg="green",
+        )
+    )
+
+
+def select_tasks(
+    tasks: list[dict], titles: list[str], queries: list[str]
+) -> tuple[list[dict], list[str]]:
+    """Picks tasks by title and/or `key=value` metadata queries.
+
+    Returns the selected tasks in their original order, and any requested
+    titles that do not exist. Queries compare case-insensitively and must all
+    match; `status` refers to the task's current status directory.
+    """
+    conditions = []
+    for query in queries:
+        key, sep, value = query.partition("=")
+        if not sep:
+            raise click.BadParameter(
+                f"'{query}' is not key=value.", param_hint="--query"
+            )
+        conditions.append((key.strip().lower(), value.strip().lower()))
+
+    by_title = {task["title"]: task for task in tasks}
+    missing = [title for title in titles if title not in by_title]
+    wanted = set(titles)
+    selected = []
+    for task in tasks:
+        if titles and task["title"] not in wanted:
+            continue
+        if all(str(task.get(k, "")).strip().lower() == v for k, v in conditions):
+            selected.append(task)
+    return selected, missing
+
+
+@task.command(name="move")
+@click.argument("titles", nargs=-1)
+@click.option("--to", "target", required=True, help="Status to move the tasks to.")
+@click.option(
+    "--from-file",
+    type=click.File(encoding="utf-8"),
+    help="Read task titles from a file, one per line.",
+)
+@click.option(
+    "--query",
+    "queries",
+    multiple=True,
+    metavar="KEY=VALUE",
+    help="Select tasks whose metadata matches, e.g. priority=high. Repeatable.",
+)
+def task_move(
+    titles: tuple[str, ...],
+    target: str,
+    from_file,
+    queries: tuple[str, ...],
+):
+    """Moves many tasks to a status in a single commit."""
+    status_map = get_config()["tasks"]["status_map"]
+    if target not in status_map:
+        click.echo(
+            click.style(
+                f"Error: Unknown status '{target}' (choose from {', '.join(status_map)}).",
+                fg="red",
+            )
+        )
+        raise click.Abort()
+    titles = list(titles)
+    if from_file is not None:
+        titles += [
+            line.strip()
+            for line in from_file
+            if line.strip() and not line.startswith("#")
+        ]
+    if not titles and not queries:
+        raise click.UsageError("Give task titles, --from-file or --query.")
+
+    selected, missing = select_tasks(load_tasks(), titles, list(queries))
+    for title in missing:
+        click.echo(click.style(f"Error: Task '{title}' not found.", fg="red"))
+    if missing:
+        raise click.Abort()
+
+    target_dir = PROJECT_ROOT / status_map[target]
+    moves = []
+    for task_meta in selected:
+        if task_meta["status"] == target:
+            continue
+        new_path = target_dir / task_meta["path"].name
+        if new_path.exists():
+            click.echo(
+                click.style(
+                    f"Error: '{new_path.relative_to(PROJECT_ROOT)}' already exists.",
+                    fg="red",
+                )
+            )
+            raise click.Abort()
+        moves.append((task_meta["path"], new_path))
+    if not moves:
+        click.echo(click.style(f"No tasks to move to '{target}'.", fg="yellow"))
+        return
+
+    click.echo(
+        click.style(f"🚚 Moving {len(moves)} task(s) to '{target}'...", fg="cyan")
+    )
+    target_dir.mkdir(parents=True, exist_ok=True)
+    git = get_git_backend()
+    done = []
+    try:
+        for old_path, new_path in moves:
+            os.rename(old_path, new_path)
+            done.append((old_path, new_path))
+        message = (
+            f"chore(tasks): Move {len(moves)} task(s) to '{target}'\n\n"
+            + "\n".join(f"- {new_path.stem}" for _, new_path in moves)
+        )
+        git.commit_paths([p for move in moves for p in move], message)
+    except (Exception, KeyboardInterrupt):
+        click.echo(click.style("Rolling back the task moves...", fg="yellow"))
+        for old_path, new_path in reversed(done):
+            os.rename(new_path, old_path)
+        try:
+            git.unstage([p for move in moves for p in move])
+        except (Exception, KeyboardInterrupt) as e:
+            # The files are back in place; report this and keep the original
+            # error. A failed git command has already printed its own.
+            detail = f": {e}" if str(e) else ""
+            click.echo(
+                click.style(
+                    f"Warning: Could not unstage the moved tasks{detail}."
+                    " Check `git status`.",
+                    fg="yellow",
+                ),
+                err=True,
+            )
+        raise
+
+    record_task_locations(
+        [(new_path, target, old_path) for old_path, new_path in moves]
+    )
+    click.echo(
+        click.style(
+            f"\n✅ Success! Moved {len(moves)} task(s) to '{target}'.", fg="green"
+        )
+    )
+
+
+# ---
+# Task Export
+# ---
+# `task export` streams task metadata out of the task index as JSON lines,
+# CSV or Parquet (when pyarrow is installed), one row per task, for analysis
+# elsewhere. `task import` writes such rows back to Markdown: existing tasks
+# get their header fields rewritten in place, missing ones are created from
+# the task template, and files are written and indexed in batches.
+TASK_EXPORT_FIELDS = (
+    "title",
+    "status",
+    "summary",
+    "type",
+    "priority",
+    "author",
+    "date",
+    "dependencies",
+)
+TASK_EXPORT_FORMATS = {".jsonl": "jsonl", ".json": "jsonl", ".csv": "csv"}
+TASK_EXPORT_FORMATS |= {".parquet": "parquet", ".pq": "parquet"}
+# Columns that describe the row rather than header fields.
+TASK_RECORD_KEYS = {"title", "status", "path", "body"}
+TASK_IMPORT_BATCH = 1024
+
+
+def guess_record_format(path: Path | None, record_format: str | None) -> str:
+    """Returns the explicit format, or the one implied by the file suffix."""
+    if record_format:
+        return record_format
+    return TASK_EXPORT_FORMATS.get(path.suffix.lower(), "jsonl") if path else "jsonl"
+
+
+def batched(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def task_export_columns(conn: sqlite3.Connection, body: bool) -> list[str]:
+    """Returns the standard fields, then every other indexed metadata key."""
+    keys = set()
+    for (metadata,) in conn.execute("SELECT metadata FROM tasks"):
+        keys.update(pickle.loads(metadata))
+    extra = sorted(keys - {*TASK_EXPORT_FIELDS, *TASK_RECORD_KEYS})
+    return [*TASK_EXPORT_FIELDS, *extra, "path", *(["body"] if body else [])]
+
+
+def iter_task_records(conn: sqlite3.Connection, statuses: tuple[str, ...], body: bool):
+    """Yields one record per indexed task, streamed from SQLite in path order."""
+    for rel_path, status, metadata in conn.execute(
+        "SELECT path, status, metadata FROM tasks ORDER BY path"
+    ):
+        if statuses and status not in statuses:
+            continue
+        record = pickle.loads(metadata)
+        record.update(status=status, path=rel_path)
+        if body:
+            record["body"] = (PROJECT_ROOT / rel_path).read_text(
+                encoding="utf-8", errors="replace"
+            )
+        yield record
+
+
+def write_task_records(records, columns: list[str], record_format: str, f) -> int:
+    """Writes records to an open file; Parquet needs a binary one.
+
+    Returns the number of records written.
+    """
+    count = 0
+    if record_format == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([(column, pa.string()) for column in columns])
+        with pq.ParquetWriter(f, schema, compression="zstd") as writer:
+            for batch in batched(records, TASK_IMPORT_BATCH):
+                writer.write_table(
+                    pa.table(
+                        {c: [r.get(c) for r in batch] for c in columns}, schema=schema
+                    )
+                )
+                count += len(batch)
+    elif record_format == "csv":
+        writer = csv.DictWriter(f, columns, restval="", extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+    else:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def read_task_records(path: Path, record_format: str):
+    """Yields records from an export file, one at a time."""
+    if record_format == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=TASK_IMPORT_BATCH):
+            yield from batch.to_pylist()
+    elif record_format == "csv":
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def update_task_header(text: str, fields: dict) -> str:
+    """Sets metadata fields in a task's header, keeping each line's layout.
+
+    Values keep the quotes or backquotes they had. Fields the header does not
+    have yet are added as `- **Key**: value` bullets after its last field.
+    """
+    lines = text.splitlines(keepends=True)
+    pending = dict(fields)
+    insert_at = None
+    for number, line in enumerate(lines[:MAX_HEADER_LINES]):
+        stripped = line.strip()
+        if stripped == "---":
+            break
+        match = METADATA_BULLET_RE.match(stripped)
+        if match:
+            key, raw = match.group(1).rstrip(":："), match.group(2)
+        elif ":" in stripped and not stripped.startswith("#"):
+            key, raw = stripped.split(":", 1)
+            key, raw = key.lstrip("-*+ "), raw.strip()
+        else:
+            continue
+        insert_at = number + 1
+        key = key.strip().lower()
+        key = METADATA_KEY_ALIASES.get(key, key)
+        if key not in pending:
+            continue
+        value = pending.pop(key)
+        for quote in ('"', "`"):
+            if len(raw) > 1 and raw[0] == raw[-1] == quote:
+                value = f"{quote}{value}{quote}"
+                break
+        indent = line[: len(line) - len(line.lstrip())]
+        ending = line[len(line.rstrip("\r\n")) :]
+        lines[number] = f"{indent}{stripped[: len(stripped) - len(raw)]}{value}{ending}"
+    if pending:
+        if insert_at is None:
+            insert_at = 1 if lines and lines[0].startswith("#") else 0
+        lines[insert_at:insert_at] = [
+            f"- **{key.capitalize()}**: {value}\n" for key, value in pending.items()
+        ]
+    return "".join(lines)
+
+
+def import_task_batch(batch: list[tuple], dry_run: bool) -> None:
+    """Writes (path, text, status, old path) entries, then indexes them at once."""
+    if dry_run:
+        return
+    for directory in {path.parent for path, _, _, _ in batch}:
+        directory.mkdir(parents=True, exist_ok=True)
+    for path, text, _, old_path in batch:
+        if not write_new_file(path, text):
+            # Replace existing files atomically, never leaving half a task.
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        if old_path is not None:
+            old_path.unlink(missing_ok=True)
+    record_task_locations([(path, status, old) for path, _, status, old in batch])
+
+
+@task.command(name="export")
+@click.option(
+    "--output",
+    "-o",
+    "output",
+    default="-",
+    show_default=True,
+    help="File to write, relative to the project root; `-` for stdout.",
+)
+@click.option(
+    "--format",
+    "record_format",
+    type=click.Choice(["jsonl", "csv", "parquet"]),
+    help="Defaults to the output's suffix, else jsonl.",
+)
+@click.option("--status", "statuses", multiple=True, help="Only tasks in this status.")
+@click.option("--body", is_flag=True, help="Include each task file's full text.")
+def task_export(
+    output: str, record_format: str | None, statuses: tuple[str, ...], body: bool
+):
+    """Exports task metadata from the task index, one row per task."""
+    output_path = None if output == "-" else PROJECT_ROOT / output
+    record_format = guess_record_format(output_path, record_format)
+    if record_format == "parquet" and output_path is None:
+        raise click.UsageError("Parquet output needs --output FILE.")
+    with closing(open_task_index()) as conn:
+        refresh_task_index(conn)
+        columns = task_export_columns(conn, body)
+        records = iter_task_records(conn, statuses, body)
+        if output_path is None:
+            count = write_task_records(records, columns, record_format, sys.stdout)
+            echo(style(f"Exported {count} task(s).", fg="green"), err=True)
+            return
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = output_path.with_name(f".{output_path.name}.tmp")
+        mode = "wb" if record_format == "parquet" else "w"
+        try:
+            with open(
+                tmp_path,
+                mode,
+                **({} if mode == "wb" else {"encoding": "utf-8", "newline": ""}),
+            ) as f:
+                count = write_task_records(records, columns, record_format, f)
+            os.replace(tmp_path, output_path)
+        except ImportError:
+            tmp_path.unlink(missing_ok=True)
+            echo(
+                style(
+                    "Error: Parquet needs the pyarrow package; use jsonl or csv.",
+                    fg="red",
+                ),
+                err=True,
+            )
+            raise Abort()
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+    if output_path.is_relative_to(PROJECT_ROOT):
+        output_path = output_path.relative_to(PROJECT_ROOT)
+    echo(style(f"✅ Exported {count} task(s) to {output_path}.", fg="green"))
+
+
+@task.command(name="import")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False, path_type=Path))
+@click.option(
+    "--format",
+    "record_format",
+    type=click.Choice(["jsonl", "csv", "parquet"]),
+    help="Defaults to the file's suffix, else jsonl.",
+)
+@click.option("--dry-run", is_flag=True, help="Report what would change only.")
+def task_import(source: Path, record_format: str | None, dry_run: bool):
+    """Writes exported task rows back to Markdown task files.
+
+    Rows are matched to tasks by title. Header fields of existing tasks are
+    updated in place and a changed status moves the file; unknown titles are
+    created from the task template. A `body` column, when present, replaces
+    the whole file. Empty values leave a field as it is. Nothing is committed.
+    """
+    record_format = guess_record_format(source, record_format)
+    status_map = get_config()["tasks"]["status_map"]
+    lang = get_user_lang()
+    template = load_template("task", lang)
+    with closing(open_task_index()) as conn:
+        refresh_task_index(conn)
+        known = {
+            title: (PROJECT_ROOT / rel_path, status, metadata)
+            for title, rel_path, status, metadata in conn.execute(
+                "SELECT title, path, status, metadata FROM tasks"
+            )
+        }
+
+    counts = dict.fromkeys(("created", "updated", "moved", "unchanged", "skipped"), 0)
+    batch, batch_titles = [], set()
+    try:
+        records = read_task_records(source, record_format)
+        for number, record in enumerate(records, 1):
+            title = str(record.get("title") or "").strip()
+            if title in batch_titles:
+                # A repeated title must see the file its earlier row wrote.
+                import_task_batch(batch, dry_run)
+                batch, batch_titles = [], set()
+            current_path, current_status, indexed = known.get(title, (None,) * 3)
+            status = record.get("status") or current_status or "backlog"
+            if not is_valid_task_title(title):
+                problem = f"invalid title '{title}'"
+            elif status not in status_map:
+                problem = f"unknown status '{status}'"
+            else:
+                problem = None
+            if problem:
+                echo(style(f"⚠️  Row {number}: {problem}.", fg="yellow"))
+                counts["skipped"] += 1
+                continue
+
+            fields = {
+                str(k): str(v)
+                for k, v in record.items()
+                if k not in TASK_RECORD_KEYS and v not in (None, "")
+            }
+            path = PROJECT_ROOT / status_map[status] / f"{title}.md"
+            if (
+                path == current_path
+                and not record.get("body")
+                and indexed is not None
+                and fields.items() <= pickle.loads(indexed).items()
+            ):
+                # The index already holds these values; skip reading the file.
+                counts["unchanged"] += 1
+                continue
+            current_text = current_path and current_path.read_text(encoding="utf-8")
+            if record.get("body"):
+                text = record["body"]
+            elif current_text is not None:
+                text = update_task_header(current_text, fields)
+            else:
+                values = template_values(title, lang, **fields)
+                base = (
+                    template.render(values)
+                    if template
+                    else f"# Task: {values['title']}\n"
+                )
+                text = update_task_header(base, fields)
+
+            if current_path is None:
+                counts["created"] += 1
+            elif path != current_path:
+                counts["moved"] += 1
+            elif text == current_text:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            old_path = current_path if current_path != path else None
+            if not dry_run:
+                known[title] = (path, status, None)
+            batch.append((path, text, status, old_path))
+            batch_titles.add(title)
+            if len(batch) >= TASK_IMPORT_BATCH:
+                import_task_batch(batch, dry_run)
+                batch, batch_titles = [], set()
+        import_task_batch(batch, dry_run)
+    except ImportError:
+        echo(style("Error: Parquet needs the pyarrow package.", fg="red"), err=True)
+        raise Abort()
+    except (ValueError, csv.Error) as e:
+        echo(style(f"Error: Could not read '{source}': {e}", fg="red"), err=True)
+        raise Abort()
+
+    summary = ", ".join(f"{n} {what}" for what, n in counts.items())
+    prefix = "Would import" if dry_run else "✅ Imported"
+    echo(style(f"{prefix}: {summary}.", fg="green"))
+
+
+# ---
+# Duplicate Detection
+# ---
+# `task create` checks new titles against those of existing tasks and specs,
+# and `task dedupe` compares their bodies. Both use the near-duplicate index
+# in dedupe.py, which is imported on first use: it needs the search
+# tokenizer, which is slow to import and which other task commands skip.
+DUPLICATES_SHOWN = 5
+
+
+def dedupe_settings() -> dict:
+    return get_config().get("dedupe") or {}
+
+
+class DuplicateCheck:
+    """Finds existing tasks and specs titled like a new task.
+
+    Does nothing when `dedupe.check_on_create` is off, `enabled` is False or
+    the index cannot be opened.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.conn = None
+        self.threshold = float(dedupe_settings().get("threshold", 0.7))
+        if not enabled or not dedupe_settings().get("check_on_create", True):
+            return
+        from . import dedupe
+
+        self.dedupe = dedupe
+        try:
+            self.conn = dedupe.open_dedupe_index()
+            dedupe.refresh_dedupe_index(self.conn)
+        except sqlite3.Error as e:
+            click.echo(
+                click.style(
+                    f"Warning: Could not check for duplicate tasks: {e}", fg="yellow"
+                ),
+                err=True,
+            )
+            self.conn = None
+
+    def find(self, title: str) -> list[tuple[float, str]]:
+        """Returns (similarity, path) for similar titles, best first."""
+        if self.conn is None:
+            return []
+        # A spec named after the task is not a duplicate of it.
+        return [
+            (score, path)
+            for score, path, other in self.dedupe.similar_titles(
+                self.conn, title, self.threshold
+            )
+            if other != title
+        ]
+
+    def add(self, path: Path, title: str) -> None:
+        """Indexes a task just created, so later titles are checked against it."""
+        if self.conn is not None:
+            self.dedupe.add_dedupe_file(self.conn, path, title)
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.commit()
+            self.conn.close()
+
+
+@task.command(name="dedupe")
+@click.option(
+    "--threshold",
+    type=float,
+    help="Minimum similarity, from 0 to 1 [default: dedupe.threshold].",
+)
+@click.option("--rebuild", is_flag=True, help="Discard the index and start over.")
+def task_dedupe(threshold: float | None, rebuild: bool):
+    """Lists tasks and specs that describe nearly the same work."""
+    from . import dedupe
+
+    if threshold is None:
+        threshold = float(dedupe_settings().get("threshold", 0.7))
+    if rebuild:
+        dedupe.DEDUPE_INDEX_PATH.unlink(missing_ok=True)
+    with closing(dedupe.open_dedupe_index()) as conn:
+        total, _, _ = dedupe.refresh_dedupe_index(conn)
+        pairs = dedupe.duplicate_pairs(conn, threshold)
+    if not pairs:
+        echo(
+            style(
+                f"✅ No near-duplicates among {total} task(s) and spec(s).",
+                fg="green",
+            )
+        )
+        return
+    echo(
+        style(
+            f"🔍 {len(pairs)} near-duplicate pair(s) among {total} task(s) and"
+            f" spec(s), similarity {threshold:.2f} or more:",
+            fg="yellow",
+        )
+    )
+    for score, path_a, path_b in pairs:
+        echo(f"  {score:.2f}  {path_a}")
+        echo(f"        {path_b}")
@@ -0,0 +1,830 @@
+"""`delete` and the `trash` commands: the trash manifest and its retention."""
+
+import datetime
+import errno
+import functools
+import glob
+import hashlib
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+
+import click
+
+from .core import (
+    LEGACY_TRASH_PREFIX_RE,
+    PROJECT_ROOT,
+    TRASH_DIR,
+    TRASH_GC_LOG_PATH,
+    TRASH_LOCK_PATH,
+    TRASH_MANIFEST_PATH,
+    TRASH_OBJECTS_DIR,
+    TRASH_ORPHAN_DIR,
+    find_protected_paths,
+    get_config,
+    locked_file,
+)
+from .log import LOG_ANSWER_LABELS, append_log_entry
+from .process import spawn_background
+
+
+# ---
+# Trash Commands
+# ---
+@click.group()
+def trash():
+    """Commands for managing the trash can."""
+    pass
+
+
+def collect_batch_paths(source: str) -> tuple[list[Path], list[str]]:
+    """Expands a `delete --batch` source into the paths to delete.
+
+    The source is either a file listing one path per line (blank lines and
+    `#` comments are ignored) or a glob pattern. Returns the absolute paths,
+    with entries nested inside other entries dropped, and any listed paths
+    that do not exist.
+    """
+    source_path = Path(source)
+    if source_path.is_file():
+        lines = source_path.read_text(encoding="utf-8").splitlines()
+        candidates = [
+            line.strip() for line in lines if line.strip() and not line.startswith("#")
+        ]
+    else:
+        candidates = glob.glob(source, recursive=True)
+
+    missing = [c for c in candidates if not os.path.lexists(c)]
+    selected = {Path(os.path.abspath(c)) for c in candidates if os.path.lexists(c)}
+    paths = [p for p in selected if not any(parent in selected for parent in p.parents)]
+    return sorted(paths, key=str), missing
+
+
+def trash_overlaps(paths: list[Path]) -> list[Path]:
+    """Returns the paths that are the trash, lie inside it or contain it.
+
+    Moving any of them into the trash would corrupt its object store.
+    """
+    trash = Path(os.path.realpath(TRASH_DIR))
+    overlapping = []
+    for path in paths:
+        real = Path(os.path.realpath(path))
+        if real.is_relative_to(trash) or trash.is_relative_to(real):
+            overlapping.append(path)
+    return overlapping
+
+
+def move_to_trash(path: Path, trash_path: Path) -> None:
+    """Moves a path into the trash, renaming when on the same filesystem."""
+    try:
+        os.rename(path, trash_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(str(path), trash_path)
+
+
+# ---
+# Trash Manifest
+# ---
+# Deleted content is stored once per distinct file content under
+# .trash/objects/, and the manifest records what each deleted path contained
+# and where it came from. Repeatedly deleting the same generated artifacts
+# therefore costs no extra disk space.
+def open_trash_manifest(check_same_thread: bool = True) -> sqlite3.Connection:
+    """Opens (and if needed creates) the trash manifest."""
+    TRASH_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(TRASH_MANIFEST_PATH, check_same_thread=check_same_thread)
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            original_path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            deleted_at REAL NOT NULL,
+            hash TEXT,
+            reason TEXT
+        )"""
+    )
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS entry_files (
+            entry_id INTEGER NOT NULL,
+            rel_path TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            hash TEXT,
+            size INTEGER NOT NULL,
+            mode INTEGER NOT NULL,
+            target TEXT,
+            PRIMARY KEY (entry_id, rel_path)
+        )"""
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS entry_files_hash ON entry_files (hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS entries_path ON entries (original_path)")
+    return conn
+
+
+def trash_object_path(digest: str) -> Path:
+    return TRASH_OBJECTS_DIR / digest[:2] / digest
+
+
+def hash_file(path: Path) -> str:
+    """Returns the content hash used to deduplicate trashed files."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stash_file(path: Path, rel_path: str) -> tuple:
+    if path.is_symlink():
+        target = os.readlink(path)
+        path.unlink()
+        return (rel_path, "symlink", None, 0, 0, target)
+    stat = path.stat()
+    digest = hash_file(path)
+    object_path = trash_object_path(digest)
+    if object_path.exists():
+        path.unlink()
+    else:
+        object_path.parent.mkdir(parents=True, exist_ok=True)
+        move_to_trash(path, object_path)
+    return (rel_path, "file", digest, stat.st_size, stat.st_mode & 0o7777, None)
+
+
+def stash_path(path: Path) -> tuple[list[tuple], OSError | None]:
+    """Moves a file or directory into the trash object store.
+
+    Returns the manifest rows (rel_path, kind, hash, size, mode, target) for
+    everything stashed, and the error that stopped it early, if any. Files
+    stashed before an error are still returned so they stay restorable.
+    """
+    rows = []
+    try:
+        if path.is_symlink() or not path.is_dir():
+            rows.append(_stash_file(path, ""))
+            return rows, None
+        for dirpath, dirnames, filenames in os.walk(path):
+            rel_dir = os.path.relpath(dirpath, path)
+            rel_dir = "" if rel_dir == "." else Path(rel_dir).as_posix() + "/"
+            mode = os.stat(dirpath).st_mode & 0o7777
+            rows.append((rel_dir.rstrip("/"), "dir", None, 0, mode, None))
+            links = [d for d in dirnames if os.path.islink(os.path.join(dirpath, d))]
+            for name in links + filenames:
+                rows.append(_stash_file(Path(dirpath) / name, rel_dir + name))
+        shutil.rmtree(path)
+    except OSError as e:
+        return rows, e
+    return rows, None
+
+
+def stash_batch(paths: list[Path]) -> list[tuple]:
+    """Stashes several paths, returning (path, rows, error) for each."""
+    return [(path, *stash_path(path)) for path in paths]
+
+
+def stash_and_record(
+    conn: sqlite3.Connection,
+    conn_lock: threading.Lock,
+    paths: list[Path],
+    deleted_at: float,
+    reason: str,
+) -> list[tuple]:
+    """Stashes several paths and commits their manifest rows right away.
+
+    Returns (path, rows, error) like stash_batch. Committing per chunk, from
+    the worker that moved it, means an interrupted `delete` never leaves a
+    moved file without a manifest row.
+    """
+    results = stash_batch(paths)
+    with conn_lock, conn:
+        for path, rows, _ in results:
+            if rows:
+                record_trash_entry(conn, path, rows, deleted_at, reason)
+    return results
+
+
+def record_trash_entry(
+    conn: sqlite3.Connection,
+    path: Path,
+    rows: list[tuple],
+    deleted_at: float,
+    reason: str,
+) -> int:
+    """Writes a stashed path to the manifest and returns its entry id."""
+    original_path = (
+        path.relative_to(PROJECT_ROOT).as_posix()
+        if path.is_relative_to(PROJECT_ROOT)
+        else str(path)
+    )
+    if len(rows) == 1 and rows[0][0] == "":
+        kind, digest = rows[0][1], rows[0][2]
+    else:
+        kind = "dir"
+        tree = "\n".join(f"{r[0]}\0{r[1]}\0{r[2] or r[5] or ''}" for r in sorted(rows))
+        digest = hashlib.blake2b(tree.encode(), digest_size=20).hexdigest()
+    cursor = conn.execute(
+        "INSERT INTO entries (original_path, kind, size, deleted_at, hash, reason)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        (original_path, kind, sum(r[3] for r in rows), deleted_at, digest, reason),
+    )
+    entry_id = cursor.lastrowid
+    conn.executemany(
+        "INSERT INTO entry_files VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(entry_id, *row) for row in rows],
+    )
+    return entry_id
+
+
+def restore_trash_entry(conn: sqlite3.Connection, entry_id: int, target: Path):
+    """Recreates a trashed entry at `target` and drops it from the manifest.
+
+    Objects still referenced by other entries are copied; the last reference
+    is moved back into place.
+    """
+    rows = conn.execute(
+        "SELECT rel_path, kind, hash, mode, target FROM entry_files"
+        " WHERE entry_id = ? ORDER BY rel_path",
+        (entry_id,),
+    ).fetchall()
+    dir_modes = []
+    with conn:
+        for rel_path, kind, digest, mode, link_target in rows:
+            dest = target / rel_path if rel_path else target
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            if kind == "dir":
+                dest.mkdir(exist_ok=True)
+                dir_modes.append((dest, mode))
+            elif kind == "symlink":
+                os.symlink(link_target, dest)
+            else:
+                (refs,) = conn.execute(
+                    "SELECT COUNT(*) FROM entry_files WHERE hash = ?", (digest,)
+                ).fetchone()
+                if refs > 1:
+                    shutil.copyfile(trash_object_path(digest), dest)
+                else:
+                    move_to_trash(trash_object_path(digest), dest)
+                os.chmod(dest, mode)
+            conn.execute(
+                "DELETE FROM entry_files WHERE entry_id = ? AND rel_path = ?",
+                (entry_id, rel_path),
+            )
+        conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+    # Applied last so read-only directories can still be filled first.
+    for dest, mode in reversed(dir_modes):
+        os.chmod(dest, mode)
+
+
+def legacy_trash_items() -> list[Path]:
+    """Lists trash items created before the manifest existed."""
+    if not TRASH_DIR.exists():
+        return []
+    return sorted(
+        item
+        for item in TRASH_DIR.iterdir()
+        if item != TRASH_OBJECTS_DIR and not item.name.startswith(".")
+    )
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def log_deletion(paths: list[Path], answers: tuple[str, str, str]) -> None:
+    """Appends one deletion record, covering all paths, to the interaction log."""
+    # Batch entries are absolute; log them relative to the project when possible.
+    paths = [
+        p.relative_to(PROJECT_ROOT) if p.is_relative_to(PROJECT_ROOT) else p
+        for p in paths
+    ]
+    append_log_entry(
+        "delete",
+        paths=[str(path) for path in paths],
+        summary="Moved to trash.",
+        answers=dict(zip(LOG_ANSWER_LABELS, answers)),
+    )
+
+
+@click.command()
+@click.argument("path", required=False, type=click.Path(exists=True, path_type=Path))
+@click.option(
+    "--batch",
+    "batch_source",
+    metavar="FILE_LIST|GLOB",
+    help="Delete every path listed in a file, or matched by a glob pattern.",
+)
+@click.option(
+    "--workers", default=8, show_default=True, help="Concurrent moves in batch mode."
+)
+def delete(path: Path | None, batch_source: str | None, workers: int):
+    """Safely deletes a file or directory by moving it to the .trash."""
+    if (path is None) == (batch_source is None):
+        raise click.UsageError("Provide either a PATH or --batch, but not both.")
+
+    if batch_source is None:
+        paths = [Path(os.path.abspath(path))]
+        if trash_overlaps(paths):
+            click.echo(click.style(f"Error: '{path}' is or holds the trash.", fg="red"))
+            raise click.Abort()
+    else:
+        paths, missing = collect_batch_paths(batch_source)
+        for missing_path in missing:
+            click.echo(
+                click.style(f"Error: '{missing_path}' does not exist.", fg="red")
+            )
+        if missing:
+            raise click.Abort()
+        if not paths:
+            click.echo(click.style(f"No paths match '{batch_source}'.", fg="yellow"))
+            return
+        overlapping = trash_overlaps(paths)
+        for trash_path in overlapping:
+            click.echo(
+                click.style(f"Error: '{trash_path}' is or holds the trash.", fg="red")
+            )
+        if overlapping:
+            raise click.Abort()
+
+    protected = find_protected_paths(paths)
+    if protected:
+        for protected_path in protected:
+            click.echo(
+                click.style(
+                    f"Error: Path '{protected_path}' is protected and cannot be deleted.",
+                    fg="red",
+                )
+            )
+        raise click.Abort()
+
+    if batch_source is None:
+        click.echo(f"Preparing to delete: {path}")
+    else:
+        click.echo(f"Preparing to delete {len(paths)} path(s) from '{batch_source}'")
+    q1 = "1. What is the purpose of this file/directory?"
+    a1 = click.prompt(q1)
+    q2 = "2. Why does it need to be deleted?"
+    a2 = click.prompt(q2)
+    q3 = "3. What are the potential negative consequences of deleting it?"
+    a3 = click.prompt(q3)
+
+    if not click.confirm(
+        click.style("\nAre you sure you want to move this to the trash?", fg="yellow")
+    ):
+        raise click.Abort()
+
+    deleted_at = time.time()
+    chunk_size = max(1, min(256, len(paths) // max(1, workers)))
+    chunks = [paths[i : i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    moved, failed = [], []
+    with (
+        locked_file(TRASH_LOCK_PATH),
+        closing(open_trash_manifest(check_same_thread=False)) as conn,
+    ):
+        executor = ThreadPoolExecutor(max_workers=max(1, workers))
+        stash = functools.partial(
+            stash_and_record, conn, threading.Lock(), deleted_at=deleted_at, reason=a2
+        )
+        try:
+            for results in executor.map(stash, chunks):
+                for src, _, error in results:
+                    if error is None:
+                        moved.append(src)
+                        continue
+                    failed.append(src)
+                    click.echo(
+                        click.style(f"Error: Could not move '{src}': {error}", fg="red")
+                    )
+        finally:
+            # On Ctrl-C, chunks already moving finish and record themselves;
+            # the rest are left where they are.
+            executor.shutdown(cancel_futures=True)
+
+    if moved:
+        log_deletion(moved, (a1, a2, a3))
+    if failed:
+        raise click.Abort()
+
+    if batch_source is None:
+        click.echo(
+            click.style(f"✅ Successfully moved '{path}' to the trash.", fg="green")
+        )
+    else:
+        click.echo(
+            click.style(
+                f"✅ Successfully moved {len(moved)} path(s) to the trash.", fg="green"
+            )
+        )
+
+
+@trash.command(name="list")
+@click.option("--filter", "path_filter", help="Only show paths containing this text.")
+@click.option("--page", default=1, show_default=True, help="Page number to show.")
+@click.option("--page-size", default=50, show_default=True, help="Items per page.")
+def trash_list(path_filter: str | None, page: int, page_size: int):
+    """Lists items in the trash can, most recently deleted first."""
+    where, params = "", ()
+    if path_filter:
+        where, params = "WHERE instr(original_path, ?) > 0", (path_filter,)
+    with closing(open_trash_manifest()) as conn:
+        (total,) = conn.execute(
+            f"SELECT COUNT(*) FROM entries {where}", params
+        ).fetchone()
+        rows = conn.execute(
+            "SELECT id, original_path, kind, size, deleted_at FROM entries"
+            f" {where} ORDER BY deleted_at DESC, id DESC LIMIT ? OFFSET ?",
+            (*params, page_size, (max(page, 1) - 1) * page_size),
+        ).fetchall()
+    legacy = [
+        item
+        for item in legacy_trash_items()
+        if not path_filter or path_filter in item.name
+    ]
+
+    if not total and not legacy:
+        click.echo("The trash can is empty.")
+        return
+    if rows:
+        pages = (total + page_size - 1) // page_size
+        click.echo(f"Items in trash (page {page}/{pages}, {total} items):")
+        for entry_id, original_path, kind, size, deleted_at in rows:
+            when = datetime.datetime.fromtimestamp(deleted_at).strftime(
+                "%Y-%m-%d %H:%M"
+            )
+            suffix = "/" if kind == "dir" else ""
+            click.echo(
+                f"- [{entry_id}] {original_path}{suffix} ({format_size(size)}, {when})"
+            )
+    if legacy and page == 1:
+        click.echo("Items from before the trash manifest (restore by name):")
+        for item in legacy:
+            click.echo(f"- {item.name}")
+
+
+@trash.command(name="restore")
+@click.argument("item")
+@click.option(
+    "--to",
+    "restore_to",
+    type=click.Path(path_type=Path),
+    help="Restore to this path instead of the original location.",
+)
+def trash_restore(item: str, restore_to: Path | None):
+    """Restores an item (by id from 'trash list') to its original location."""
+    if not item.isdigit():
+        restore_legacy_trash_item(item, restore_to)
+        return
+
+    with locked_file(TRASH_LOCK_PATH), closing(open_trash_manifest()) as conn:
+        row = conn.execute(
+            "SELECT original_path FROM entries WHERE id = ?", (int(item),)
+        ).fetchone()
+        if row is None:
+            click.echo(click.style(f"Error: '{item}' not found in trash.", fg="red"))
+            raise click.Abort()
+
+        restore_path = restore_to or PROJECT_ROOT / row[0]
+        if os.path.lexists(restore_path):
+            click.echo(
+                click.style(f"Error: Path '{restore_path}' already exists.", fg="red")
+            )
+            raise click.Abort()
+        restore_trash_entry(conn, int(item), restore_path)
+
+    click.echo(
+        click.style(f"✅ Successfully restored to '{restore_path}'.", fg="green")
+    )
+
+
+def restore_legacy_trash_item(item_name: str, restore_to: Path | None):
+    """Restores a `<timestamp>_<name>` item created before the manifest."""
+    trash_path = TRASH_DIR / item_name
+    if not item_name or not os.path.lexists(trash_path):
+        click.echo(click.style(f"Error: '{item_name}' not found in trash.", fg="red"))
+        raise click.Abort()
+
+    original_name = LEGACY_TRASH_PREFIX_RE.sub("", item_name)
+    restore_path = restore_to or PROJECT_ROOT / original_name
+
+    if os.path.lexists(restore_path):
+        click.echo(
+            click.style(f"Error: Path '{restore_path}' already exists.", fg="red")
+        )
+        raise click.Abort()
+
+    shutil.move(str(trash_path), restore_path)
+    click.echo(
+        click.style(f"✅ Successfully restored to '{restore_path}'.", fg="green")
+    )
+
+
+# ---
+# Trash Retention
+# ---
+# Eviction runs in two phases: under the trash lock, doomed objects are
+# renamed into a private staging directory and dropped from the manifest,
+# which is quick; the slow recursive deletion then happens without the lock,
+# so `delete` and `restore` are never blocked behind it.
+def legacy_deleted_at(path: Path) -> float:
+    """Returns when a pre-manifest trash item was deleted."""
+    try:
+        stamp = datetime.datetime.strptime(path.name[:15], "%Y%m%d_%H%M%S")
+        return stamp.timestamp()
+    except ValueError:
+        return path.lstat().st_mtime
+
+
+def path_size(path: Path) -> int:
+    if path.is_symlink() or not path.is_dir():
+        return path.lstat().st_size
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.lstat(os.path.join(dirpath, name)).st_size
+    return total
+
+
+def trash_usage(conn: sqlite3.Connection) -> tuple[dict, dict]:
+    """Returns (object hash -> size, object hash -> reference count)."""
+    sizes, refs = {}, {}
+    for digest, size, count in conn.execute(
+        "SELECT hash, MAX(size), COUNT(*) FROM entry_files"
+        " WHERE kind = 'file' GROUP BY hash"
+    ):
+        sizes[digest] = size
+        refs[digest] = count
+    return sizes, refs
+
+
+def plan_trash_eviction(
+    conn: sqlite3.Connection,
+    max_age_days: float | None = None,
+    max_total_bytes: int | None = None,
+    evict_all: bool = False,
+) -> dict:
+    """Chooses what to evict from the trash, oldest first.
+
+    Items older than `max_age_days` are always evicted; after that, the
+    oldest remaining items go until the trash fits in `max_total_bytes`.
+    Shared objects only count as freed once their last entry is evicted.
+    """
+    sizes, refs = trash_usage(conn)
+    entry_hashes = {}
+    for entry_id, digest in conn.execute(
+        "SELECT entry_id, hash FROM entry_files WHERE kind = 'file'"
+    ):
+        entry_hashes.setdefault(entry_id, []).append(digest)
+
+    candidates = [
+        (deleted_at, entry_id, None)
+        for entry_id, deleted_at in conn.execute("SELECT id, deleted_at FROM entries")
+    ]
+    legacy_sizes = {}
+    for item in legacy_trash_items():
+        legacy_sizes[item] = path_size(item)
+        candidates.append((legacy_deleted_at(item), None, item))
+    candidates.sort(key=lambda candidate: candidate[0])
+
+    total = sum(sizes.values()) + sum(legacy_sizes.values())
+    cutoff = None if max_age_days is None else time.time() - max_age_days * 86400
+    plan = {"entries": [], "objects": [], "legacy": [], "freed": 0, "kept": 0}
+    for deleted_at, entry_id, item in candidates:
+        expired = cutoff is not None and deleted_at < cutoff
+        over_budget = max_total_bytes is not None and total > max_total_bytes
+        if not (evict_all or expired or over_budget):
+            break
+        if item is not None:
+            plan["legacy"].append(item)
+            total -= legacy_sizes[item]
+            plan["freed"] += legacy_sizes[item]
+            continue
+        plan["entries"].append(entry_id)
+        for digest in entry_hashes.get(entry_id, ()):
+            refs[digest] -= 1
+            if refs[digest] == 0:
+                plan["objects"].append(digest)
+                total -= sizes[digest]
+                plan["freed"] += sizes[digest]
+
+    plan["kept"] = len(candidates) - len(plan["entries"]) - len(plan["legacy"])
+    return plan
+
+
+def find_orphaned_objects(conn: sqlite3.Connection) -> list[tuple[str, int]]:
+    """Returns (hash, size) for objects no manifest entry references."""
+    if not TRASH_OBJECTS_DIR.exists():
+        return []
+    _, refs = trash_usage(conn)
+    orphans = []
+    for shard in os.scandir(TRASH_OBJECTS_DIR):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name not in refs:
+                orphans.append((entry.name, entry.stat().st_size))
+    return sorted(orphans)
+
+
+def recover_orphaned_objects(
+    conn: sqlite3.Connection, orphans: list[tuple[str, int]]
+) -> None:
+    """Registers unreferenced objects as trash entries under `lost+found/`.
+
+    Such objects are files whose manifest rows were lost, e.g. by a crash
+    mid-delete. As new entries they can be listed and restored, and they
+    are only evicted once the retention policy expires them.
+    """
+    deleted_at = time.time()
+    with conn:
+        for digest, size in orphans:
+            mode = trash_object_path(digest).stat().st_mode & 0o7777
+            record_trash_entry(
+                conn,
+                PROJECT_ROOT / TRASH_ORPHAN_DIR / digest,
+                [("", "file", digest, size, mode, None)],
+                deleted_at,
+                "Unreferenced trash object recovered by trash gc.",
+            )
+
+
+def describe_orphans(orphans: list[tuple[str, int]], verb: str) -> str:
+    """Returns a summary line and one line per orphaned object."""
+    size = format_size(sum(size for _, size in orphans))
+    lines = [
+        f"{verb} {len(orphans)} unreferenced object(s), {size},"
+        f" as '{TRASH_ORPHAN_DIR}/<hash>' trash entries:"
+    ]
+    lines.extend(f"  - {digest} ({format_size(size)})" for digest, size in orphans)
+    return "\n".join(lines)
+
+
+def stage_trash_eviction(conn: sqlite3.Connection, plan: dict) -> Path:
+    """Drops planned items from the manifest and moves them into staging."""
+    staging = TRASH_DIR / f".gc-{os.getpid()}-{time.time_ns()}"
+    staging.mkdir()
+    with conn:
+        conn.executemany(
+            "DELETE FROM entry_files WHERE entry_id = ?",
+            [(entry_id,) for entry_id in plan["entries"]],
+        )
+        conn.executemany(
+            "DELETE FROM entries WHERE id = ?",
+            [(entry_id,) for entry_id in plan["entries"]],
+        )
+    shards = set()
+    for digest in plan["objects"]:
+        try:
+            os.rename(trash_object_path(digest), staging / digest)
+        except FileNotFoundError:
+            continue
+        shards.add(trash_object_path(digest).parent)
+    for shard in shards:
+        try:
+            shard.rmdir()
+        except OSError:  # Still holds other objects.
+            pass
+    for n, item in enumerate(plan["legacy"]):
+        os.rename(item, staging / f"{n}_{item.name}")
+    return staging
+
+
+def remove_paths(paths: list[Path]) -> int:
+    """Permanently removes paths, returning how many were removed."""
+    for path in paths:
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+    return len(paths)
+
+
+def purge_trash_staging(workers: int) -> None:
+    """Deletes everything staged by this and any interrupted earlier run."""
+    items = [item for staging in TRASH_DIR.glob(".gc-*") for item in staging.iterdir()]
+    chunk_size = max(1, min(256, len(items) // max(1, workers)))
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    report = not sys.stdout.isatty()
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        with click.progressbar(length=len(items), label="Deleting") as bar:
+            for removed in executor.map(remove_paths, chunks):
+                bar.update(removed)
+                done += removed
+                if report:
+                    click.echo(f"Deleted {done}/{len(items)}")
+    for staging in TRASH_DIR.glob(".gc-*"):
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def run_trash_gc(
+    max_age_days: float | None,
+    max_total_bytes: int | None,
+    evict_all: bool,
+    workers: int,
+    dry_run: bool,
+) -> str:
+    """Evicts trash items per the given policy and returns a summary."""
+    with locked_file(TRASH_LOCK_PATH), closing(open_trash_manifest()) as conn:
+        orphans = find_orphaned_objects(conn)
+        if orphans and not dry_run:
+            recover_orphaned_objects(conn, orphans)
+        plan = plan_trash_eviction(conn, max_age_days, max_total_bytes, evict_all)
+        evicted = len(plan["entries"]) + len(plan["legacy"])
+        summary = (
+            f"{evicted} item(s), {format_size(plan['freed'])} freed,"
+            f" {plan['kept']} item(s) kept"
+        )
+        if dry_run:
+            summary = f"Would evict {summary}."
+            if orphans:
+                summary += "\n" + describe_orphans(orphans, "Would recover")
+            return summary
+        if evicted:
+            stage_trash_eviction(conn, plan)
+
+    purge_trash_staging(workers)
+    summary = f"🗑️ Evicted {summary}."
+    if orphans:
+        summary += "\n" + describe_orphans(orphans, "Recovered")
+    return summary
+
+
+@trash.command(name="gc")
+@click.option(
+    "--max-age-days",
+    type=float,
+    help="Evict items deleted longer ago than this [default: trash.retention].",
+)
+@click.option(
+    "--max-total-bytes",
+    type=int,
+    help="Evict oldest items until the trash fits [default: trash.retention].",
+)
+@click.option("--workers", default=8, show_default=True, help="Concurrent deletions.")
+@click.option("--dry-run", is_flag=True, help="Only report what would be evicted.")
+@click.option("--background", is_flag=True, help="Run as a detached process.")
+def trash_gc(
+    max_age_days: float | None,
+    max_total_bytes: int | None,
+    workers: int,
+    dry_run: bool,
+    background: bool,
+):
+    """Evicts old items until the trash meets its retention policy."""
+    retention = get_config().get("trash", {}).get("retention") or {}
+    if max_age_days is None:
+        max_age_days = retention.get("max_age_days")
+    if max_total_bytes is None:
+        max_total_bytes = retention.get("max_total_bytes")
+    if max_age_days is None and max_total_bytes is None:
+        click.echo(
+            click.style(
+                "No retention policy: set trash.retention in workflow.yml "
+                "or pass --max-age-days / --max-total-bytes.",
+                fg="yellow",
+            )
+        )
+        return
+
+    if background and not dry_run:
+        args = ["trash", "gc", "--workers", str(workers)]
+        if max_age_days is not None:
+            args += ["--max-age-days", str(max_age_days)]
+        if max_total_bytes is not None:
+            args += ["--max-total-bytes", str(max_total_bytes)]
+        spawn_background(args, TRASH_GC_LOG_PATH)
+        return
+    summary = run_trash_gc(max_age_days, max_total_bytes, False, workers, dry_run)
+    click.echo(click.style(summary, fg="yellow" if dry_run else "green"))
+
+
+@trash.command(name="empty")
+@click.option("--yes", is_flag=True, help="Do not ask for confirmation.")
+@click.option("--workers", default=8, show_default=True, help="Concurrent deletions.")
+@click.option("--background", is_flag=True, help="Run as a detached process.")
+def trash_empty(yes: bool, workers: int, background: bool):
+    """Permanently deletes all items from the trash can."""
+    if not yes and not click.confirm(
+        click.style(
+            "This will permanently delete all items in the trash. Are you sure?",
+            fg="red",
+        )
+    ):
+        raise click.Abort()
+
+    if background:
+        spawn_background(
+            ["trash", "empty", "--yes", "--workers", str(workers)], TRASH_GC_LOG_PATH
+        )
+        return
+    click.echo(run_trash_gc(None, None, True, workers, False))
+    click.echo(click.style("🗑️ Trash can has been emptied.", fg="green"))
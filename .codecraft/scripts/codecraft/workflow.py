@@ -0,0 +1,302 @@
+"""Workflow commands: `init`, `start`, `complete`, `suggest` and `deps`."""
+
+import functools
+import shutil
+
+import click
+
+from .core import PROJECT_ROOT, get_config, span
+from .index import (
+    TaskGraph,
+    find_task_file,
+    load_tasks,
+    parse_dependencies,
+    read_task_header,
+    record_task_location,
+)
+from .process import StepRunner, get_git_backend
+
+
+# ---
+# Workflow Commands
+# ---
+@click.command()
+def init():
+    """Initializes the CodeCraft framework in a project safely."""
+    click.echo(click.style("🚀 Initializing CodeCraft Framework...", fg="cyan"))
+
+    # Directories to create
+    dirs_to_create = [
+        PROJECT_ROOT / ".codecraft" / "scripts",
+        PROJECT_ROOT / ".codecraft" / "templates",
+        PROJECT_ROOT / "docs" / "adr",
+        PROJECT_ROOT / "docs" / "specs",
+        PROJECT_ROOT / "docs" / "framework",
+        PROJECT_ROOT / "docs" / "project",
+        PROJECT_ROOT / "project_logs",
+        PROJECT_ROOT / "tasks" / "backlog",
+    ]
+    for directory in dirs_to_create:
+        directory.mkdir(parents=True, exist_ok=True)
+        click.echo(
+            f"  - Ensuring directory exists: {directory.relative_to(PROJECT_ROOT)}"
+        )
+
+    # Files to copy/template
+    # files_to_handle = {
+    #     ".pre-commit-config.yaml": ".pre-commit-config.yaml",
+    #     ".codecraft/workflow.yml": ".codecraft/workflow.yml",
+    #     ".gitignore": ".gitignore",
+    # }
+
+    # This assumes the cli.py is running from within a cloned repo structure temporarily
+    # A more robust solution might package templates inside the script itself
+    # For now, let's assume we can access them via a relative path for init purposes.
+
+    # This part is complex because the script needs to find its *own* source templates
+    # to copy them. For now, we will simulate this by checking for existence and warning.
+
+    click.echo(
+        click.style(
+            "\nNOTE: This is a simulated init. In a real scenario, it would copy framework files.",
+            fg="yellow",
+        )
+    )
+    click.echo(
+        click.style(
+            "In this environment, it just ensures directories are present.", fg="yellow"
+        )
+    )
+    click.echo(
+        click.style(
+            "A full implementation would require packaging templates or a more complex file access strategy.",
+            fg="yellow",
+        )
+    )
+
+    click.echo(click.style("\n✅ Framework initialized safely.", fg="green"))
+
+
+@click.command()
+@click.argument("task_title")
+@click.option(
+    "--type", "-t", "branch_type", default="feat", help="Branch type (e.g., feat, fix)."
+)
+def start(task_title: str, branch_type: str):
+    """Starts a task: creates a branch and moves the task file."""
+    click.echo(click.style(f"🚀 Starting task: '{task_title}'...", fg="cyan"))
+    task_path = find_task_file(task_title)
+    if not task_path:
+        click.echo(click.style(f"Error: Task '{task_title}' not found.", fg="red"))
+        raise click.Abort()
+
+    in_progress_dir = PROJECT_ROOT / get_config()["tasks"]["status_map"]["in_progress"]
+    new_task_path = in_progress_dir / task_path.name
+    branch_name = f"{branch_type}/{task_title}"
+
+    git = get_git_backend()
+    runner = StepRunner()
+    click.echo("  - Ensuring main branch is up-to-date...")
+    git.checkout("main")
+
+    def check_branch():
+        if git.branch_exists(branch_name, runner=runner):
+            click.echo(
+                click.style(f"Error: Branch '{branch_name}' already exists.", fg="red")
+            )
+            raise click.Abort()
+
+    def read_task():
+        try:
+            read_task_header(task_path)
+        except (OSError, UnicodeDecodeError) as e:
+            click.echo(click.style(f"Error: Cannot read '{task_path}': {e}", fg="red"))
+            raise click.Abort()
+
+    # The pull is network-bound; validate and pre-read the task meanwhile.
+    # A failed check cancels the pull.
+    runner.gather(
+        functools.partial(git.pull, runner=runner),
+        check_branch,
+        read_task,
+        functools.partial(in_progress_dir.mkdir, parents=True, exist_ok=True),
+    )
+    # The pull may have moved the task; the lookup is a stat if it did not.
+    task_path = find_task_file(task_title) or task_path
+
+    click.echo(f"  - Creating and switching to branch '{branch_name}'...")
+    git.checkout(branch_name, create=True)
+
+    click.echo("  - Moving task to 'in_progress'...")
+    shutil.move(str(task_path), str(new_task_path))
+    record_task_location(new_task_path, "in_progress", old_path=task_path)
+
+    click.echo("  - Committing status change...")
+    commit_message = f"chore(tasks): Start work on task '{task_title}'"
+    git.commit_paths([task_path, new_task_path], commit_message)
+
+    click.echo(
+        click.style(f"\n✅ Success! You are on branch '{branch_name}'.", fg="green")
+    )
+
+
+@click.command()
+@click.argument("task_title")
+def complete(task_title: str):
+    """Completes a task on the current branch."""
+    click.echo(click.style(f"🎉 Completing task: '{task_title}'...", fg="cyan"))
+    task_path = find_task_file(task_title)
+    if not task_path:
+        click.echo(click.style(f"Error: Task '{task_title}' not found.", fg="red"))
+        raise click.Abort()
+
+    done_dir = PROJECT_ROOT / get_config()["tasks"]["status_map"]["done"]
+    done_dir.mkdir(parents=True, exist_ok=True)
+    new_task_path = done_dir / task_path.name
+
+    click.echo("  - Moving task to 'done'...")
+    shutil.move(str(task_path), str(new_task_path))
+    record_task_location(new_task_path, "done", old_path=task_path)
+
+    click.echo("  - Committing status change...")
+    commit_message = f"chore(tasks): Complete task '{task_title}'"
+    git = get_git_backend()
+    git.commit_paths([task_path, new_task_path], commit_message)
+
+    click.echo(click.style(f"\n✅ Success! Task '{task_title}' is done.", fg="green"))
+
+
+@click.command()
+@click.option(
+    "--graph",
+    "use_graph",
+    is_flag=True,
+    help="Rank by critical path and transitively unblocked tasks.",
+)
+def suggest(use_graph: bool):
+    """Suggests the next task to work on based on priority and dependencies."""
+    click.echo(
+        click.style("🔍 Analyzing tasks to suggest the next action...", fg="cyan")
+    )
+
+    graph = None
+    ranks = {}
+    if use_graph:
+        tasks = load_tasks()
+        with span("task graph", tasks=len(tasks)):
+            graph = TaskGraph(tasks)
+            cycles = graph.cycles()
+            ranks = graph.rank()
+        for cycle in cycles:
+            click.echo(
+                click.style(f"  - Dependency cycle: {' -> '.join(cycle)}", fg="red")
+            )
+    else:
+        tasks = load_tasks(["backlog", "todo", "done"])
+    done_tasks = {t["title"] for t in tasks if t["status"] == "done"}
+
+    unblocked_tasks = []
+    for task in tasks:
+        if task["status"] not in ("backlog", "todo"):
+            continue
+        if graph is not None:
+            unblocked = graph.is_ready(task["title"])
+        else:
+            deps = parse_dependencies(task.get("dependencies", "[]"))
+            unblocked = deps.issubset(done_tasks)
+        if unblocked:
+            unblocked_tasks.append(task)
+        else:
+            click.echo(
+                click.style(
+                    f"  - Task '{task['title']}' is blocked by dependencies.",
+                    fg="yellow",
+                )
+            )
+
+    # Advanced sorting: (Critical path -> Unblocked tasks ->) Type -> Priority
+    priority_map = {"critical": 0, "high": 1, "medium": 2, "low": 3}
+    type_map = {"bug": 0, "feature": 1, "chore": 2}
+
+    def sort_key(task: dict) -> tuple:
+        critical, downstream = ranks.get(task["title"], (0, 0))
+        return (
+            -critical,
+            -downstream,
+            type_map.get(task.get("type", "feature").lower(), 2),
+            priority_map.get(task.get("priority", "medium").lower(), 2),
+        )
+
+    unblocked_tasks.sort(key=sort_key)
+
+    if not unblocked_tasks:
+        click.echo(
+            click.style(
+                "\n✅ All tasks are either completed or blocked. Nothing to suggest.",
+                fg="green",
+            )
+        )
+        return
+
+    click.echo(
+        click.style("\n💡 Here are the suggested next tasks to work on:", fg="green")
+    )
+    for i, task in enumerate(unblocked_tasks[:5]):
+        task_type = task.get("type", "Feature").capitalize()
+        priority = task.get("priority", "Medium").capitalize()
+        line = (
+            f"  {i+1}. {task['title']} "
+            f"({click.style(task_type, fg='blue')}, "
+            f"{click.style(priority, fg='magenta')})"
+        )
+        if task["title"] in ranks:
+            critical, downstream = ranks[task["title"]]
+            line += f" - critical path {critical}, unblocks {downstream}"
+        click.echo(line)
+
+    if graph is not None:
+        order = graph.schedule(lambda title: sort_key(graph.tasks[title]))
+        click.echo(click.style("\n🗺️  Planned order:", fg="green"))
+        click.echo(
+            "  " + " -> ".join(order[:10]) + (" -> ..." if len(order) > 10 else "")
+        )
+
+
+@click.group()
+def deps():
+    """Commands for inspecting task dependencies."""
+    pass
+
+
+@deps.command(name="why")
+@click.argument("task_title")
+def deps_why(task_title: str):
+    """Explains which unfinished tasks are blocking a task."""
+    graph = TaskGraph(load_tasks())
+    if task_title not in graph.tasks:
+        click.echo(click.style(f"Error: Task '{task_title}' not found.", fg="red"))
+        raise click.Abort()
+    if task_title in graph.done:
+        click.echo(click.style(f"✅ Task '{task_title}' is already done.", fg="green"))
+        return
+
+    blockers = graph.blockers(task_title)
+    if not blockers:
+        click.echo(click.style(f"✅ Task '{task_title}' is not blocked.", fg="green"))
+        return
+    click.echo(click.style(f"Task '{task_title}' is blocked by:", fg="yellow"))
+    for depth, title, note in blockers:
+        click.echo(f"{'  ' * depth}- {title} ({note})")
+
+
+@deps.command(name="cycles")
+def deps_cycles():
+    """Lists dependency cycles, each arrow pointing to a task that waits."""
+    cycles = TaskGraph(load_tasks()).cycles()
+    if not cycles:
+        click.echo(click.style("✅ No dependency cycles found.", fg="green"))
+        return
+    for cycle in cycles:
+        click.echo(click.style(f"  - {' -> '.join(cycle)}", fg="red"))
+    click.echo(click.style(f"Found {len(cycles)} dependency cycle(s).", fg="red"))
+    raise click.exceptions.Exit(1)